@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Clientes AWS sob demanda - sessão, DynamoDB e API Gateway criados no primeiro uso
+Usado por websocket_game_handler.py
+
+Importar o boto3 e montar um resource com suas tabelas custa centenas de ms no
+cold start, e um cliente apigatewaymanagementapi novo por invocação refaz o
+cliente e o pool HTTP (e o handshake TLS) a cada mensagem. Aqui o boto3 só é
+importado quando um cliente é pedido; a sessão, o resource e os clientes são
+criados uma vez por processo e reaproveitados nas invocações seguintes do
+mesmo container, com as conexões HTTP mantidas no pool de cada cliente.
+
+Quem não usa a AWS (servidor local, replay, benchmarks) troca as tabelas e o
+cliente antes da primeira mensagem e não paga nada disso.
+"""
+
+import os
+import threading
+
+# Conexões HTTP mantidas por cliente (as mensagens de um broadcast saem pelo mesmo pool)
+MAX_POOL_CONNECTIONS = int(os.environ.get("AWS_MAX_POOL_CONNECTIONS", 10))
+
+_lock = threading.RLock()
+_session = None
+_dynamodb = {}  # região -> resource
+_api_gateway = {}  # (endpoint, região) -> cliente
+
+
+def client_config():
+    from botocore.config import Config
+    return Config(max_pool_connections=MAX_POOL_CONNECTIONS, tcp_keepalive=True)
+
+
+def session():
+    """Sessão do boto3 do processo (importa o boto3 na primeira chamada)"""
+    global _session
+    with _lock:
+        if _session is None:
+            import boto3
+            _session = boto3.session.Session()
+        return _session
+
+
+def dynamodb(region_name):
+    with _lock:
+        if region_name not in _dynamodb:
+            _dynamodb[region_name] = session().resource("dynamodb", region_name=region_name, config=client_config())
+        return _dynamodb[region_name]
+
+
+def api_gateway_client(endpoint_url, region_name):
+    """Cliente apigatewaymanagementapi do endpoint, criado uma vez e reaproveitado"""
+    key = (endpoint_url, region_name)
+    with _lock:
+        if key not in _api_gateway:
+            _api_gateway[key] = session().client("apigatewaymanagementapi", endpoint_url=endpoint_url,
+                                                 region_name=region_name, config=client_config())
+        return _api_gateway[key]
+
+
+class LazyTable:
+    """Table do DynamoDB criada no primeiro acesso (o nome já existe antes, sem tocar no boto3)"""
+
+    def __init__(self, name, region_name):
+        self.name = name
+        self.region_name = region_name
+        self._table = None
+
+    @property
+    def table(self):
+        if self._table is None:
+            self._table = dynamodb(self.region_name).Table(self.name)
+        return self._table
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self.table, attr)
+
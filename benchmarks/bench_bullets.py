@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark de Balas - Custo de update_bullets no cliente
+Compara o passo bala a bala (dicts) com o pool vetorizado em NumPy
+(bullet_pool.py), com centenas de balas na tela e as caixas de um mapa real.
+
+Uso:
+    python benchmarks/bench_bullets.py [--bullets 100 500 1000] [--steps 200] [--seed 42]
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import os
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bullet_pool import HAS_NUMPY, BulletPool  # noqa: E402
+from game_map import create_map  # noqa: E402
+
+
+class NullSocket:
+    """Socket que descarta as mensagens (só o custo da simulação interessa aqui)"""
+
+    def send(self, message):
+        pass
+
+
+def load_client_module():
+    spec = importlib.util.spec_from_file_location("game_client", os.path.join(ROOT, "game-client.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_bullets(count, rng, now, player_id, own_every):
+    """Balas lentas perto do centro, 1 em cada `own_every` do jogador local (0 = nenhuma)"""
+    return [
+        {
+            "id": f"b{i}",
+            "x": rng.uniform(200, 600),
+            "y": rng.uniform(150, 450),
+            "dx": rng.uniform(-1, 1),
+            "dy": rng.uniform(-1, 1),
+            "created_at": now,
+            "shooter_id": player_id if own_every and i % own_every == 0 else "remote"
+        }
+        for i in range(count)
+    ]
+
+
+def measure(game, bullets, steps, use_pool):
+    """Tempo médio de um passo de bala (update_bullets + envio das balas próprias)"""
+    game.bullet_pool = BulletPool() if use_pool else None
+    game.set_bullets([dict(bullet) for bullet in bullets])
+
+    samples = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(steps):
+            start = time.perf_counter()
+            game.update_bullets()
+            game.flush_bullet_updates()
+            samples.append(time.perf_counter() - start)
+    return statistics.mean(samples), len(game.bullets)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da simulação de balas do cliente")
+    parser.add_argument("--bullets", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--own-every", type=int, default=4,
+                        help="1 em cada N balas é do jogador local (envia bullet_update); 0 = só balas remotas")
+    args = parser.parse_args()
+
+    if not HAS_NUMPY:
+        print("❌ NumPy não instalado: pip install numpy")
+        sys.exit(1)
+
+    client = load_client_module()
+    game = client.MultiplayerGame()
+    game.collision_boxes = create_map(args.seed)["collision_boxes"]
+    game.occupancy_grid = client.get_occupancy_grid(game.collision_boxes)
+    game.connected = True
+    game.ws = NullSocket()
+
+    rng = random.Random(args.seed)
+    print(f"🔫 update_bullets: {args.steps} passos, mapa seed {args.seed}")
+    for count in args.bullets:
+        bullets = make_bullets(count, rng, time.time(), game.player_id, args.own_every)
+        dict_time, dict_left = measure(game, bullets, args.steps, use_pool=False)
+        pool_time, pool_left = measure(game, bullets, args.steps, use_pool=True)
+        print(f"   {count:>5} balas   dicts {dict_time * 1e6:9.1f}µs/passo   "
+              f"NumPy {pool_time * 1e6:9.1f}µs/passo   ({dict_time / pool_time:.1f}x)   "
+              f"restantes {dict_left}/{pool_left}")
+
+    client.pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Benchmark de Cold Start - Import do handler e latência da primeira mensagem
+Cada medida roda num processo novo (cold start de verdade) em dois modos:
+
+    lazy   - como o handler está: boto3 importado e clientes criados no
+             primeiro uso e reaproveitados (aws_clients.py)
+    eager  - como era antes: resource do DynamoDB e tabelas montados no
+             import e um cliente apigatewaymanagementapi novo por invocação
+
+O cliente do API Gateway é um boto3 de verdade apontado para um servidor HTTP
+local que faz o papel do endpoint de gerenciamento (POST /@connections/{id}),
+então a criação do cliente, a assinatura e o pool de conexões entram na
+medida. As tabelas são as do local_backend.py (sem rede); o custo de montar o
+resource do DynamoDB aparece à parte (no modo lazy ele é pago na primeira
+mensagem que toca o DynamoDB, no eager, no import).
+
+Reporta a mediana de: tempo de import, entrada do primeiro jogador ($connect
+e join, as primeiras invocações do container), mensagens seguintes (update com
+broadcast) e conexões TCP abertas com o endpoint.
+
+Uso:
+    python benchmarks/bench_cold_start.py [--runs 5] [--messages 50] [--output resultado.json]
+"""
+
+import argparse
+import datetime
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODES = ("lazy", "eager")
+TABLE_NAMES = ("WebSocketConnections", "game_bullets", "game_state", "game_rooms")
+
+
+class ManagementApi(BaseHTTPRequestHandler):
+    """Endpoint de gerenciamento do API Gateway: aceita qualquer post_to_connection"""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive: o pool do cliente reaproveita a conexão
+    connections = 0
+    posts = 0
+
+    def setup(self):
+        super().setup()
+        ManagementApi.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        ManagementApi.posts += 1
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def child(mode, messages):
+    """Um cold start: mede no próprio processo e imprime o resultado em JSON"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ManagementApi)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ["API_GATEWAY_ENDPOINT"] = endpoint
+    for name, value in (("AWS_ACCESS_KEY_ID", "bench"), ("AWS_SECRET_ACCESS_KEY", "bench"), ("AWS_DEFAULT_REGION", "us-east-1")):
+        os.environ.setdefault(name, value)
+
+    start = time.perf_counter()
+    import websocket_game_handler as handler
+    if mode == "eager":
+        import boto3
+        dynamodb = boto3.resource("dynamodb", region_name=handler.AWS_REGION)
+        [dynamodb.Table(name) for name in TABLE_NAMES]
+    import_ms = (time.perf_counter() - start) * 1000
+
+    import aws_clients
+    from local_backend import LocalBackend, make_event
+    from local_server import silence_handler_logs
+
+    real_client = handler.get_api_gateway_client
+    LocalBackend().install(handler)
+    if mode == "eager":
+        handler.get_api_gateway_client = lambda domain_name, stage: boto3.client(
+            "apigatewaymanagementapi", endpoint_url=endpoint, region_name=handler.AWS_REGION)
+    else:
+        handler.get_api_gateway_client = real_client
+    silence_handler_logs()
+
+    def invoke(connection_id, route_key, message=None):
+        body = json.dumps(message) if message is not None else None
+        start = time.perf_counter()
+        handler.lambda_handler(make_event(connection_id, route_key, body), None)
+        return (time.perf_counter() - start) * 1000
+
+    first_ms = invoke("cold-a", "$connect")
+    first_ms += invoke("cold-a", "$default", {"action": "join", "player_id": "cold-a", "room_id": "cold"})
+    dynamodb_ms = 0.0
+    if mode == "lazy":
+        start = time.perf_counter()
+        resource = aws_clients.dynamodb(handler.AWS_REGION)
+        [resource.Table(name) for name in TABLE_NAMES]
+        dynamodb_ms = (time.perf_counter() - start) * 1000
+
+    invoke("cold-b", "$connect")
+    invoke("cold-b", "$default", {"action": "join", "player_id": "cold-b", "room_id": "cold"})
+    warm = []
+    player = handler.connections_table.get_item(Key={"connection_id": "cold-a"})["Item"]
+    x, y = int(player["x"]), int(player["y"])
+    for i in range(messages):
+        warm.append(invoke("cold-a", "$default", {"action": "update", "player_id": "cold-a", "x": x, "y": y, "seq": i + 1}))
+
+    server.shutdown()
+    print(json.dumps({
+        "import_ms": import_ms,
+        "first_message_ms": first_ms,
+        "dynamodb_first_use_ms": dynamodb_ms,
+        "warm_message_ms": statistics.mean(warm),
+        "tcp_connections": ManagementApi.connections,
+        "posts": ManagementApi.posts,
+    }))
+
+
+def run_child(mode, messages):
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode, "--messages", str(messages)],
+                            capture_output=True, text=True, cwd=ROOT)
+    if result.returncode != 0:
+        raise RuntimeError(f"Processo de medida ({mode}) falhou:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start do websocket_game_handler: import e primeira mensagem")
+    parser.add_argument("--runs", type=int, default=5, help="Processos novos por modo")
+    parser.add_argument("--messages", type=int, default=50, help="Mensagens depois do join em cada processo")
+    parser.add_argument("--output", help="Salva o resultado em JSON (para comparar entre commits)")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.messages)
+        return
+
+    print(f"🧊 Cold start: {args.runs} processos por modo, {args.messages} mensagens depois do join (medianas)")
+    print(f"   {'modo':<6} {'import ms':>10} {'entrada ms':>11} {'dynamo ms':>10} {'total ms':>9} "
+          f"{'msg ms':>8} {'conexões':>9} {'envios':>7}")
+    results = {}
+    for mode in MODES:
+        runs = [run_child(mode, args.messages) for _ in range(args.runs)]
+        row = {name: statistics.median(run[name] for run in runs) for name in runs[0]}
+        results[mode] = row
+        total = row["import_ms"] + row["first_message_ms"] + row["dynamodb_first_use_ms"]
+        print(f"   {mode:<6} {row['import_ms']:>10.1f} {row['first_message_ms']:>11.1f} "
+              f"{row['dynamodb_first_use_ms']:>10.1f} {total:>9.1f} "
+              f"{row['warm_message_ms']:>8.2f} {row['tcp_connections']:>9.0f} {row['posts']:>7.0f}")
+
+    lazy, eager = results["lazy"], results["eager"]
+    print(f"\n   import: {eager['import_ms'] - lazy['import_ms']:.1f} ms a menos; "
+          f"mensagem aquecida: {eager['warm_message_ms'] / lazy['warm_message_ms']:.1f}x mais rápida")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "runs": args.runs,
+                "messages": args.messages,
+                "results": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos Handlers - Custo de cada ação do websocket_game_handler
+Chama o lambda_handler com eventos sintéticos ($connect e $default) contra as
+tabelas do DynamoDB e o cliente do API Gateway em memória (local_backend.py) e
+mede, por chamada, o tempo, as operações nas tabelas e os bytes enviados de
+handle_update_position, handle_shoot, handle_bullet_update,
+handle_capture_flag e send_game_state, variando o número de jogadores e balas.
+
+Uso:
+    python benchmarks/bench_handlers.py [--players 2 10 50] [--bullets 0 50 200] [--repeat 100]
+"""
+
+import argparse
+import datetime
+import json
+import math
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+import websocket_game_handler as handler  # noqa: E402
+from game_simulation import (  # noqa: E402
+    GAME_HEIGHT,
+    GAME_WIDTH,
+    TEAMS,
+    bullet_hits_box,
+    enemy_team,
+    player_position_valid,
+)
+from local_backend import LocalBackend, make_event  # noqa: E402
+from local_server import silence_handler_logs  # noqa: E402
+
+
+ACTIONS = ("update", "shoot", "bullet_update", "capture_flag", "send_game_state")
+
+# Sala única do cenário (com capacidade para todos os jogadores)
+BENCH_ROOM = "bench"
+
+# Distância mínima entre as balas semeadas e os spawns (para não acertarem ninguém)
+SPAWN_CLEARANCE = 150
+
+
+def count_ops(stats):
+    """Resume as estatísticas do LocalBackend em leituras, escritas, itens lidos e mensagens"""
+    totals = {"reads": 0, "scans": 0, "writes": 0, "items_read": 0}
+    for table in stats["tables"].values():
+        totals["reads"] += table["get"] + table["query"]
+        totals["scans"] += table["scan"]
+        totals["writes"] += table["put"] + table["update"] + table["delete"]
+        totals["items_read"] += table["items_read"]
+    totals["messages"] = stats["api_gateway"]["messages"]
+    totals["bytes"] = stats["api_gateway"]["bytes"]
+    return totals
+
+
+def free_points(grid, count):
+    """Pontos livres de caixas e longe dos spawns, para semear balas paradas"""
+    points = []
+    for y in range(40, GAME_HEIGHT - 40, 20):
+        for x in range(40, GAME_WIDTH - 40, 20):
+            if bullet_hits_box(grid, x, y) is not None or bullet_hits_box(grid, x + 1, y) is not None:
+                continue
+            if any(math.hypot(x - team["spawn_x"], y - team["spawn_y"]) < SPAWN_CLEARANCE for team in TEAMS.values()):
+                continue
+            points.append((x, y))
+    if not points:
+        raise RuntimeError("Nenhum ponto livre no mapa para semear balas")
+    return [points[i % len(points)] for i in range(count)]
+
+
+class HandlerScenario:
+    """Partida em memória com `players` jogadores conectados e `bullets` balas no ar"""
+
+    def __init__(self, players, bullets):
+        self.backend = LocalBackend(sender=lambda connection_id, data: True).install(handler)
+        handler.room_registry.capacity = max(players, 2)
+        self.connections = []  # [(connection_id, player_id)]
+        for i in range(max(players, 2)):
+            connection_id, player_id = f"bench-conn-{i}", f"bench-{i}"
+            self.invoke(connection_id, "$connect")
+            self.invoke(connection_id, "$default", {"action": "join", "player_id": player_id, "room_id": BENCH_ROOM})
+            self.connections.append((connection_id, player_id))
+
+        self.connection_id, self.player_id = self.connections[0]
+        player = self.backend.connections_table.items[self.connection_id]
+        self.team = player["team"]
+        self.spawn = (TEAMS[self.team]["spawn_x"], TEAMS[self.team]["spawn_y"])
+        self.grid = handler.get_occupancy_grid(handler.game_state.get("collision_boxes", []))
+
+        # Balas paradas do jogador 0 (a primeira é a que o bullet_update move, por isso há sempre uma)
+        now = time.time()
+        self.bullet_points = free_points(self.grid, max(bullets, 1))
+        for i, (x, y) in enumerate(self.bullet_points):
+            handler.save_bullet_dynamo({
+                "id": f"bench-b{i}", "room_id": BENCH_ROOM, "shooter_id": self.player_id, "shooter_team": self.team,
+                "x": x, "y": y, "dx": 0, "dy": 0, "created_at": now, "ttl": int(now) + 3600
+            })
+
+    def invoke(self, connection_id, route_key, message=None):
+        body = json.dumps(message) if message is not None else None
+        return handler.lambda_handler(make_event(connection_id, route_key, body), None)
+
+    def message(self, i, action):
+        """Mensagem da i-ésima chamada de `action`, alternando entre dois estados válidos"""
+        step = i % 2
+        if action == "update":
+            x, y = self.spawn[0] + step, self.spawn[1]
+            if not player_position_valid(x, y, self.grid):
+                x = self.spawn[0]
+            return {"action": "update", "player_id": self.player_id, "x": x, "y": y, "seq": i + 1}
+        if action == "shoot":
+            return {"action": "shoot", "player_id": self.player_id, "player_x": self.spawn[0], "player_y": self.spawn[1],
+                    "target_x": GAME_WIDTH // 2, "target_y": GAME_HEIGHT // 2}
+        if action == "bullet_update":
+            x, y = self.bullet_points[0]
+            return {"action": "bullet_update", "bullet_id": "bench-b0", "shooter_id": self.player_id, "x": x + step, "y": y}
+        if action == "capture_flag":
+            return {"action": "capture_flag", "player_id": self.player_id, "flag_team": enemy_team(self.team)}
+        raise ValueError(action)
+
+    def run_once(self, i, action):
+        if action == "send_game_state":
+            handler.send_game_state(self.backend.api_gateway_client, self.connection_id, BENCH_ROOM)
+        else:
+            self.invoke(self.connection_id, "$default", self.message(i, action))
+
+    def measure(self, action, repeat):
+        """Tempo e operações por chamada; o estado é restaurado fora da medição"""
+        bullets_before = dict(self.backend.bullets_table.items)
+        state_before = dict(self.backend.game_state_table.items)
+        if action == "send_game_state":
+            handler.game_state = handler.load_game_state(BENCH_ROOM)  # O lambda_handler carrega antes de cada ação
+
+        samples = []
+        totals = dict.fromkeys(("reads", "scans", "writes", "items_read", "messages", "bytes"), 0)
+        for i in range(repeat):
+            self.backend.reset_stats()
+            start = time.perf_counter()
+            self.run_once(i, action)
+            samples.append(time.perf_counter() - start)
+            for name, value in count_ops(self.backend.stats()).items():
+                totals[name] += value
+
+            # Mesmo estado a cada chamada: sem balas novas e bandeira de volta à base
+            if action == "shoot":
+                self.backend.bullets_table.items = dict(bullets_before)
+            elif action == "capture_flag":
+                self.backend.game_state_table.items = dict(state_before)
+
+        ordered = sorted(samples)
+        result = {name: value / repeat for name, value in totals.items()}
+        result.update({
+            "mean_ms": statistics.mean(samples) * 1000,
+            "p50_ms": ordered[len(ordered) // 2] * 1000,
+            "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        })
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das ações do websocket_game_handler")
+    parser.add_argument("--players", type=int, nargs="+", default=[2, 10, 50])
+    parser.add_argument("--bullets", type=int, nargs="+", default=[0, 50, 200])
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--actions", nargs="+", choices=ACTIONS, default=list(ACTIONS))
+    parser.add_argument("--output", help="Salva o resultado em JSON (para comparar entre commits)")
+    args = parser.parse_args()
+
+    silence_handler_logs()
+    results = []
+    print(f"🧪 lambda_handler v{handler.SERVER_VERSION}: {args.repeat} chamadas por ação (valores por chamada)")
+    for players in args.players:
+        for bullets in args.bullets:
+            scenario = HandlerScenario(players, bullets)
+            print(f"\n👥 {players} jogadores, 🔫 {bullets} balas")
+            print(f"   {'ação':<16} {'média ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'reads':>6} {'scans':>6} "
+                  f"{'writes':>6} {'itens':>7} {'msgs':>6} {'KB':>8}")
+            for action in args.actions:
+                row = scenario.measure(action, args.repeat)
+                results.append({"players": players, "bullets": bullets, "action": action, **row})
+                print(f"   {action:<16} {row['mean_ms']:>9.3f} {row['p50_ms']:>8.3f} {row['p95_ms']:>8.3f} "
+                      f"{row['reads']:>6.1f} {row['scans']:>6.1f} {row['writes']:>6.1f} "
+                      f"{row['items_read']:>7.1f} {row['messages']:>6.1f} {row['bytes'] / 1024:>8.2f}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "server_version": handler.SERVER_VERSION,
+                "repeat": args.repeat,
+                "results": results,
+            }, f, indent=2)
+        print(f"\n💾 Resultado salvo em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark do Lobby - Latência de colocação de jogadores em salas
+Coloca N jogadores com o RoomRegistry (lobby.py) sobre a tabela game_rooms em
+memória (local_backend.py), com saídas aleatórias entre as entradas, e reporta
+a latência de colocação (p50/p95/máx), tentativas, salas criadas/aposentadas e
+operações na tabela por colocação.
+
+Uso:
+    python benchmarks/bench_lobby.py [--players 100 1000 5000] [--capacity 10] [--churn 0.3] [--seed 42]
+"""
+
+import argparse
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from lobby import DEFAULT_ROOM_CAPACITY, RoomRegistry  # noqa: E402
+from local_backend import new_rooms_table  # noqa: E402
+
+
+def run(players, capacity, churn, rng):
+    table = new_rooms_table()
+    registry = RoomRegistry(table, capacity)
+    seated = []  # [(room_id, team)]
+    latencies = []
+    attempts = 0
+    created = 0
+    retired = 0
+
+    for _ in range(players):
+        # Saídas aleatórias mantêm salas abrindo vagas e esvaziando
+        while seated and rng.random() < churn:
+            room_id, team = seated.pop(rng.randrange(len(seated)))
+            retired += registry.leave(room_id, team)
+
+        placement = registry.place()
+        seated.append((placement.room_id, placement.team))
+        latencies.append(placement.elapsed_ms)
+        attempts += placement.attempts
+        created += placement.created
+
+    ordered = sorted(latencies)
+    stats = registry.stats()
+    ops = table.stats
+    return {
+        "p50_ms": ordered[len(ordered) // 2],
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max_ms": ordered[-1],
+        "attempts": attempts / players,
+        "created": created,
+        "retired": retired,
+        "rooms": stats["rooms"],
+        "seated": stats["players"],
+        "ops": (ops["get"] + ops["put"] + ops["update"] + ops["delete"] + ops["scan"] + ops["query"]) / players,
+        "items_read": ops["items_read"] / players,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da colocação de jogadores pelo lobby")
+    parser.add_argument("--players", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--capacity", type=int, default=DEFAULT_ROOM_CAPACITY)
+    parser.add_argument("--churn", type=float, default=0.3, help="Chance de um jogador sair antes de cada entrada")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"🏠 Lobby: salas de {args.capacity} jogadores, churn {args.churn}")
+    print(f"   {'entradas':>8} {'p50 ms':>8} {'p95 ms':>8} {'máx ms':>8} {'tentativas':>10} "
+          f"{'criadas':>8} {'aposentadas':>11} {'salas':>6} {'sentados':>8} {'ops':>5} {'itens':>7}")
+    for players in args.players:
+        row = run(players, args.capacity, args.churn, random.Random(args.seed))
+        print(f"   {players:>8} {row['p50_ms']:>8.3f} {row['p95_ms']:>8.3f} {row['max_ms']:>8.3f} "
+              f"{row['attempts']:>10.2f} {row['created']:>8} {row['retired']:>11} {row['rooms']:>6} "
+              f"{row['seated']:>8} {row['ops']:>5.1f} {row['items_read']:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
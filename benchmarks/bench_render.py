@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Benchmark de Renderização - Tempo de frame do cliente
+Compara o draw() com a camada estática em cache + retângulos sujos contra o
+redesenho completo a cada frame, com muitas caixas de colisão na tela.
+
+Uso:
+    python benchmarks/bench_render.py [--boxes 120] [--players 8] [--bullets 40] [--frames 600]
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import statistics
+import sys
+import time
+
+# Roda sem janela (driver de vídeo do SDL sem saída)
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def load_client_module():
+    """Carrega game-client.py (o nome com hífen impede um import normal)"""
+    spec = importlib.util.spec_from_file_location("game_client", os.path.join(ROOT, "game-client.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_boxes(count, rng, client):
+    """Gera `count` caixas espalhadas pela tela (sobreposição é permitida)"""
+    half = client.BOX_SIZE // 2
+    return [
+        {
+            "id": f"box_{i}",
+            "x": rng.randint(half, client.SCREEN_WIDTH - half),
+            "y": rng.randint(half, client.SCREEN_HEIGHT - half),
+            "size": client.BOX_SIZE
+        }
+        for i in range(count)
+    ]
+
+
+def populate(game, client, args, rng):
+    """Coloca caixas, jogadores remotos e balas no jogo"""
+    game.collision_boxes = make_boxes(args.boxes, rng, client)
+    game.occupancy_grid = client.get_occupancy_grid(game.collision_boxes)
+    game.invalidate_static_layer()
+
+    game.local_player["team"] = "red"
+    game.local_player["color"] = client.TEAMS["red"]["color"]
+    game.connected = True
+
+    for i in range(args.players):
+        team = "red" if i % 2 else "blue"
+        game.other_players[f"p{i}"] = {
+            "x": rng.randint(20, client.SCREEN_WIDTH - 20),
+            "y": rng.randint(20, client.SCREEN_HEIGHT - 20),
+            "team": team,
+            "color": client.TEAMS[team]["color"],
+            "hp": rng.randint(10, 100)
+        }
+
+    game.set_bullets([
+        {
+            "id": f"b{i}",
+            "x": rng.randint(0, client.SCREEN_WIDTH),
+            "y": rng.randint(0, client.SCREEN_HEIGHT),
+            "dx": rng.uniform(-20, 20),
+            "dy": rng.uniform(-20, 20),
+            "shooter_id": "remote"
+        }
+        for i in range(args.bullets)
+    ])
+
+
+def move_entities(game, client, rng):
+    """Move jogadores e balas um pouco, como aconteceria entre frames"""
+    game.local_player["x"] = (game.local_player["x"] + 3) % client.SCREEN_WIDTH
+    for player in game.other_players.values():
+        player["x"] = min(client.SCREEN_WIDTH, max(0, player["x"] + rng.randint(-5, 5)))
+        player["y"] = min(client.SCREEN_HEIGHT, max(0, player["y"] + rng.randint(-5, 5)))
+    for bullet in game.bullets.values():
+        bullet["x"] = (bullet["x"] + bullet["dx"]) % client.SCREEN_WIDTH
+        bullet["y"] = (bullet["y"] + bullet["dy"]) % client.SCREEN_HEIGHT
+
+
+def measure(game, client, args, cached):
+    """Mede o tempo de draw() + present() por frame"""
+    rng = random.Random(args.seed)
+    game.static_layer_cache_enabled = cached
+    game.invalidate_static_layer()
+
+    samples = []
+    for _ in range(args.warmup + args.frames):
+        move_entities(game, client, rng)
+        start = time.perf_counter()
+        game.draw()
+        game.present()
+        samples.append(time.perf_counter() - start)
+    return samples[args.warmup:]
+
+
+def report(name, samples):
+    ordered = sorted(samples)
+    mean = statistics.mean(samples) * 1000
+    p95 = ordered[int(len(ordered) * 0.95) - 1] * 1000
+    print(f"   {name:<32} média {mean:7.3f}ms   p95 {p95:7.3f}ms   máx {ordered[-1] * 1000:7.3f}ms")
+    return mean
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de renderização do cliente")
+    parser.add_argument("--boxes", type=int, default=120)
+    parser.add_argument("--players", type=int, default=8)
+    parser.add_argument("--bullets", type=int, default=40)
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--warmup", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    client = load_client_module()
+    game = client.MultiplayerGame()
+    populate(game, client, args, random.Random(args.seed))
+
+    print(f"🎨 Renderização: {args.boxes} caixas, {args.players} jogadores, {args.bullets} balas, {args.frames} frames")
+    full = report("Redesenho completo", measure(game, client, args, cached=False))
+    cached = report("Camada estática + dirty rects", measure(game, client, args, cached=True))
+    print(f"   ⚡ Ganho: {full / cached:.1f}x")
+
+    text_cache = game.text_cache
+    total = text_cache.hits + text_cache.misses
+    if total:
+        print(f"   🔤 Cache de textos: {text_cache.hits}/{total} acertos ({text_cache.hits / total:.1%}), "
+              f"{len(text_cache.surfaces)} superfícies")
+
+    client.pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
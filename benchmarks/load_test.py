@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Teste de Carga - Latência ponta a ponta por ação
+Sobe N clientes headless controlados por bots (game_bots.py) contra uma URL
+WebSocket ou contra o servidor local (local_server.py), marca o horário de cada
+ação enviada (update, shoot, bullet_update, capture_flag) e da mensagem que a
+confirma, e reporta vazão e latência p50/p95/p99 por tipo de ação.
+
+Correspondência ação -> confirmação:
+    update         -> primeiro player_update (player_id, seq) recebido por outro cliente
+    shoot          -> bullet_shot recebido pelo próprio atirador
+    bullet_update  -> primeiro bullet_position_update (bullet_id, x, y) recebido por outro cliente
+    capture_flag   -> flag_captured ou erro de captura recebido pelo próprio jogador
+
+Ações sem confirmação depois de PENDING_TIMEOUT segundos (updates recusados,
+corrigidos ou descartados, balas removidas) contam como perdidas.
+
+Uso:
+    python benchmarks/load_test.py --local --clients 20 --duration 60 --output results/load.json
+    python benchmarks/load_test.py --local --workers 4 --clients 80 --duration 60
+    python benchmarks/load_test.py --local --nodes 3 --bus socket --clients 30
+    python benchmarks/load_test.py --url wss://sua-api.execute-api.us-east-1.amazonaws.com/prod --clients 50
+"""
+
+import argparse
+import contextlib
+import datetime
+import importlib.util
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from game_bots import BotController  # noqa: E402
+
+
+ACTIONS = ("update", "shoot", "bullet_update", "capture_flag")
+PENDING_TIMEOUT = 5.0  # Segundos sem confirmação até a ação contar como perdida
+
+# Erros que o servidor devolve para um capture_flag recusado (ver CAPTURE_ERROR_MESSAGES)
+CAPTURE_ERRORS = {
+    "Jogador morto não pode capturar bandeira",
+    "Não pode capturar bandeira do próprio time",
+    "Bandeira já foi capturada",
+    "Dados de captura incompletos",
+}
+
+
+def load_client_module():
+    spec = importlib.util.spec_from_file_location("game_client", os.path.join(ROOT, "game-client.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(ordered, fraction):
+    """Percentil por posição mais próxima (lista já ordenada)"""
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+class LatencyTracker:
+    """Casa ações enviadas com as mensagens que as confirmam (thread-safe)"""
+
+    def __init__(self, timeout=PENDING_TIMEOUT):
+        self.lock = threading.Lock()
+        self.timeout = timeout
+        self.last_prune = 0.0
+        self.lost = defaultdict(int)
+        self.pending_updates = {}  # (player_id, seq) -> t
+        self.pending_bullet_updates = {}  # (bullet_id, x, y) -> t
+        self.pending_shots = defaultdict(deque)  # player_id -> [t]
+        self.pending_captures = defaultdict(deque)  # player_id -> [t]
+        self.samples = defaultdict(list)  # ação -> [latência em segundos]
+        self.sent = defaultdict(int)
+        self.received = defaultdict(int)
+        self.capture_outcomes = {"accepted": 0, "rejected": 0}
+
+    def on_send(self, player_id, message, t):
+        action = message.get("action")
+        with self.lock:
+            if t - self.last_prune >= 1.0:
+                self._prune(t)
+            self.sent[action] += 1
+            if action == "update":
+                self.pending_updates[(message.get("player_id"), message.get("seq"))] = t
+            elif action == "bullet_update":
+                self.pending_bullet_updates[(message.get("bullet_id"), message.get("x"), message.get("y"))] = t
+            elif action == "shoot":
+                self.pending_shots[player_id].append(t)
+            elif action == "capture_flag":
+                self.pending_captures[player_id].append(t)
+
+    def on_receive(self, player_id, data, t):
+        msg_type = data.get("type")
+        with self.lock:
+            self.received[msg_type] += 1
+            if msg_type == "player_update":
+                sent_at = self.pending_updates.pop((data.get("player_id"), data.get("seq")), None)
+                if sent_at is not None:
+                    self.samples["update"].append(t - sent_at)
+            elif msg_type == "bullet_position_update":
+                sent_at = self.pending_bullet_updates.pop((data.get("bullet_id"), data.get("x"), data.get("y")), None)
+                if sent_at is not None:
+                    self.samples["bullet_update"].append(t - sent_at)
+            elif msg_type == "bullet_shot":
+                if data.get("bullet", {}).get("shooter_id") == player_id and self.pending_shots[player_id]:
+                    self.samples["shoot"].append(t - self.pending_shots[player_id].popleft())
+            elif msg_type == "flag_captured":
+                if data.get("carrier_id") == player_id and self.pending_captures[player_id]:
+                    self.samples["capture_flag"].append(t - self.pending_captures[player_id].popleft())
+                    self.capture_outcomes["accepted"] += 1
+            elif msg_type == "error" and data.get("message") in CAPTURE_ERRORS:
+                if self.pending_captures[player_id]:
+                    self.samples["capture_flag"].append(t - self.pending_captures[player_id].popleft())
+                    self.capture_outcomes["rejected"] += 1
+
+    def _prune(self, now):
+        """Descarta as ações pendentes há mais de `timeout` segundos e as conta como perdidas (com o lock)"""
+        self.last_prune = now
+        deadline = now - self.timeout
+        for action, pending in (("update", self.pending_updates), ("bullet_update", self.pending_bullet_updates)):
+            expired = [key for key, sent_at in pending.items() if sent_at < deadline]
+            for key in expired:
+                del pending[key]
+            self.lost[action] += len(expired)
+        for action, queues in (("shoot", self.pending_shots), ("capture_flag", self.pending_captures)):
+            for queue in queues.values():
+                while queue and queue[0] < deadline:
+                    queue.popleft()
+                    self.lost[action] += 1
+
+    def report(self, elapsed):
+        with self.lock:
+            self._prune(time.perf_counter())
+            latency = {}
+            for action in ACTIONS:
+                ordered = sorted(self.samples[action])
+                latency[action] = {
+                    "sent": self.sent[action],
+                    "matched": len(ordered),
+                    "unmatched": self.sent[action] - len(ordered),
+                    "lost": self.lost[action],
+                    "throughput_per_second": self.sent[action] / elapsed if elapsed else 0,
+                    "p50_ms": _ms(percentile(ordered, 0.50)),
+                    "p95_ms": _ms(percentile(ordered, 0.95)),
+                    "p99_ms": _ms(percentile(ordered, 0.99)),
+                    "mean_ms": _ms(sum(ordered) / len(ordered)) if ordered else None,
+                    "max_ms": _ms(ordered[-1]) if ordered else None,
+                }
+            latency["capture_flag"]["outcomes"] = dict(self.capture_outcomes)
+            total_sent = sum(self.sent.values())
+            total_received = sum(self.received.values())
+            return {
+                "latency": latency,
+                "throughput": {
+                    "sent_per_second": total_sent / elapsed if elapsed else 0,
+                    "received_per_second": total_received / elapsed if elapsed else 0,
+                    "sent": dict(self.sent),
+                    "received": dict(self.received),
+                }
+            }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def make_instrumented_class(client, tracker):
+    """Subclasse do MultiplayerGame que registra envios e recebimentos no tracker"""
+
+    class InstrumentedGame(client.MultiplayerGame):
+        def connect_websocket(self):
+            connected = super().connect_websocket()
+            if self.ws is not None:
+                original_send = self.ws.send
+
+                def send(data, *args, **kwargs):
+                    try:
+                        tracker.on_send(self.player_id, json.loads(data), time.perf_counter())
+                    except (TypeError, ValueError):
+                        pass
+                    return original_send(data, *args, **kwargs)
+
+                self.ws.send = send
+            return connected
+
+        def on_websocket_message(self, ws, message):
+            received_at = time.perf_counter()
+            try:
+                tracker.on_receive(self.player_id, json.loads(message), received_at)
+            except (TypeError, ValueError):
+                pass
+            super().on_websocket_message(ws, message)
+
+    return InstrumentedGame
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def log(message):
+    """Progresso vai para stderr (o stdout dos clientes é silenciado durante o teste)"""
+    print(message, file=sys.stderr, flush=True)
+
+
+def run_load_test(url, clients, duration, bot_config=None, fps=30, verbose=False):
+    """`url` pode ser uma lista: os clientes são distribuídos entre os nós"""
+    urls = [url] if isinstance(url, str) else list(url)
+    client = load_client_module()
+    tracker = LatencyTracker()
+    game_class = make_instrumented_class(client, tracker)
+
+    quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    games = []
+    with quiet:
+        for i in range(clients):
+            client.WEBSOCKET_URL = urls[i % len(urls)]
+            game = game_class(headless=True, controller=BotController(bot_config, seed=i))
+            if game.connect_websocket():
+                games.append(game)
+        log(f"🤖 {len(games)}/{clients} clientes conectados em {', '.join(urls)}")
+
+        clock = client.pygame.time.Clock()
+        start = time.perf_counter()
+        for game in games:
+            game.last_frame_time = start
+        next_progress = start + 10
+        try:
+            while time.perf_counter() - start < duration:
+                for game in games:
+                    game.run_frame()
+                clock.tick(fps)
+                if time.perf_counter() >= next_progress:
+                    log(f"   ⏱️ {time.perf_counter() - start:.0f}s - {sum(tracker.sent.values())} ações enviadas")
+                    next_progress += 10
+        finally:
+            elapsed = time.perf_counter() - start
+            for game in games:
+                game.disconnect()
+
+    result = tracker.report(elapsed)
+    result["connected_clients"] = len(games)
+    result["elapsed_seconds"] = round(elapsed, 3)
+    return result
+
+
+def print_report(result):
+    print(f"📊 {result['connected_clients']} clientes, {result['elapsed_seconds']:.1f}s - "
+          f"{result['throughput']['sent_per_second']:.1f} msgs/s enviadas, "
+          f"{result['throughput']['received_per_second']:.1f} msgs/s recebidas")
+    print(f"   {'ação':<14} {'enviadas':>9} {'/s':>8} {'casadas':>8} {'perdidas':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for action in ACTIONS:
+        row = result["latency"][action]
+        fmt = lambda value: f"{value:9.2f}" if value is not None else f"{'-':>9}"  # noqa: E731
+        print(f"   {action:<14} {row['sent']:>9} {row['throughput_per_second']:>8.1f} {row['matched']:>8} {row['lost']:>8} "
+              f"{fmt(row['p50_ms'])} {fmt(row['p95_ms'])} {fmt(row['p99_ms'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga com latência por ação")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="URL WebSocket do servidor (ex.: wss://.../prod)")
+    target.add_argument("--local", action="store_true", help="Sobe o servidor local (local_server.py) neste processo")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Com --local, espalha as salas em N processos (room_workers.py)")
+    parser.add_argument("--nodes", type=int, default=1,
+                        help="Com --local, N nós com broadcast pelo barramento (clientes distribuídos entre eles)")
+    parser.add_argument("--bus", choices=("inprocess", "socket"), default="inprocess",
+                        help="Barramento entre os nós: em processo ou por um broker TCP local")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30, help="Segundos de teste")
+    parser.add_argument("--fps", type=int, default=30, help="Frames por segundo de cada cliente")
+    parser.add_argument("--bot-config", type=json.loads, default=None, help="Taxas dos bots em JSON (game_bots.DEFAULT_BOT_CONFIG)")
+    parser.add_argument("--output", help="Salva o resultado em JSON (para comparar entre commits)")
+    parser.add_argument("--verbose", action="store_true", help="Mostra os logs dos clientes (e do servidor local)")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if args.local and args.workers:
+        from room_workers import RoomSupervisor
+        server = RoomSupervisor(port=0, workers=args.workers, verbose=args.verbose).start_in_thread()
+        url = server.url
+    elif args.local and args.nodes > 1:
+        from local_server import create_cluster
+        broker = None
+        if args.bus == "socket":
+            from broadcast_bus import BusBroker
+            broker = BusBroker(port=0).start_in_thread()
+        nodes = [node.start_in_thread() for node in create_cluster(
+            port=0, nodes=args.nodes, verbose=args.verbose, broker=broker and (broker.host, broker.port))]
+        url = [node.url for node in nodes]
+    elif args.local:
+        from local_server import LocalGameServer
+        server = LocalGameServer(port=0, verbose=args.verbose).start_in_thread()
+        url = server.url
+
+    result = run_load_test(url, args.clients, args.duration, args.bot_config, args.fps, args.verbose)
+    result.update({
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "target": "local" if args.local else url,
+        "nodes": args.nodes if args.local else None,
+        "workers": args.workers if args.local else None,
+        "clients": args.clients,
+        "duration": args.duration,
+        "fps": args.fps,
+        "bot_config": args.bot_config,
+    })
+    if args.local and args.workers:
+        result["server"] = {"workers": server.worker_stats(), "migrations": server.migrations}
+        server.stop()
+    elif args.local and args.nodes > 1:
+        result["server"] = {
+            "invocations": sum(node.invocations for node in nodes),
+            "bus": {node.bus.node_id: node.bus.stats for node in nodes},
+            "telemetry": {node.bus.node_id: node.telemetry.summary() for node in nodes},
+            **nodes[0].backend.stats(),
+        }
+        for node in nodes:
+            node.stop()
+        if broker is not None:
+            result["server"]["broker"] = broker.stats
+            broker.stop()
+    elif server is not None:
+        result["server"] = {"invocations": server.invocations, "telemetry": server.telemetry.summary(), **server.backend.stats()}
+        server.stop()
+
+    print_report(result)
+    if server is not None and hasattr(server, "telemetry"):
+        print("📈 Servidor: métricas por invocação (médias por ação)")
+        server.telemetry.print_report()
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 Resultado salvo em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
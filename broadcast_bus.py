@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Barramento de Broadcast - Broadcast de sala entre nós do servidor
+Usado por websocket_game_handler.py (broadcast_message) quando instalado em
+handler.broadcast_bus
+
+No Lambda o API Gateway alcança todas as conexões e o barramento não é usado.
+Num servidor próprio com vários nós (processos ou máquinas), cada nó só alcança
+as conexões cujos sockets ele mantém: um placar ou uma captura de bandeira
+precisa chegar aos jogadores da sala em todos os nós.
+
+Cada nó registra as conexões que entraram numa sala por ele. As mensagens
+publicadas durante um tick (uma invocação do handler) ficam num lote; no fim do
+tick o lote é entregue às conexões locais e enviado uma vez para cada outro
+nó, que entrega às suas. O custo entre nós é uma mensagem por nó por tick, não
+uma por jogador.
+
+Implementações:
+    InProcessBus - nós no mesmo processo, ligados por um InProcessHub
+    SocketBus    - nós em processos ou máquinas diferentes, ligados pelo BusBroker (TCP)
+
+Uso do broker:
+    python broadcast_bus.py [--host 127.0.0.1] [--port 8790]
+    python local_server.py --port 8765 --broker 127.0.0.1:8790
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import struct
+import threading
+import uuid
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Mensagem do lote: (sala, conexão excluída, JSON da mensagem)
+BusMessage = Tuple[str, Optional[str], str]
+
+FRAME_HEADER = struct.Struct("!I")  # Tamanho do lote em bytes
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+
+def encode_batch(node_id: str, batch: List[BusMessage]) -> bytes:
+    payload = json.dumps({"node": node_id, "messages": batch}).encode("utf-8")
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def decode_batch(payload: bytes) -> List[BusMessage]:
+    return [tuple(message) for message in json.loads(payload)["messages"]]
+
+
+class BroadcastBus:
+    """
+    Nó do barramento: conexões locais por sala, lote do tick e entrega local.
+    As subclasses definem como o lote chega aos outros nós (send_batch).
+    """
+
+    def __init__(self, sender: Callable[[str, str], bool], node_id: Optional[str] = None):
+        self.sender = sender  # (connection_id, data) -> bool, entrega às conexões deste nó
+        self.node_id = node_id or uuid.uuid4().hex[:8]
+        self.members = defaultdict(set)  # room_id -> conexões locais
+        self.connection_rooms = {}  # connection_id -> room_id
+        self.pending = []
+        self.lock = threading.Lock()
+        self.stats = {"published": 0, "batches_sent": 0, "batches_received": 0, "delivered": 0, "bytes_sent": 0}
+
+    def join(self, room_id: str, connection_id: str):
+        """Conexão deste nó entrou na sala (um novo join troca de sala)"""
+        with self.lock:
+            self._leave(connection_id)
+            self.members[room_id].add(connection_id)
+            self.connection_rooms[connection_id] = room_id
+
+    def leave(self, connection_id: str):
+        with self.lock:
+            self._leave(connection_id)
+
+    def _leave(self, connection_id):
+        room_id = self.connection_rooms.pop(connection_id, None)
+        if room_id is not None:
+            self.members[room_id].discard(connection_id)
+            if not self.members[room_id]:
+                del self.members[room_id]
+
+    def publish(self, room_id: str, message: Dict[str, Any], exclude_connection: Optional[str] = None):
+        """Guarda a mensagem no lote do tick (serializada uma vez para todos os nós)"""
+        data = json.dumps(message)
+        with self.lock:
+            self.pending.append((room_id, exclude_connection, data))
+            self.stats["published"] += 1
+
+    def flush(self):
+        """Fim do tick: entrega o lote às conexões locais e o envia aos outros nós"""
+        with self.lock:
+            batch, self.pending = self.pending, []
+        if not batch:
+            return
+        self.deliver(batch)
+        self.send_batch(batch)
+        self.stats["batches_sent"] += 1
+
+    def receive(self, batch: List[BusMessage]):
+        """Lote de outro nó"""
+        self.stats["batches_received"] += 1
+        self.deliver(batch)
+
+    def deliver(self, batch: List[BusMessage]):
+        """Entrega as mensagens às conexões locais das salas (as que falharem saem do registro)"""
+        for room_id, exclude_connection, data in batch:
+            with self.lock:
+                targets = [cid for cid in self.members.get(room_id, ()) if cid != exclude_connection]
+            for connection_id in targets:
+                if self.sender(connection_id, data):
+                    self.stats["delivered"] += 1
+                else:
+                    self.leave(connection_id)
+
+    def send_batch(self, batch: List[BusMessage]):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class InProcessHub:
+    """Liga os nós de um mesmo processo"""
+
+    def __init__(self):
+        self.nodes = []
+        self.lock = threading.Lock()
+
+    def attach(self, node: "InProcessBus"):
+        with self.lock:
+            self.nodes.append(node)
+
+    def detach(self, node: "InProcessBus"):
+        with self.lock:
+            if node in self.nodes:
+                self.nodes.remove(node)
+
+    def forward(self, origin: "InProcessBus", batch: List[BusMessage]):
+        with self.lock:
+            nodes = [node for node in self.nodes if node is not origin]
+        for node in nodes:
+            node.receive(batch)
+
+
+class InProcessBus(BroadcastBus):
+    """Nó ligado aos outros nós do processo por um InProcessHub (um hub próprio se nenhum for passado)"""
+
+    def __init__(self, sender: Callable[[str, str], bool], hub: Optional[InProcessHub] = None, node_id: Optional[str] = None):
+        super().__init__(sender, node_id)
+        self.hub = hub or InProcessHub()
+        self.hub.attach(self)
+
+    def send_batch(self, batch: List[BusMessage]):
+        self.hub.forward(self, batch)
+
+    def close(self):
+        self.hub.detach(self)
+
+
+class SocketBus(BroadcastBus):
+    """Nó ligado ao BusBroker por TCP; os lotes dos outros nós chegam numa thread de leitura"""
+
+    def __init__(self, sender: Callable[[str, str], bool], host: str = "127.0.0.1", port: int = 8790,
+                 node_id: Optional[str] = None):
+        super().__init__(sender, node_id)
+        self.sock = socket.create_connection((host, port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.send_lock = threading.Lock()
+        self.reader = threading.Thread(target=self._read_loop, daemon=True, name=f"bus-{self.node_id}")
+        self.reader.start()
+
+    def send_batch(self, batch: List[BusMessage]):
+        frame = encode_batch(self.node_id, batch)
+        try:
+            with self.send_lock:
+                self.sock.sendall(frame)
+            self.stats["bytes_sent"] += len(frame)
+        except OSError as e:
+            print(f"⚠️ Barramento: lote não enviado ao broker: {e}")
+
+    def _recv_exactly(self, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("Broker fechou a conexão")
+            data.extend(chunk)
+        return bytes(data)
+
+    def _read_loop(self):
+        try:
+            while True:
+                (length,) = FRAME_HEADER.unpack(self._recv_exactly(FRAME_HEADER.size))
+                self.receive(decode_batch(self._recv_exactly(length)))
+        except (ConnectionError, OSError):
+            pass
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class BusBroker:
+    """Broker TCP: repassa cada lote recebido, sem decodificar, uma vez para cada outro nó"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8790):
+        self.host = host
+        self.port = port
+        self.nodes = set()  # StreamWriters dos nós conectados
+        self.loop = None
+        self.server = None
+        self.ready = threading.Event()
+        self.stats = {"nodes": 0, "frames_in": 0, "frames_out": 0, "bytes_in": 0, "bytes_out": 0}
+
+    async def handle_node(self, reader, writer):
+        self.nodes.add(writer)
+        self.stats["nodes"] = len(self.nodes)
+        try:
+            while True:
+                header = await reader.readexactly(FRAME_HEADER.size)
+                (length,) = FRAME_HEADER.unpack(header)
+                if length > MAX_FRAME_SIZE:
+                    break
+                frame = header + await reader.readexactly(length)
+                self.stats["frames_in"] += 1
+                self.stats["bytes_in"] += len(frame)
+                for node in self.nodes:
+                    if node is not writer and not node.is_closing():
+                        node.write(frame)
+                        self.stats["frames_out"] += 1
+                        self.stats["bytes_out"] += len(frame)
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass  # Nó desconectou ou o broker foi parado
+        finally:
+            self.nodes.discard(writer)
+            self.stats["nodes"] = len(self.nodes)
+            writer.close()
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self.handle_node, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]  # Porta 0: o sistema escolhe
+        self.ready.set()
+        async with self.server:
+            try:
+                await self.server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+
+    def start_in_thread(self):
+        """Sobe o broker numa thread daemon e espera ele aceitar conexões"""
+        thread = threading.Thread(target=lambda: asyncio.run(self.serve()), daemon=True, name="bus-broker")
+        thread.start()
+        self.ready.wait()
+        return self
+
+    def stop(self):
+        if self.loop and self.server:
+            self.loop.call_soon_threadsafe(self.server.close)
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    """'host:porta' (ou só 'porta') -> (host, porta)"""
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Broker do barramento de broadcast entre nós do servidor")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8790)
+    args = parser.parse_args()
+
+    broker = BusBroker(args.host, args.port)
+    print(f"📡 Broker do barramento em {args.host}:{args.port}")
+    try:
+        asyncio.run(broker.serve())
+    except KeyboardInterrupt:
+        print("\n👋 Broker encerrado")
+        print(f"📊 {json.dumps(broker.stats)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Pool de Balas - Simulação vetorizada das balas no cliente (opcional, requer NumPy)
+Usado por game-client.py quando o NumPy está instalado
+
+As balas ficam em arrays contíguos (x, y, dx, dy, created_at), um por campo,
+em vez de um dict por bala. Cada passo avança, testa expiração, limites da tela
+e caixas (pela grade de ocupação) de todas as balas de uma vez. As regras são as
+mesmas de game_simulation.py (step_bullet, bullet_expired, bullet_out_of_bounds,
+bullet_hits_box).
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from game_simulation import BULLET_MAX_AGE, GAME_HEIGHT, GAME_WIDTH
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional: sem ele o cliente usa a lista de dicts
+    np = None
+
+HAS_NUMPY = np is not None
+
+INITIAL_CAPACITY = 256
+
+# Motivos de remoção retornados por BulletPool.step
+REMOVED_EXPIRED = "expired"
+REMOVED_OUT_OF_BOUNDS = "out_of_bounds"
+REMOVED_BOX = "box"
+
+
+class BulletPool:
+    """
+    Balas em estrutura de arrays (struct-of-arrays).
+    Os slots [0, count) estão ocupados; remoções movem o último slot para o
+    buraco (swap-remove), então os arrays nunca têm lacunas.
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        if not HAS_NUMPY:
+            raise RuntimeError("BulletPool requer NumPy (pip install numpy)")
+        self.count = 0
+        self.ids: List[Any] = []  # slot -> id da bala
+        self.slots: Dict[Any, int] = {}  # id da bala -> slot
+        self._allocate(capacity)
+        # Visão NumPy das células da grade de ocupação (recriada quando a grade muda)
+        self._grid = None
+        self._grid_cells = None
+
+    def _allocate(self, capacity: int):
+        old = self.count
+        fields = {}
+        for name in ("x", "y", "dx", "dy", "created_at"):
+            array = np.zeros(capacity, dtype=np.float64)
+            if old:
+                array[:old] = getattr(self, name)[:old]
+            fields[name] = array
+        owned = np.zeros(capacity, dtype=bool)
+        if old:
+            owned[:old] = self.owned[:old]
+        self.x, self.y = fields["x"], fields["y"]
+        self.dx, self.dy = fields["dx"], fields["dy"]
+        self.created_at = fields["created_at"]
+        self.owned = owned  # True para balas do jogador local
+        self.capacity = capacity
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, bullet_id) -> bool:
+        return bullet_id in self.slots
+
+    def clear(self):
+        self.count = 0
+        self.ids.clear()
+        self.slots.clear()
+
+    def add(self, bullet: Dict[str, Any], owned: bool = False):
+        """Adiciona (ou substitui) uma bala a partir do dict recebido do servidor"""
+        bullet_id = bullet["id"]
+        # Converte antes de ocupar o slot: um valor inválido não deixa o pool inconsistente
+        values = (float(bullet.get("x", 0)), float(bullet.get("y", 0)),
+                  float(bullet.get("dx", 0)), float(bullet.get("dy", 0)),
+                  float(bullet.get("created_at", 0)))
+        slot = self.slots.get(bullet_id)
+        if slot is None:
+            if self.count == self.capacity:
+                self._allocate(self.capacity * 2)
+            slot = self.count
+            self.count += 1
+            self.ids.append(bullet_id)
+            self.slots[bullet_id] = slot
+
+        self.x[slot], self.y[slot], self.dx[slot], self.dy[slot], self.created_at[slot] = values
+        self.owned[slot] = owned
+
+    def set_position(self, bullet_id, x, y):
+        """Atualiza a posição de uma bala (correção vinda do servidor)"""
+        slot = self.slots.get(bullet_id)
+        if slot is not None:
+            self.x[slot] = float(x)
+            self.y[slot] = float(y)
+
+    def position(self, bullet_id) -> Optional[Tuple[float, float]]:
+        slot = self.slots.get(bullet_id)
+        if slot is None:
+            return None
+        return float(self.x[slot]), float(self.y[slot])
+
+    def remove(self, bullet_id) -> bool:
+        """Remove uma bala movendo o último slot para o lugar dela"""
+        slot = self.slots.pop(bullet_id, None)
+        if slot is None:
+            return False
+
+        last = self.count - 1
+        if slot != last:
+            for array in (self.x, self.y, self.dx, self.dy, self.created_at, self.owned):
+                array[slot] = array[last]
+            moved_id = self.ids[last]
+            self.ids[slot] = moved_id
+            self.slots[moved_id] = slot
+        self.ids.pop()
+        self.count = last
+        return True
+
+    def _cells_for(self, grid):
+        """Visão NumPy (sem cópia) das células da grade de ocupação"""
+        if grid is not self._grid:
+            self._grid = grid
+            self._grid_cells = None
+            if grid is not None:
+                dtype = np.uint8 if isinstance(grid.cells, bytearray) else np.uint16
+                self._grid_cells = np.frombuffer(grid.cells, dtype=dtype)
+        return self._grid_cells
+
+    def step(self, now: float, grid=None) -> List[Tuple[Any, str, float, float]]:
+        """
+        Avança todas as balas um passo e remove as que expiraram, saíram da tela
+        ou atingiram uma caixa.
+        Retorna [(id, motivo, x, y)] das balas removidas (x, y = posição do impacto).
+        """
+        n = self.count
+        if n == 0:
+            return []
+
+        x = self.x[:n]
+        y = self.y[:n]
+        expired = (now - self.created_at[:n]) > BULLET_MAX_AGE
+
+        # Balas expiradas não andam (igual ao caminho por dicts)
+        moving = ~expired
+        new_x = np.where(moving, x + self.dx[:n], x)
+        new_y = np.where(moving, y + self.dy[:n], y)
+
+        out_of_bounds = moving & ((new_x < 0) | (new_x > GAME_WIDTH) | (new_y < 0) | (new_y > GAME_HEIGHT))
+
+        hit_box = np.zeros(n, dtype=bool)
+        cells = self._cells_for(grid)
+        if cells is not None:
+            # Mesmo critério de OccupancyGrid._index: fora da grade não há caixa
+            inside = moving & (new_x >= 0) & (new_y >= 0) & (new_x < grid.width) & (new_y < grid.height)
+            if inside.any():
+                cs = grid.cell_size
+                index = (new_y[inside].astype(np.int64) // cs) * grid.cols + new_x[inside].astype(np.int64) // cs
+                hit_box[inside] = cells[index] != 0
+
+        x[:] = new_x
+        y[:] = new_y
+
+        dead = expired | out_of_bounds | hit_box
+        if not dead.any():
+            return []
+
+        dead_slots = np.flatnonzero(dead)
+        removed = []
+        for slot in dead_slots.tolist():
+            if expired[slot]:
+                reason = REMOVED_EXPIRED
+            elif hit_box[slot]:
+                reason = REMOVED_BOX
+            else:
+                reason = REMOVED_OUT_OF_BOUNDS
+            removed.append((self.ids[slot], reason, float(x[slot]), float(y[slot])))
+
+        # Remove do maior slot para o menor, assim o swap-remove nunca move um slot ainda pendente
+        for slot in reversed(dead_slots.tolist()):
+            self.remove(self.ids[slot])
+        return removed
+
+    def owned_positions(self):
+        """Itera (id, x, y) das balas do jogador local"""
+        return self._positions(self.owned[:self.count])
+
+    def remote_positions(self):
+        """Itera (id, x, y) das balas dos outros jogadores"""
+        return self._positions(~self.owned[:self.count])
+
+    def _positions(self, mask):
+        slots = np.flatnonzero(mask)
+        if not len(slots):
+            return []
+        ids = self.ids
+        return [(ids[slot], x, y) for slot, x, y in zip(slots.tolist(), self.x[slots].tolist(), self.y[slots].tolist())]
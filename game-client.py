@@ -10,58 +10,198 @@ import websocket
 import json
 import time
 import threading
-import math
 from typing import Dict, List
 import uuid
 import sys
+import argparse
+from collections import OrderedDict, deque, namedtuple
 from dotenv import load_dotenv
 
+from bullet_pool import HAS_NUMPY, REMOVED_BOX, BulletPool
+from game_bots import BotController
+from game_input import KeyboardController, ScriptedController
+from game_map import MAP_CACHE_DIR, get_occupancy_grid, load_map
+from game_simulation import (
+    BASE_SIZE,
+    BOX_SIZE,
+    BULLET_SIZE,
+    BULLET_TICK,
+    FLAG_SIZE,
+    GAME_HEIGHT,
+    GAME_WIDTH,
+    PLAYER_SIZE,
+    PLAYER_SPEED,
+    RESPAWN_TIME,
+    TEAMS,
+    bullet_expired,
+    bullet_out_of_bounds,
+    flag_capture_error,
+    flag_home_position,
+    near_flag,
+    player_blocked,
+    step_bullet,
+    step_player,
+)
+
 load_dotenv()
 
-# Configurações do jogo
-SCREEN_WIDTH = 800
-SCREEN_HEIGHT = 600
-PLAYER_SIZE = 20
-PLAYER_SPEED = 5
-FPS = 60
-BULLET_SIZE = 5
-FLAG_SIZE = 30
-BASE_SIZE = 100
-BOX_SIZE = 40  # Tamanho das caixas de colisão
+# Configurações do jogo (regras e constantes compartilhadas vêm de game_simulation)
+SCREEN_WIDTH = GAME_WIDTH
+SCREEN_HEIGHT = GAME_HEIGHT
+FPS = 60  # Limite de frames renderizados
+
+# Simulação em passo fixo, independente do FPS de renderização
+SIMULATION_RATE = 60  # Passos de simulação por segundo
+SIMULATION_TICK = 1 / SIMULATION_RATE
+BULLET_STEP_TICKS = max(1, round(BULLET_TICK / SIMULATION_TICK))  # Passos de simulação por passo de bala
+MAX_FRAME_TIME = 0.25  # Frames mais longos que isso (janela arrastada, debugger) não são recuperados
+# Passos por frame: cobre um frame de até MAX_FRAME_TIME mais o resto do anterior, então a máquina lenta
+# (até 4 FPS) alcança o relógio em vez de rodar o jogo em câmera lenta
+MAX_SIMULATION_STEPS = int(MAX_FRAME_TIME * SIMULATION_RATE) + 1
+PREDICTION_BUFFER_SIZE = 120  # Entradas não confirmadas guardadas para reconciliação (~2s a 60 FPS)
+
+# Interpolação de entidades remotas (jogadores e balas de outros jogadores)
+INTERPOLATION_DELAY = float(os.getenv("INTERPOLATION_DELAY", "0.15"))  # Atraso de renderização (segundos)
+MAX_EXTRAPOLATION = float(os.getenv("MAX_EXTRAPOLATION", "0.2"))  # Extrapolação máxima sem snapshots novos
+SNAPSHOT_BUFFER_SIZE = 16  # Snapshots guardados por entidade
+
+# Fila de eventos de rede (thread do WebSocket -> loop do jogo)
+INBOUND_QUEUE_SIZE = 4096  # Eventos pendentes a partir dos quais as atualizações de posição são agrupadas
+# Eventos substituíveis (tipo -> campo da entidade): com a fila cheia só a última posição pendente de cada
+# entidade é aplicada. Os demais (estado, entradas e saídas, acertos, balas removidas, bandeiras, placar)
+# nunca são descartados
+REPLACEABLE_EVENTS = {"player_update": "player_id", "bullet_position_update": "bullet_id"}
+MAX_EVENTS_PER_FRAME = 512  # Limite de eventos aplicados por frame
+
+# Simulação vetorizada das balas (só com NumPy instalado; BULLET_POOL=0 desativa)
+BULLET_POOL_ENABLED = HAS_NUMPY and os.getenv("BULLET_POOL", "1") != "0"
+
+# Cache de textos renderizados (texto, fonte, cor) -> Surface
+TEXT_CACHE_SIZE = 256
 
 # 🔧 SUBSTITUA PELA SUA URL WEBSOCKET DA AWS
 WEBSOCKET_URL = os.getenv("WEBSOCKET_URL")
 
-# Times
-TEAMS = {
-    "red": {
-        "name": "Time Vermelho",
-        "color": [255, 100, 100],
-        "base_x": 50,
-        "base_y": SCREEN_HEIGHT // 2,
-        "flag_x": 50,
-        "flag_y": SCREEN_HEIGHT // 2,
-        "spawn_x": 100,
-        "spawn_y": SCREEN_HEIGHT // 2
-    },
-    "blue": {
-        "name": "Time Azul", 
-        "color": [100, 100, 255],
-        "base_x": SCREEN_WIDTH - 50,
-        "base_y": SCREEN_HEIGHT // 2,
-        "flag_x": SCREEN_WIDTH - 50,
-        "flag_y": SCREEN_HEIGHT // 2,
-        "spawn_x": SCREEN_WIDTH - 100,
-        "spawn_y": SCREEN_HEIGHT // 2
-    }
-}
+# Sala da partida (vazio = o lobby do servidor escolhe)
+GAME_ROOM = os.getenv("GAME_ROOM")
+
+
+# Evento de rede já decodificado na thread do WebSocket
+NetworkEvent = namedtuple("NetworkEvent", ["type", "data", "received_at"])
+
+
+class SnapshotBuffer:
+    """
+    Snapshots (tempo, x, y) de uma entidade remota.
+    A renderização amostra o buffer num instante no passado (agora - atraso),
+    interpolando entre os dois snapshots vizinhos; se os snapshots acabarem,
+    extrapola pela última velocidade por no máximo `max_extrapolation` segundos.
+    """
+
+    __slots__ = ("snapshots",)
+
+    def __init__(self, maxlen=SNAPSHOT_BUFFER_SIZE):
+        self.snapshots = deque(maxlen=maxlen)
+
+    def push(self, t, x, y):
+        """Adiciona um snapshot (snapshots fora de ordem são descartados)"""
+        if self.snapshots and t < self.snapshots[-1][0]:
+            return
+        self.snapshots.append((t, float(x), float(y)))
+
+    def reset(self, t, x, y):
+        """Descarta o histórico (teleporte, respawn) e começa do snapshot dado"""
+        self.snapshots.clear()
+        self.snapshots.append((t, float(x), float(y)))
+
+    def sample(self, render_time, max_extrapolation=MAX_EXTRAPOLATION):
+        """Retorna a posição (x, y) no instante render_time, ou None se não há snapshots"""
+        snapshots = self.snapshots
+        if not snapshots:
+            return None
+
+        first = snapshots[0]
+        if render_time <= first[0]:
+            return first[1], first[2]
+
+        # Procura o par de snapshots que envolve render_time (do mais novo para o mais antigo)
+        newer = snapshots[-1]
+        for i in range(len(snapshots) - 2, -1, -1):
+            older = snapshots[i]
+            if older[0] <= render_time <= newer[0]:
+                span = newer[0] - older[0]
+                alpha = (render_time - older[0]) / span if span > 0 else 1.0
+                return (older[1] + (newer[1] - older[1]) * alpha,
+                        older[2] + (newer[2] - older[2]) * alpha)
+            newer = older
+
+        # render_time depois do último snapshot: extrapolação curta
+        last = snapshots[-1]
+        if len(snapshots) >= 2:
+            previous = snapshots[-2]
+            span = last[0] - previous[0]
+            if span > 0:
+                ahead = min(render_time - last[0], max_extrapolation)
+                return (last[1] + (last[1] - previous[1]) / span * ahead,
+                        last[2] + (last[2] - previous[2]) / span * ahead)
+        return last[1], last[2]
+
+
+class TextCache:
+    """
+    Cache LRU de textos renderizados.
+    font.render é caro; a maior parte da interface repete os mesmos textos
+    frame após frame, então cada (texto, fonte, cor) é renderizado uma vez e
+    reaproveitado. Quando o cache enche, o texto usado há mais tempo sai.
+    """
+
+    __slots__ = ("surfaces", "maxsize", "hits", "misses")
+
+    def __init__(self, maxsize=TEXT_CACHE_SIZE):
+        self.surfaces = OrderedDict()
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, color):
+        """Retorna a Surface do texto, renderizando apenas se não estiver em cache"""
+        key = (text, id(font), tuple(color))
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.maxsize:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
 
 
 class MultiplayerGame:
-    def __init__(self):
-        pygame.init()
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame.display.set_caption("🎮 Jogo Multiplayer - Captura de Bandeira")
+    def __init__(self, headless=False, controller=None, room_id=None):
+        """
+        headless=True roda sem janela nem renderização (bots, testes de carga,
+        CI); a rede e a simulação continuam completas. `controller` fornece a
+        entrada de cada frame (padrão: teclado e mouse; parado no modo headless).
+        `room_id` escolhe a sala da partida (padrão: GAME_ROOM ou a escolhida pelo lobby).
+        """
+        self.headless = headless
+        self.room_id = room_id or GAME_ROOM
+        if controller is None:
+            controller = ScriptedController() if headless else KeyboardController()
+        self.controller = controller
+        if headless:
+            self.screen = None
+        else:
+            pygame.init()
+            self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+            pygame.display.set_caption("🎮 Jogo Multiplayer - Captura de Bandeira")
         self.clock = pygame.time.Clock()
 
         # Estado do jogador local
@@ -79,14 +219,21 @@ class MultiplayerGame:
         # Estado de outros jogadores
         self.other_players = {}
 
+        # Buffers de interpolação das entidades remotas (id -> SnapshotBuffer)
+        self.player_snapshots = {}
+        self.bullet_snapshots = {}
+
         # Estado do jogo
         self.flags = {
             "red": {"x": TEAMS["red"]["flag_x"], "y": TEAMS["red"]["flag_y"], "captured": False, "carrier": None},
             "blue": {"x": TEAMS["blue"]["flag_x"], "y": TEAMS["blue"]["flag_y"], "captured": False, "carrier": None}
         }
-        self.bullets = []
+        self.bullets = {}  # id -> bala (ordem de inserção preservada para o desenho)
+        self.bullet_pool = BulletPool() if BULLET_POOL_ENABLED else None  # Posições em arrays NumPy
         self.scores = {"red": 0, "blue": 0}
+        self.map_id = None  # Id do mapa atual (versão:seed:hash)
         self.collision_boxes = []  # Caixas de colisão
+        self.occupancy_grid = get_occupancy_grid(self.collision_boxes)  # Grade para consultas O(1)
         self.collision_effects = []  # Efeitos visuais de colisão
 
         # WebSocket
@@ -97,23 +244,60 @@ class MultiplayerGame:
         # Thread para WebSocket
         self.ws_thread = None
 
+        # Fila de eventos recebidos (produzida pela thread do WebSocket, consumida pelo loop)
+        # Com a fila cheia, posições pendentes da mesma entidade ocupam um slot só: [evento, chave]
+        self.inbound_events = deque()
+        self.coalesced_events = {}  # (tipo, id da entidade) -> slot na fila
+        self.inbound_lock = threading.Lock()
+        self.network_stats = self.new_network_stats()
+
         # Controle de envio de posição
         self.last_sent_position = {"x": -1, "y": -1}
         self.last_position_time = 0
-        self.position_send_interval = 1 / 60  # 60 updates por segundo (mais frequente para colisões)
+        self.position_send_interval = 1 / 10  # 10 updates por segundo (predição e interpolação cobrem o resto)
+
+        # Predição de movimento: entradas numeradas ainda não confirmadas pelo servidor
+        self.input_seq = 0
+        self.pending_inputs = deque(maxlen=PREDICTION_BUFFER_SIZE)  # (seq, move_x, move_y)
+
+        # Ordem de envio: toda ação sai com action_seq crescente (o servidor descarta updates atrasados)
+        self.action_seq = 0
 
         # Controle de tiro
         self.last_shot_time = 0
         self.shot_cooldown = 0.5  # 0.5 segundos entre tiros
 
-        # Controle de atualização de balas
-        self.last_bullet_update_time = 0
-        self.bullet_update_interval = 1 / 30  # 30 updates por segundo (mais frequente para colisões)
-
-        # Interface
-        self.font = pygame.font.Font(None, 24)
-        self.big_font = pygame.font.Font(None, 36)
-        self.small_font = pygame.font.Font(None, 18)
+        # Simulação em passo fixo
+        self.simulation_tick = 0
+        self.simulation_accumulator = 0.0
+        self.render_alpha = 1.0  # Fração do próximo passo já decorrida (interpolação do desenho)
+        self.move_input = (0, 0)  # Direção lida no frame, aplicada a cada passo
+        self.previous_local_position = (self.local_player["x"], self.local_player["y"])
+        self.last_frame_time = time.perf_counter()
+
+        # Ping periódico
+        self.last_ping_time = 0
+        self.ping_interval = 30  # 30 segundos
+
+        # Atualizações de balas próprias, agrupadas e enviadas uma vez por frame
+        self.outgoing_bullet_updates = {}  # id -> (x, y)
+
+        # Renderização: camada estática em cache + atualização por retângulos sujos
+        self.static_layer_cache_enabled = True
+        self.static_layer = None
+        self.static_layer_key = None
+        self.full_redraw = True
+        self.previous_dirty_rects = []
+        self.frame_dirty_rects = []
+
+        # Interface (sem fontes no modo headless)
+        if headless:
+            self.font = self.big_font = self.small_font = None
+        else:
+            self.font = pygame.font.Font(None, 24)
+            self.big_font = pygame.font.Font(None, 36)
+            self.small_font = pygame.font.Font(None, 18)
+        self.text_cache = TextCache()
 
         # Estado do jogo
         self.game_started = False
@@ -133,10 +317,76 @@ class MultiplayerGame:
             return [255, 255, 255]  # Branco padrão em caso de erro
 
     def on_websocket_message(self, ws, message):
-        """Processa mensagens recebidas via WebSocket"""
+        """
+        Recebe mensagens na thread do WebSocket.
+        Apenas decodifica e enfileira; o estado do jogo só é alterado pelo loop principal.
+        """
         try:
             data = json.loads(message)
-            msg_type = data.get("type")
+        except ValueError as e:
+            print(f"❌ Mensagem inválida recebida: {e}")
+            return
+
+        event = NetworkEvent(data.get("type"), data, time.monotonic())
+        key_field = REPLACEABLE_EVENTS.get(event.type)
+        with self.inbound_lock:
+            if key_field is None or len(self.inbound_events) < INBOUND_QUEUE_SIZE:
+                if key_field is None:
+                    # Posições que chegarem depois não passam à frente deste evento
+                    self.coalesced_events.clear()
+                self.inbound_events.append(event)
+                return
+            # Fila cheia: a posição substitui a pendente da mesma entidade (ou ocupa um slot novo)
+            key = (event.type, data.get(key_field))
+            slot = self.coalesced_events.get(key)
+            if slot is not None:
+                slot[0] = event
+                self.network_stats["coalesced"] += 1
+            else:
+                slot = self.coalesced_events[key] = [event, key]
+                self.inbound_events.append(slot)
+
+    @staticmethod
+    def new_network_stats():
+        return {"events": 0, "frames": 0, "apply_time": 0.0, "max_frame_time": 0.0, "coalesced": 0}
+
+    def take_network_stats(self):
+        """Estatísticas de rede desde a última chamada (troca sob o lock: a thread do WebSocket também conta)"""
+        with self.inbound_lock:
+            stats, self.network_stats = self.network_stats, self.new_network_stats()
+        return stats
+
+    def process_network_events(self):
+        """Drena a fila de eventos de rede e aplica ao estado do jogo (uma vez por frame)"""
+        start = time.perf_counter()
+        applied = 0
+        while applied < MAX_EVENTS_PER_FRAME:
+            with self.inbound_lock:
+                if not self.inbound_events:
+                    break
+                event = self.inbound_events.popleft()
+                if isinstance(event, list):
+                    if self.coalesced_events.get(event[1]) is event:
+                        del self.coalesced_events[event[1]]
+                    event = event[0]
+            self.apply_network_event(event)
+            applied += 1
+
+        if applied:
+            elapsed = time.perf_counter() - start
+            with self.inbound_lock:
+                stats = self.network_stats
+                stats["events"] += applied
+                stats["frames"] += 1
+                stats["apply_time"] += elapsed
+                stats["max_frame_time"] = max(stats["max_frame_time"], elapsed)
+
+    def apply_network_event(self, event):
+        """Aplica um evento de rede ao estado do jogo"""
+        try:
+            data = event.data
+            msg_type = event.type
+            received_at = event.received_at
             
             print(f"📨 Cliente recebeu: {msg_type}")
             if msg_type == "game_state":
@@ -147,14 +397,18 @@ class MultiplayerGame:
                     print(f"   player {pid} keys: {list(player_data.keys())}")
                 
                 # Atualiza estado do jogo
+                self.room_id = data.get("room_id", self.room_id)
                 self.flags = data.get("flags", self.flags)
-                self.bullets = data.get("bullets", [])
+                self.set_bullets(data.get("bullets", []))
                 self.scores = data.get("scores", self.scores)
-                self.collision_boxes = data.get("collision_boxes", [])
-                print(f"📦 Caixas de colisão recebidas: {len(self.collision_boxes)}")
-                # Log detalhado das caixas recebidas
-                for i, box in enumerate(self.collision_boxes):
-                    print(f"   Caixa {i}: {box.get('id', 'sem_id')} em ({box.get('x', 0)}, {box.get('y', 0)})")
+                if data.get("map_id"):
+                    self.load_map_geometry(data["map_id"])
+                elif "collision_boxes" in data:
+                    # Servidor antigo: geometria completa no snapshot
+                    self.collision_boxes = data["collision_boxes"]
+                    self.occupancy_grid = get_occupancy_grid(self.collision_boxes)
+                    self.map_id = None
+                    self.invalidate_static_layer()
 
             if msg_type == "player_joined":
                 if "player_data" in data:
@@ -174,6 +428,7 @@ class MultiplayerGame:
                     self.local_player["x"] = player_data["x"]
                     self.local_player["y"] = player_data["y"]
                     self.local_player["hp"] = player_data["hp"]
+                    self.pending_inputs.clear()
                     self.game_started = True
                     print(f"✅ Você entrou no jogo! Time: {player_data['team']} - Player ID: {self.player_id}")
                 else:
@@ -187,6 +442,7 @@ class MultiplayerGame:
                             "color": self.convert_color(data["color"]),
                             "hp": 100  # HP padrão para novos jogadores
                         }
+                        self.push_snapshot(self.player_snapshots, player_id, data["x"], data["y"], received_at, reset=True)
                         print(f"👋 Jogador {player_id} entrou no jogo (Time {data['team']})")
 
             elif msg_type == "player_left":
@@ -197,6 +453,7 @@ class MultiplayerGame:
                         print(f"👋 Jogador {player_id} saiu do jogo")
                     except KeyError:
                         pass
+                self.player_snapshots.pop(player_id, None)
 
             elif msg_type == "player_update":
                 player_id = data["player_id"]
@@ -222,6 +479,7 @@ class MultiplayerGame:
                                 "color": self.convert_color(data["color"]),
                                 "hp": 100
                             }
+                        self.push_snapshot(self.player_snapshots, player_id, data["x"], data["y"], received_at)
                     except (ValueError, TypeError) as e:
                         print(f"❌ Erro ao processar update do jogador {player_id}: {e}")
 
@@ -235,7 +493,7 @@ class MultiplayerGame:
                     self.local_player["hp"] = new_hp
                     if new_hp <= 0:
                         self.dead = True
-                        self.respawn_timer = 5
+                        self.respawn_timer = RESPAWN_TIME
                         print(f"💀 Você foi morto por {shooter_id}!")
                     else:
                         print(f"💥 Você foi atingido! HP: {new_hp}")
@@ -263,6 +521,7 @@ class MultiplayerGame:
                     self.local_player["hp"] = data["hp"]
                     self.local_player["x"] = data["x"]
                     self.local_player["y"] = data["y"]
+                    self.pending_inputs.clear()
                     self.dead = False
                     self.respawn_timer = 0
                     print("🔄 Você respawnou!")
@@ -271,21 +530,28 @@ class MultiplayerGame:
                         self.other_players[player_id]["hp"] = data["hp"]
                         self.other_players[player_id]["x"] = data["x"]
                         self.other_players[player_id]["y"] = data["y"]
+                        self.push_snapshot(self.player_snapshots, player_id, data["x"], data["y"], received_at, reset=True)
                         print(f"🔄 {player_id} respawnou!")
 
+            elif msg_type == "position_correction":
+                if data.get("player_id") in (None, self.player_id):
+                    self.reconcile_position(data.get("seq"), data["x"], data["y"])
+
             elif msg_type == "bullet_shot":
                 bullet = data["bullet"]
                 # Verifica se a bala já existe para evitar duplicatas
-                bullet_exists = any(b.get("id") == bullet["id"] for b in self.bullets)
-                if not bullet_exists:
-                    self.bullets.append(bullet)
+                if bullet["id"] not in self.bullets:
+                    self.bullets[bullet["id"]] = bullet
+                    self.add_to_bullet_pool(bullet)
+                    if bullet.get("shooter_id") != self.player_id:
+                        self.push_snapshot(self.bullet_snapshots, bullet["id"], bullet["x"], bullet["y"], received_at, reset=True)
                     print(f"🔫 {bullet['shooter_id']} atirou! Bala {bullet['id']} adicionada")
                     print(f"   📊 Total de balas: {len(self.bullets)}")
                 else:
                     print(f"⚠️ Bala {bullet['id']} já existe, ignorando duplicata")
 
             elif msg_type == "bullets_update":
-                self.bullets = data["bullets"]
+                self.set_bullets(data["bullets"])
 
             elif msg_type == "bullet_position_update":
                 bullet_id = data["bullet_id"]
@@ -293,20 +559,22 @@ class MultiplayerGame:
                 y = data["y"]
                 
                 # Atualiza posição da bala
-                for bullet in self.bullets:
-                    if bullet["id"] == bullet_id:
-                        bullet["x"] = x
-                        bullet["y"] = y
-                        break
+                bullet = self.bullets.get(bullet_id)
+                if bullet is not None:
+                    bullet["x"] = x
+                    bullet["y"] = y
+                    self.push_snapshot(self.bullet_snapshots, bullet_id, x, y, received_at)
+                    if self.bullet_pool is not None:
+                        self.bullet_pool.set_position(bullet_id, x, y)
 
             elif msg_type == "bullet_removed":
                 bullet_id = data["bullet_id"]
                 
                 # Remove a bala
-                for bullet in self.bullets:
-                    if bullet["id"] == bullet_id:
-                        self.bullets.remove(bullet)
-                        break
+                self.bullets.pop(bullet_id, None)
+                if self.bullet_pool is not None:
+                    self.bullet_pool.remove(bullet_id)
+                self.bullet_snapshots.pop(bullet_id, None)
 
             elif msg_type == "flag_captured":
                 flag_team = data["flag_team"]
@@ -341,8 +609,7 @@ class MultiplayerGame:
                 # Reseta bandeiras
                 self.flags[flag_team]["captured"] = False
                 self.flags[flag_team]["carrier"] = None
-                self.flags[flag_team]["x"] = TEAMS[flag_team]["flag_x"]
-                self.flags[flag_team]["y"] = TEAMS[flag_team]["flag_y"]
+                self.flags[flag_team]["x"], self.flags[flag_team]["y"] = flag_home_position(flag_team)
                 
                 if self.local_player["carrying_flag"] == flag_team:
                     self.local_player["carrying_flag"] = None
@@ -362,6 +629,7 @@ class MultiplayerGame:
                                 "color": self.convert_color(player_data.get("color", [255, 255, 255])),
                                 "hp": player_data.get("hp", 100)
                             }
+                            self.push_snapshot(self.player_snapshots, pid, player_data.get("x", 0), player_data.get("y", 0), received_at)
                         except (ValueError, TypeError) as e:
                             print(f"❌ Erro ao processar dados do jogador {pid}: {e}")
 
@@ -369,12 +637,19 @@ class MultiplayerGame:
                 self.flags = data.get("flags", self.flags)
                 new_bullets = data.get("bullets", [])
                 old_count = len(self.bullets)
-                self.bullets = new_bullets
+                self.set_bullets(new_bullets)
+                self.bullet_snapshots.clear()
                 new_count = len(self.bullets)
                 if new_count != old_count:
                     print(f"📊 Estado do jogo: balas {old_count} -> {new_count}")
                 self.scores = data.get("scores", {"red": 0, "blue": 0})
 
+            elif msg_type == "game_reset":
+                self.scores = data.get("scores", {"red": 0, "blue": 0})
+                if data.get("map_id"):
+                    self.load_map_geometry(data["map_id"])
+                print("🔄 Jogo resetado pelo servidor")
+
             elif msg_type == "error":
                 print(f"❌ Erro do servidor: {data.get('message', 'Erro desconhecido')}")
 
@@ -385,6 +660,76 @@ class MultiplayerGame:
         except Exception as e:
             print(f"❌ Erro ao processar mensagem: {e}")
 
+    def load_map_geometry(self, map_id):
+        """Carrega as caixas de colisão do mapa pelo id (cache local ou regeneração pela seed)"""
+        if map_id == self.map_id:
+            return
+
+        try:
+            self.collision_boxes = load_map(map_id, cache_dir=MAP_CACHE_DIR)
+            self.occupancy_grid = get_occupancy_grid(self.collision_boxes)
+            self.map_id = map_id
+            self.invalidate_static_layer()
+            print(f"🗺️ Mapa {map_id} carregado: {len(self.collision_boxes)} caixas de colisão")
+        except ValueError as e:
+            print(f"❌ Erro ao carregar mapa {map_id}: {e}")
+
+    def set_bullets(self, bullets):
+        """Substitui todas as balas a partir da lista recebida do servidor"""
+        self.bullets = {bullet["id"]: bullet for bullet in bullets if "id" in bullet}
+        if self.bullet_pool is not None:
+            self.bullet_pool.clear()
+            for bullet in self.bullets.values():
+                self.add_to_bullet_pool(bullet)
+
+    def add_to_bullet_pool(self, bullet):
+        """Registra a bala no pool vetorizado (quando ativo)"""
+        if self.bullet_pool is None:
+            return
+        try:
+            self.bullet_pool.add(bullet, owned=bullet.get("shooter_id") == self.player_id)
+        except (ValueError, TypeError) as e:
+            print(f"❌ Erro ao adicionar bala {bullet.get('id')} ao pool: {e}")
+
+    def push_snapshot(self, buffers, entity_id, x, y, received_at, reset=False):
+        """Registra a posição recebida de uma entidade remota no seu buffer de interpolação"""
+        try:
+            buffer = buffers.get(entity_id)
+            if buffer is None:
+                buffer = buffers[entity_id] = SnapshotBuffer()
+            if reset:
+                buffer.reset(received_at, x, y)
+            else:
+                buffer.push(received_at, x, y)
+        except (ValueError, TypeError) as e:
+            print(f"❌ Erro ao registrar snapshot de {entity_id}: {e}")
+
+    def render_position(self, buffers, entity_id, x, y, render_time):
+        """Posição de renderização da entidade remota (interpolada), ou (x, y) se não há snapshots"""
+        buffer = buffers.get(entity_id)
+        if buffer is not None:
+            sampled = buffer.sample(render_time)
+            if sampled is not None:
+                return int(sampled[0]), int(sampled[1])
+        return int(float(x)), int(float(y))
+
+    def reconcile_position(self, acked_seq, x, y):
+        """Aplica a posição autoritativa do servidor e reaplica as entradas ainda não confirmadas"""
+        if acked_seq is None:
+            self.pending_inputs.clear()
+        else:
+            while self.pending_inputs and self.pending_inputs[0][0] <= acked_seq:
+                self.pending_inputs.popleft()
+
+        x, y = float(x), float(y)
+        for _, move_x, move_y in self.pending_inputs:
+            x, y = step_player(x, y, move_x, move_y, self.occupancy_grid)
+
+        self.local_player["x"] = x
+        self.local_player["y"] = y
+        self.last_sent_position = {"x": -1, "y": -1}  # Força reenvio da posição reconciliada
+        print(f"🔁 Posição reconciliada (seq {acked_seq}): ({x:.1f}, {y:.1f}) - {len(self.pending_inputs)} entradas reaplicadas")
+
     def on_websocket_error(self, ws, error):
         """Trata erros do WebSocket"""
         print(f"❌ Erro WebSocket: {error}")
@@ -408,7 +753,9 @@ class MultiplayerGame:
             "x": self.local_player["x"], 
             "y": self.local_player["y"]
         }
-        ws.send(json.dumps(join_message))
+        if self.room_id:
+            join_message["room_id"] = self.room_id
+        self.send_action(join_message, ws)
         print(f"🎮 Enviando join sem especificar time - servidor vai balancear")
 
     def connect_websocket(self):
@@ -443,6 +790,12 @@ class MultiplayerGame:
             print(f"❌ Erro ao conectar WebSocket: {e}")
             return False
 
+    def send_action(self, message, ws=None):
+        """Envia uma ação com o próximo action_seq"""
+        self.action_seq += 1
+        message["action_seq"] = self.action_seq
+        (ws or self.ws).send(json.dumps(message))
+
     def send_position_update(self):
         """Envia atualização de posição se necessário"""
         if not self.connected or not self.ws or self.dead:
@@ -461,9 +814,10 @@ class MultiplayerGame:
                     "action": "update", 
                     "player_id": self.player_id, 
                     "x": self.local_player["x"], 
-                    "y": self.local_player["y"]
+                    "y": self.local_player["y"],
+                    "seq": self.input_seq
                 }
-                self.ws.send(json.dumps(message))
+                self.send_action(message)
 
                 self.last_sent_position = current_pos.copy()
                 self.last_position_time = current_time
@@ -474,7 +828,8 @@ class MultiplayerGame:
     def send_shot(self, target_x, target_y):
         """Envia tiro"""
         print(f"🔫 send_shot() chamada - target=({target_x}, {target_y})")
-        print(f"   🖱️ Mouse position: {pygame.mouse.get_pos()}")
+        if not self.headless:
+            print(f"   🖱️ Mouse position: {pygame.mouse.get_pos()}")
         print(f"   🎮 Player position: ({self.local_player['x']}, {self.local_player['y']})")
         print(f"   🔌 Connected: {self.connected}, Dead: {self.dead}")
         
@@ -497,7 +852,7 @@ class MultiplayerGame:
                 "player_y": self.local_player["y"]
             }
             print(f"   📤 Enviando tiro: {message}")
-            self.ws.send(json.dumps(message))
+            self.send_action(message)
             self.last_shot_time = current_time
             print(f"   ✅ Tiro enviado com sucesso")
 
@@ -515,7 +870,7 @@ class MultiplayerGame:
                 "player_id": self.player_id,
                 "flag_team": flag_team
             }
-            self.ws.send(json.dumps(message))
+            self.send_action(message)
 
         except Exception as e:
             print(f"❌ Erro ao capturar bandeira: {e}")
@@ -532,7 +887,7 @@ class MultiplayerGame:
                 "x": self.local_player["x"],
                 "y": self.local_player["y"]
             }
-            self.ws.send(json.dumps(message))
+            self.send_action(message)
 
         except Exception as e:
             print(f"❌ Erro ao soltar bandeira: {e}")
@@ -547,7 +902,7 @@ class MultiplayerGame:
                 "action": "respawn",
                 "player_id": self.player_id
             }
-            self.ws.send(json.dumps(message))
+            self.send_action(message)
 
         except Exception as e:
             print(f"❌ Erro ao respawnar: {e}")
@@ -559,7 +914,7 @@ class MultiplayerGame:
 
         try:
             message = {"action": "ping", "timestamp": int(time.time())}
-            self.ws.send(json.dumps(message))
+            self.send_action(message)
         except Exception as e:
             print(f"❌ Erro ao enviar ping: {e}")
 
@@ -567,54 +922,72 @@ class MultiplayerGame:
 
     def check_bullet_box_collision(self, bullet_x, bullet_y):
         """Verifica se uma bala colide com alguma caixa"""
-        for box in self.collision_boxes:
-            try:
-                box_x = int(box.get("x", 0))
-                box_y = int(box.get("y", 0))
-                box_size = int(box.get("size", BOX_SIZE))
-                
-                # Verifica se a bala está dentro da caixa
-                if (bullet_x >= box_x - box_size // 2 and 
-                    bullet_x <= box_x + box_size // 2 and
-                    bullet_y >= box_y - box_size // 2 and 
-                    bullet_y <= box_y + box_size // 2):
-                    return True  # Há colisão
-                    
-            except (ValueError, TypeError) as e:
-                print(f"❌ Erro ao verificar colisão de bala com caixa {box.get('id')}: {e}")
-                continue
-                
-        return False  # Não há colisão
+        return self.occupancy_grid.point_blocked(bullet_x, bullet_y)
 
     def update_bullets(self):
-        """Atualiza posição das balas e verifica colisões"""
+        """Avança as balas um passo de bala (chamado pela simulação a cada BULLET_STEP_TICKS passos) e verifica colisões"""
         if not self.connected or not self.ws:
             return
 
         current_time = time.time()
-        if current_time - self.last_bullet_update_time < self.bullet_update_interval:
-            return
+        if self.bullet_pool is not None:
+            self.step_bullet_pool(current_time)
+        else:
+            self.step_bullet_dicts(current_time)
+
+        # Remove efeitos de colisão expirados
+        self.collision_effects = [effect for effect in self.collision_effects 
+                                 if current_time - effect["start_time"] < effect["duration"]]
 
+    def step_bullet_pool(self, current_time):
+        """Avança as balas pelo pool vetorizado e aplica as remoções"""
+        for bullet_id, reason, x, y in self.bullet_pool.step(current_time, self.occupancy_grid):
+            if reason == REMOVED_BOX:
+                print(f"📦 Colisão local detectada! Bala {bullet_id} atingiu caixa")
+                self.collision_effects.append({
+                    "x": x,
+                    "y": y,
+                    "start_time": current_time,
+                    "duration": 0.5  # 0.5 segundos
+                })
+            self.bullet_snapshots.pop(bullet_id, None)
+            if self.bullets.pop(bullet_id, None) is not None:
+                print(f"🗑️ Bala {bullet_id} removida localmente")
+
+        # As posições voltam para os dicts como no caminho por dicts: as próprias são enviadas ao servidor,
+        # e as remotas sem snapshots (ex.: vindas do game_state) são desenhadas por elas
+        for bullet_id, x, y in self.bullet_pool.owned_positions():
+            bullet = self.bullets.get(bullet_id)
+            if bullet is not None:
+                bullet["x"] = x
+                bullet["y"] = y
+                self.queue_bullet_update(bullet_id, x, y)
+        for bullet_id, x, y in self.bullet_pool.remote_positions():
+            bullet = self.bullets.get(bullet_id)
+            if bullet is not None:
+                bullet["x"] = x
+                bullet["y"] = y
+
+    def step_bullet_dicts(self, current_time):
+        """Avança as balas uma a uma (caminho sem NumPy)"""
         bullets_to_remove = []
         
-        for bullet in self.bullets:
+        for bullet in self.bullets.values():
             try:
                 # Converte valores para float
                 x = float(bullet.get("x", 0))
                 y = float(bullet.get("y", 0))
                 dx = float(bullet.get("dx", 0))
                 dy = float(bullet.get("dy", 0))
-                speed = float(bullet.get("speed", 10))
                 created_at = float(bullet.get("created_at", 0))
                 
-                # Verifica se a bala expirou (mais de 30 segundos)
-                if current_time - created_at > 30:
+                # Verifica se a bala expirou
+                if bullet_expired(created_at, current_time):
                     bullets_to_remove.append(bullet)
                     continue
                 
-                # Calcula nova posição (velocidade fixa de 5 pixels por frame)
-                new_x = x + dx * 5
-                new_y = y + dy * 5
+                # Calcula nova posição (um passo de bala da simulação compartilhada)
+                new_x, new_y = step_bullet(x, y, dx, dy)
                 
                 # Verifica colisão com caixas localmente
                 if self.check_bullet_box_collision(new_x, new_y):
@@ -630,8 +1003,7 @@ class MultiplayerGame:
                     continue
                 
                 # Verifica se saiu da tela
-                if (new_x < -BULLET_SIZE or new_x > SCREEN_WIDTH + BULLET_SIZE or 
-                    new_y < -BULLET_SIZE or new_y > SCREEN_HEIGHT + BULLET_SIZE):
+                if bullet_out_of_bounds(new_x, new_y):
                     bullets_to_remove.append(bullet)
                     continue
                 
@@ -640,7 +1012,7 @@ class MultiplayerGame:
                 bullet["y"] = new_y
                 
                 # Envia atualização para o servidor
-                self.send_bullet_update(bullet["id"], new_x, new_y)
+                self.queue_bullet_update(bullet["id"], new_x, new_y)
                 
             except (ValueError, TypeError) as e:
                 print(f"❌ Erro ao atualizar bala {bullet.get('id')}: {e}")
@@ -648,17 +1020,23 @@ class MultiplayerGame:
         
         # Remove balas que colidiram ou expiraram
         for bullet in bullets_to_remove:
-            try:
-                self.bullets.remove(bullet)
-                print(f"🗑️ Bala {bullet['id']} removida localmente")
-            except ValueError:
-                pass  # Bala já foi removida
-        
-        self.last_bullet_update_time = current_time
-        
-        # Remove efeitos de colisão expirados
-        self.collision_effects = [effect for effect in self.collision_effects 
-                                 if current_time - effect["start_time"] < effect["duration"]]
+            bullet_id = bullet.get("id")
+            self.bullet_snapshots.pop(bullet_id, None)
+            if self.bullets.pop(bullet_id, None) is not None:
+                print(f"🗑️ Bala {bullet_id} removida localmente")
+
+    def queue_bullet_update(self, bullet_id, x, y):
+        """Guarda a posição da bala para envio no fim do frame (só a mais recente é enviada)"""
+        self.outgoing_bullet_updates[bullet_id] = (x, y)
+
+    def flush_bullet_updates(self):
+        """Envia as atualizações de balas acumuladas nos passos deste frame"""
+        if not self.outgoing_bullet_updates:
+            return
+        updates = self.outgoing_bullet_updates
+        self.outgoing_bullet_updates = {}
+        for bullet_id, (x, y) in updates.items():
+            self.send_bullet_update(bullet_id, x, y)
 
     def send_bullet_update(self, bullet_id, x, y):
         """Envia atualização de posição de bala para o servidor"""
@@ -666,148 +1044,143 @@ class MultiplayerGame:
             return
 
         # Só envia atualizações para balas do jogador local
-        for bullet in self.bullets:
-            if bullet["id"] == bullet_id and bullet.get("shooter_id") == self.player_id:
-                try:
-                    message = {
-                        "action": "bullet_update",
-                        "bullet_id": bullet_id,
-                        "x": x,
-                        "y": y,
-                        "shooter_id": self.player_id
-                    }
-                    self.ws.send(json.dumps(message))
-                except Exception as e:
-                    print(f"❌ Erro ao enviar atualização de bala: {e}")
-                break
+        bullet = self.bullets.get(bullet_id)
+        if bullet is None or bullet.get("shooter_id") != self.player_id:
+            return
+
+        try:
+            message = {
+                "action": "bullet_update",
+                "bullet_id": bullet_id,
+                "x": x,
+                "y": y,
+                "shooter_id": self.player_id
+            }
+            self.send_action(message)
+        except Exception as e:
+            print(f"❌ Erro ao enviar atualização de bala: {e}")
 
     def check_box_collision(self, new_x, new_y):
         """Verifica se a nova posição colide com alguma caixa"""
-        player_radius = PLAYER_SIZE
-        
-        for box in self.collision_boxes:
-            try:
-                box_x = int(box.get("x", 0))
-                box_y = int(box.get("y", 0))
-                box_size = int(box.get("size", BOX_SIZE))
-                
-                # Calcula a distância entre o centro do jogador e o centro da caixa
-                dx = new_x - box_x
-                dy = new_y - box_y
-                distance = math.sqrt(dx*dx + dy*dy)
-                
-                # Se a distância for menor que a soma dos raios, há colisão
-                min_distance = player_radius + box_size // 2
-                if distance < min_distance:
-                    return True  # Há colisão
-                    
-            except (ValueError, TypeError) as e:
-                print(f"❌ Erro ao verificar colisão com caixa {box.get('id')}: {e}")
-                continue
-                
-        return False  # Não há colisão
+        return player_blocked(self.occupancy_grid, new_x, new_y)
 
     def handle_input(self):
-        """Processa entrada do usuário"""
-        keys = pygame.key.get_pressed()
+        """
+        Processa a entrada do controle (uma vez por frame).
+        Ações (tiro, bandeira, respawn) são enviadas aqui; a direção do
+        movimento fica em move_input e é aplicada a cada passo de simulação.
+        """
+        control = self.controller.poll(self)
         
         if self.dead:
-            if keys[pygame.K_r]:
+            self.move_input = (0, 0)
+            if control.respawn:
                 self.send_respawn()
             return
 
-        # Movimento
-        dx = 0
-        dy = 0
-        
-        if keys[pygame.K_w] or keys[pygame.K_UP]:
-            dy -= PLAYER_SPEED
-        if keys[pygame.K_s] or keys[pygame.K_DOWN]:
-            dy += PLAYER_SPEED
-        if keys[pygame.K_a] or keys[pygame.K_LEFT]:
-            dx -= PLAYER_SPEED
-        if keys[pygame.K_d] or keys[pygame.K_RIGHT]:
-            dx += PLAYER_SPEED
-
-        # Normaliza movimento diagonal
-        if dx != 0 and dy != 0:
-            dx *= 0.707
-            dy *= 0.707
-
-        # Calcula nova posição
-        new_x = max(0, min(SCREEN_WIDTH - PLAYER_SIZE, self.local_player["x"] + dx))
-        new_y = max(0, min(SCREEN_HEIGHT - PLAYER_SIZE, self.local_player["y"] + dy))
-        
-        # Verifica colisão com caixas
-        if not self.check_box_collision(new_x, new_y):
-            # Se não há colisão, atualiza a posição
-            self.local_player["x"] = new_x
-            self.local_player["y"] = new_y
-        else:
-            # Se há colisão, tenta movimento apenas no eixo X ou Y
-            if dx != 0:
-                # Tenta movimento apenas no eixo X
-                test_x = max(0, min(SCREEN_WIDTH - PLAYER_SIZE, self.local_player["x"] + dx))
-                if not self.check_box_collision(test_x, self.local_player["y"]):
-                    self.local_player["x"] = test_x
-            
-            if dy != 0:
-                # Tenta movimento apenas no eixo Y
-                test_y = max(0, min(SCREEN_HEIGHT - PLAYER_SIZE, self.local_player["y"] + dy))
-                if not self.check_box_collision(self.local_player["x"], test_y):
-                    self.local_player["y"] = test_y
-
-        # Tiro com clique do mouse - Versão melhorada
-        mouse_buttons = pygame.mouse.get_pressed()
-        if mouse_buttons[0]:  # Botão esquerdo
-            mouse_x, mouse_y = pygame.mouse.get_pos()
-            # Verifica se as coordenadas são válidas
-            if 0 <= mouse_x <= SCREEN_WIDTH and 0 <= mouse_y <= SCREEN_HEIGHT:
-                self.send_shot(mouse_x, mouse_y)
-            else:
-                print(f"⚠️ Coordenadas do mouse inválidas: ({mouse_x}, {mouse_y})")
+        # Movimento (direção da entrada; o passo é da simulação compartilhada)
+        self.move_input = (control.move_x, control.move_y)
+
+        # Tiro
+        if control.shoot_at is not None:
+            self.send_shot(control.shoot_at[0], control.shoot_at[1])
 
-        # Captura de bandeira com E
-        if keys[pygame.K_e]:
+        # Captura de bandeira
+        if control.capture_flag:
             self.try_capture_flag()
 
-        # Solta bandeira com Q
-        if keys[pygame.K_q]:
+        # Solta bandeira
+        if control.drop_flag:
             if self.local_player["carrying_flag"]:
                 self.send_drop_flag()
 
+    def simulation_step(self):
+        """Avança a simulação local um passo fixo (SIMULATION_TICK)"""
+        self.simulation_tick += 1
+        self.previous_local_position = (self.local_player["x"], self.local_player["y"])
+
+        # Timer de respawn
+        if self.dead and self.respawn_timer > 0:
+            self.respawn_timer = max(0, self.respawn_timer - SIMULATION_TICK)
+
+        # Predição local: aplica a entrada e guarda para reconciliação
+        move_x, move_y = self.move_input
+        if not self.dead and (move_x != 0 or move_y != 0):
+            self.input_seq += 1
+            self.pending_inputs.append((self.input_seq, move_x, move_y))
+            self.local_player["x"], self.local_player["y"] = step_player(
+                self.local_player["x"], self.local_player["y"], move_x, move_y, self.occupancy_grid
+            )
+
+        # Balas andam a cada BULLET_STEP_TICKS passos
+        if self.simulation_tick % BULLET_STEP_TICKS == 0:
+            self.update_bullets()
+
+    def advance_simulation(self, frame_time):
+        """
+        Executa quantos passos fixos couberem no tempo acumulado.
+        O resto fica para o próximo frame e vira a fração de interpolação do desenho.
+        Só o tempo acima de MAX_FRAME_TIME num frame é descartado.
+        """
+        self.simulation_accumulator += min(frame_time, MAX_FRAME_TIME)
+        steps = 0
+        while self.simulation_accumulator >= SIMULATION_TICK and steps < MAX_SIMULATION_STEPS:
+            self.simulation_step()
+            self.simulation_accumulator -= SIMULATION_TICK
+            steps += 1
+
+        self.render_alpha = self.simulation_accumulator / SIMULATION_TICK
+        return steps
+
+    def local_render_position(self):
+        """Posição do jogador local interpolada entre os dois últimos passos de simulação"""
+        x, y = self.local_player["x"], self.local_player["y"]
+        prev_x, prev_y = self.previous_local_position
+        # Teleportes (respawn, reconciliação) não são interpolados
+        if abs(x - prev_x) > 2 * PLAYER_SPEED or abs(y - prev_y) > 2 * PLAYER_SPEED:
+            return int(x), int(y)
+        alpha = self.render_alpha
+        return int(prev_x + (x - prev_x) * alpha), int(prev_y + (y - prev_y) * alpha)
 
     def try_capture_flag(self):
         """Tenta capturar bandeira próxima"""
         for flag_team, flag in self.flags.items():
-            if flag["captured"]:
+            if flag_capture_error(self.local_player["team"], self.local_player["hp"], flag_team, flag):
                 continue
 
-            dx = self.local_player["x"] - flag["x"]
-            dy = self.local_player["y"] - flag["y"]
-            distance = math.sqrt(dx*dx + dy*dy)
-
-            if distance < FLAG_SIZE and self.local_player["team"] != flag_team:
+            if near_flag(self.local_player["x"], self.local_player["y"], flag):
                 self.send_capture_flag(flag_team)
                 break
 
-    def draw(self):
-        """Desenha o jogo"""
+    def render_text(self, font, text, color):
+        """Renderiza um texto com antialiasing usando o cache de textos"""
+        return self.text_cache.render(font, text, color)
+
+    def invalidate_static_layer(self):
+        """Descarta a camada estática em cache (mapa ou caixas mudaram)"""
+        self.static_layer = None
+        self.full_redraw = True
+
+    def get_static_layer(self):
+        """Retorna a camada estática (fundo, bases, caixas e painel de controles), renderizando só quando muda"""
+        key = (self.map_id, id(self.collision_boxes), len(self.collision_boxes))
+        if self.static_layer is None or self.static_layer_key != key:
+            self.static_layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+            self.draw_static_layer(self.static_layer)
+            self.static_layer_key = key
+            self.full_redraw = True
+        return self.static_layer
+
+    def draw_static_layer(self, surface):
+        """Desenha tudo que não muda depois que o mapa é carregado"""
         # Fundo
-        self.screen.fill((50, 50, 50))
+        surface.fill((50, 50, 50))
 
         # Desenha bases
         for team_name, team_data in TEAMS.items():
             base_color = team_data["color"]
-            pygame.draw.circle(self.screen, base_color, (team_data["base_x"], team_data["base_y"]), BASE_SIZE // 2)
-            pygame.draw.circle(self.screen, (255, 255, 255), (team_data["base_x"], team_data["base_y"]), BASE_SIZE // 2, 3)
-
-        # Desenha bandeiras
-        for flag_team, flag in self.flags.items():
-            if not flag["captured"]:
-                flag_color = TEAMS[flag_team]["color"]
-                pygame.draw.rect(self.screen, flag_color, (flag["x"] - FLAG_SIZE//2, flag["y"] - FLAG_SIZE//2, FLAG_SIZE, FLAG_SIZE))
-                pygame.draw.rect(self.screen, (255, 255, 255), (flag["x"] - FLAG_SIZE//2, flag["y"] - FLAG_SIZE//2, FLAG_SIZE, FLAG_SIZE), 2)
+            pygame.draw.circle(surface, base_color, (team_data["base_x"], team_data["base_y"]), BASE_SIZE // 2)
+            pygame.draw.circle(surface, (255, 255, 255), (team_data["base_x"], team_data["base_y"]), BASE_SIZE // 2, 3)
 
         # Desenha caixas de colisão (obstáculos)
         for box in self.collision_boxes:
@@ -817,19 +1190,69 @@ class MultiplayerGame:
                 size = int(box.get("size", BOX_SIZE))
                 
                 # Desenha a caixa com cor marrom escura (obstáculo)
-                pygame.draw.rect(self.screen, (101, 67, 33), (x - size // 2, y - size // 2, size, size))
+                pygame.draw.rect(surface, (101, 67, 33), (x - size // 2, y - size // 2, size, size))
                 # Borda mais escura para destacar
-                pygame.draw.rect(self.screen, (69, 47, 22), (x - size // 2, y - size // 2, size, size), 3)
+                pygame.draw.rect(surface, (69, 47, 22), (x - size // 2, y - size // 2, size, size), 3)
                 # Adiciona um "X" para indicar que é um obstáculo
-                pygame.draw.line(self.screen, (255, 255, 255), 
+                pygame.draw.line(surface, (255, 255, 255), 
                                (x - size // 4, y - size // 4), 
                                (x + size // 4, y + size // 4), 2)
-                pygame.draw.line(self.screen, (255, 255, 255), 
+                pygame.draw.line(surface, (255, 255, 255), 
                                (x + size // 4, y - size // 4), 
                                (x - size // 4, y + size // 4), 2)
             except (ValueError, TypeError) as e:
                 print(f"❌ Erro ao desenhar caixa {box.get('id')}: {e}")
 
+        # Controles
+        controls = [
+            "Controles:",
+            "WASD/Setas - Mover",
+            "Clique esquerdo - Atirar",
+            "E - Capturar bandeira",
+            "Q - Soltar bandeira",
+            "R - Respawnar (quando morto)",
+            "ESC - Sair",
+            "",
+            "📦 Caixas marrons:",
+            "Obstáculos intransponíveis",
+            "Bloqueiam tiros!",
+            "Use como cobertura!"
+        ]
+        
+        for i, control in enumerate(controls):
+            color = (255, 255, 0) if i == 0 else (200, 200, 200)
+            control_surface = self.render_text(self.small_font, control, color)
+            surface.blit(control_surface, (SCREEN_WIDTH - 200, 10 + i * 20))
+
+    def draw(self):
+        """
+        Desenha o jogo.
+        A camada estática vem do cache; só as áreas sujas do frame anterior são
+        restauradas e as entidades dinâmicas são desenhadas por cima, guardando
+        os retângulos alterados para present().
+        """
+        if self.static_layer_cache_enabled:
+            static_layer = self.get_static_layer()
+            if self.full_redraw:
+                self.screen.blit(static_layer, (0, 0))
+            else:
+                # Restaura o fundo apenas onde havia entidades no frame anterior
+                for rect in self.previous_dirty_rects:
+                    self.screen.blit(static_layer, rect, rect)
+        else:
+            self.draw_static_layer(self.screen)
+            self.full_redraw = True
+
+        dirty = []
+        screen = self.screen
+
+        # Desenha bandeiras
+        for flag_team, flag in self.flags.items():
+            if not flag["captured"]:
+                flag_color = TEAMS[flag_team]["color"]
+                dirty.append(pygame.draw.rect(screen, flag_color, (flag["x"] - FLAG_SIZE//2, flag["y"] - FLAG_SIZE//2, FLAG_SIZE, FLAG_SIZE)))
+                pygame.draw.rect(screen, (255, 255, 255), (flag["x"] - FLAG_SIZE//2, flag["y"] - FLAG_SIZE//2, FLAG_SIZE, FLAG_SIZE), 2)
+
         # Desenha projéteis
         bullet_count = len(self.bullets)
         if bullet_count > 0:
@@ -841,11 +1264,18 @@ class MultiplayerGame:
             else:
                 self.last_bullet_draw_debug = time.time()
         
-        for bullet in self.bullets:
+        # Entidades remotas são desenhadas no passado (interpolação entre snapshots)
+        render_time = time.monotonic() - INTERPOLATION_DELAY
+
+        for bullet in self.bullets.values():
             try:
-                x = int(bullet.get("x", 0))
-                y = int(bullet.get("y", 0))
-                pygame.draw.circle(self.screen, (255, 255, 0), (x, y), BULLET_SIZE)
+                if bullet.get("shooter_id") == self.player_id:
+                    x = int(float(bullet.get("x", 0)))
+                    y = int(float(bullet.get("y", 0)))
+                else:
+                    x, y = self.render_position(self.bullet_snapshots, bullet.get("id"),
+                                                bullet.get("x", 0), bullet.get("y", 0), render_time)
+                dirty.append(pygame.draw.circle(screen, (255, 255, 0), (x, y), BULLET_SIZE))
             except (ValueError, TypeError) as e:
                 print(f"❌ Erro ao desenhar bala {bullet.get('id')}: {e}")
 
@@ -858,15 +1288,14 @@ class MultiplayerGame:
                 
                 # Efeito de explosão que diminui com o tempo
                 size = int(20 * (1 - progress))
-                alpha = int(255 * (1 - progress))
                 
                 if size > 0:
                     # Desenha círculo de explosão
                     color = (255, 100, 0)  # Laranja
-                    pygame.draw.circle(self.screen, color, 
-                                     (int(effect["x"]), int(effect["y"])), size)
+                    dirty.append(pygame.draw.circle(screen, color, 
+                                                    (int(effect["x"]), int(effect["y"])), size))
                     # Borda da explosão
-                    pygame.draw.circle(self.screen, (255, 255, 0), 
+                    pygame.draw.circle(screen, (255, 255, 0), 
                                      (int(effect["x"]), int(effect["y"])), size, 2)
             except (ValueError, TypeError) as e:
                 print(f"❌ Erro ao desenhar efeito de colisão: {e}")
@@ -874,12 +1303,13 @@ class MultiplayerGame:
         # Desenha outros jogadores
         for player_id, player_data in self.other_players.items():
             color = player_data["color"]
-            x, y = player_data["x"], player_data["y"]
+            x, y = self.render_position(self.player_snapshots, player_id,
+                                        player_data["x"], player_data["y"], render_time)
             hp = player_data["hp"]
             
             # Jogador
-            pygame.draw.circle(self.screen, color, (x, y), PLAYER_SIZE)
-            pygame.draw.circle(self.screen, (255, 255, 255), (x, y), PLAYER_SIZE, 2)
+            dirty.append(pygame.draw.circle(screen, color, (x, y), PLAYER_SIZE))
+            pygame.draw.circle(screen, (255, 255, 255), (x, y), PLAYER_SIZE, 2)
             
             # Barra de HP
             hp_width = 40
@@ -888,27 +1318,27 @@ class MultiplayerGame:
             hp_y = y - PLAYER_SIZE - 10
             
             # Fundo da barra
-            pygame.draw.rect(self.screen, (100, 100, 100), (hp_x, hp_y, hp_width, hp_height))
+            dirty.append(pygame.draw.rect(screen, (100, 100, 100), (hp_x, hp_y, hp_width, hp_height)))
             
             # HP atual
             hp_percent = max(0, hp / 100)
             hp_current_width = int(hp_width * hp_percent)
             hp_color = (255, 0, 0) if hp_percent < 0.3 else (255, 255, 0) if hp_percent < 0.6 else (0, 255, 0)
-            pygame.draw.rect(self.screen, hp_color, (hp_x, hp_y, hp_current_width, hp_height))
+            pygame.draw.rect(screen, hp_color, (hp_x, hp_y, hp_current_width, hp_height))
 
         # Desenha jogador local
         if not self.dead:
             color = self.local_player["color"]
-            x, y = self.local_player["x"], self.local_player["y"]
+            x, y = self.local_render_position()
             
             # Jogador
-            pygame.draw.circle(self.screen, color, (int(x), int(y)), PLAYER_SIZE)
-            pygame.draw.circle(self.screen, (255, 255, 255), (int(x), int(y)), PLAYER_SIZE, 3)
+            dirty.append(pygame.draw.circle(screen, color, (int(x), int(y)), PLAYER_SIZE))
+            pygame.draw.circle(screen, (255, 255, 255), (int(x), int(y)), PLAYER_SIZE, 3)
             
             # Indicador de bandeira carregada
             if self.local_player["carrying_flag"]:
                 flag_color = TEAMS[self.local_player["carrying_flag"]]["color"]
-                pygame.draw.circle(self.screen, flag_color, (int(x), int(y)), PLAYER_SIZE + 5, 3)
+                dirty.append(pygame.draw.circle(screen, flag_color, (int(x), int(y)), PLAYER_SIZE + 5, 3))
             
             # Barra de HP
             hp_width = 40
@@ -916,91 +1346,89 @@ class MultiplayerGame:
             hp_x = x - hp_width // 2
             hp_y = y - PLAYER_SIZE - 10
             
-            pygame.draw.rect(self.screen, (100, 100, 100), (hp_x, hp_y, hp_width, hp_height))
+            dirty.append(pygame.draw.rect(screen, (100, 100, 100), (hp_x, hp_y, hp_width, hp_height)))
             
             hp_percent = max(0, self.local_player["hp"] / self.local_player["max_hp"])
             hp_current_width = int(hp_width * hp_percent)
             hp_color = (255, 0, 0) if hp_percent < 0.3 else (255, 255, 0) if hp_percent < 0.6 else (0, 255, 0)
-            pygame.draw.rect(self.screen, hp_color, (hp_x, hp_y, hp_current_width, hp_height))
+            pygame.draw.rect(screen, hp_color, (hp_x, hp_y, hp_current_width, hp_height))
 
         # Interface
-        self.draw_ui()
+        dirty.extend(self.draw_ui())
+
+        # Áreas a atualizar na tela: onde havia entidades antes + onde há agora
+        self.frame_dirty_rects = self.previous_dirty_rects + dirty
+        self.previous_dirty_rects = dirty
+
+    def present(self):
+        """Envia o frame para a tela (tela inteira só quando a camada estática foi redesenhada)"""
+        if self.full_redraw:
+            pygame.display.flip()
+            self.full_redraw = not self.static_layer_cache_enabled
+        else:
+            pygame.display.update(self.frame_dirty_rects)
 
     def draw_ui(self):
-        """Desenha interface do usuário"""
+        """Desenha a parte dinâmica da interface e retorna os retângulos alterados"""
+        dirty = []
+        screen = self.screen
+
         # Status da conexão
         status_color = (0, 255, 0) if self.connected else (255, 0, 0)
         status_text = "Conectado" if self.connected else "Desconectado"
-        status_surface = self.font.render(status_text, True, status_color)
-        self.screen.blit(status_surface, (10, 10))
+        status_surface = self.render_text(self.font, status_text, status_color)
+        dirty.append(screen.blit(status_surface, (10, 10)))
 
         # Contador de jogadores
         player_count = len(self.other_players) + 1
         count_text = f"Jogadores: {player_count}"
-        count_surface = self.font.render(count_text, True, (255, 255, 255))
-        self.screen.blit(count_surface, (10, 35))
+        if self.room_id:
+            count_text += f" | Sala: {self.room_id}"
+        count_surface = self.render_text(self.font, count_text, (255, 255, 255))
+        dirty.append(screen.blit(count_surface, (10, 35)))
 
         # Placar
         score_text = f"Vermelho: {self.scores['red']} | Azul: {self.scores['blue']}"
-        score_surface = self.big_font.render(score_text, True, (255, 255, 255))
-        self.screen.blit(score_surface, (SCREEN_WIDTH // 2 - score_surface.get_width() // 2, 10))
+        score_surface = self.render_text(self.big_font, score_text, (255, 255, 255))
+        dirty.append(screen.blit(score_surface, (SCREEN_WIDTH // 2 - score_surface.get_width() // 2, 10)))
 
         # Time do jogador
         if self.local_player["team"]:
             team_name = TEAMS[self.local_player["team"]]["name"]
             team_color = TEAMS[self.local_player["team"]]["color"]
-            team_surface = self.font.render(f"Seu time: {team_name}", True, team_color)
-            self.screen.blit(team_surface, (10, 60))
+            team_surface = self.render_text(self.font, f"Seu time: {team_name}", team_color)
+            dirty.append(screen.blit(team_surface, (10, 60)))
 
         # HP do jogador
         if not self.dead:
             hp_text = f"HP: {self.local_player['hp']}/{self.local_player['max_hp']}"
-            hp_surface = self.font.render(hp_text, True, (255, 255, 255))
-            self.screen.blit(hp_surface, (10, 85))
+            hp_surface = self.render_text(self.font, hp_text, (255, 255, 255))
+            dirty.append(screen.blit(hp_surface, (10, 85)))
 
         # Bandeira carregada
         if self.local_player["carrying_flag"]:
             flag_text = f"Carregando bandeira: {self.local_player['carrying_flag']}"
-            flag_surface = self.font.render(flag_text, True, (255, 255, 0))
-            self.screen.blit(flag_surface, (10, 110))
+            flag_surface = self.render_text(self.font, flag_text, (255, 255, 0))
+            dirty.append(screen.blit(flag_surface, (10, 110)))
 
         # Timer de respawn
         if self.dead:
             if self.respawn_timer > 0:
                 respawn_text = f"Respawn em: {self.respawn_timer:.1f}s (Pressione R)"
-                respawn_surface = self.big_font.render(respawn_text, True, (255, 0, 0))
-                self.screen.blit(respawn_surface, (SCREEN_WIDTH // 2 - respawn_surface.get_width() // 2, SCREEN_HEIGHT // 2))
+                respawn_surface = self.render_text(self.big_font, respawn_text, (255, 0, 0))
+                dirty.append(screen.blit(respawn_surface, (SCREEN_WIDTH // 2 - respawn_surface.get_width() // 2, SCREEN_HEIGHT // 2)))
             else:
                 respawn_text = "Pressione R para respawnar"
-                respawn_surface = self.big_font.render(respawn_text, True, (255, 255, 0))
-                self.screen.blit(respawn_surface, (SCREEN_WIDTH // 2 - respawn_surface.get_width() // 2, SCREEN_HEIGHT // 2))
-
-        # Controles
-        controls = [
-            "Controles:",
-            "WASD/Setas - Mover",
-            "Clique esquerdo - Atirar",
-            "E - Capturar bandeira",
-            "Q - Soltar bandeira",
-            "R - Respawnar (quando morto)",
-            "ESC - Sair",
-            "",
-            "📦 Caixas marrons:",
-            "Obstáculos intransponíveis",
-            "Bloqueiam tiros!",
-            "Use como cobertura!"
-        ]
-        
-        for i, control in enumerate(controls):
-            color = (255, 255, 0) if i == 0 else (200, 200, 200)
-            control_surface = self.small_font.render(control, True, color)
-            self.screen.blit(control_surface, (SCREEN_WIDTH - 200, 10 + i * 20))
+                respawn_surface = self.render_text(self.big_font, respawn_text, (255, 255, 0))
+                dirty.append(screen.blit(respawn_surface, (SCREEN_WIDTH // 2 - respawn_surface.get_width() // 2, SCREEN_HEIGHT // 2)))
 
         # FPS
         fps = int(self.clock.get_fps())
         fps_text = f"FPS: {fps}"
-        fps_surface = self.small_font.render(fps_text, True, (255, 255, 255))
-        self.screen.blit(fps_surface, (SCREEN_WIDTH - 100, SCREEN_HEIGHT - 30))
+        fps_surface = self.render_text(self.small_font, fps_text, (255, 255, 255))
+        dirty.append(screen.blit(fps_surface, (SCREEN_WIDTH - 100, SCREEN_HEIGHT - 30)))
+
+        return dirty
 
     def disconnect(self):
         """Desconecta do WebSocket"""
@@ -1018,73 +1446,124 @@ class MultiplayerGame:
         time.sleep(1)
         return self.connect_websocket()
 
-    def run(self):
-        """Loop principal do jogo"""
+    def handle_window_events(self):
+        """Processa os eventos da janela do pygame"""
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    self.running = False
+                elif event.key == pygame.K_r and not self.connected:
+                    self.try_reconnect()
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                # Debug adicional para eventos do mouse
+                if event.button == 1:  # Botão esquerdo
+                    print(f"🖱️ Mouse click detected: {event.pos} - Button: {event.button}")
+                    if not self.dead and self.connected:
+                        self.send_shot(event.pos[0], event.pos[1])
+
+    def run_frame(self):
+        """Executa um frame: eventos, rede, entrada, simulação, envios e (se houver janela) desenho"""
+        # Processa eventos
+        if not self.headless:
+            self.handle_window_events()
+
+        # Aplica eventos de rede recebidos desde o último frame
+        self.process_network_events()
+
+        # Processa entrada
+        self.handle_input()
+
+        # Simulação em passo fixo (movimento, balas, respawn)
+        now = time.perf_counter()
+        self.advance_simulation(now - self.last_frame_time)
+        self.last_frame_time = now
+
+        # Envia atualizações (uma vez por frame, mesmo após vários passos)
+        self.flush_bullet_updates()
+        self.send_position_update()
+
+        # Ping periódico
+        current_time = time.time()
+        if current_time - self.last_ping_time > self.ping_interval:
+            self.send_ping()
+            self.last_ping_time = current_time
+
+        if not self.headless:
+            # Desenha
+            self.draw()
+
+            # Atualiza display (apenas as áreas alteradas)
+            self.present()
+
+        # Debug de performance
+        if hasattr(self, 'last_performance_check'):
+            if time.time() - self.last_performance_check > 10:  # A cada 10 segundos
+                print(f"📊 Performance: FPS atual: {self.clock.get_fps():.1f}, Target: {FPS}")
+                print(f"   🎮 Jogadores: {len(self.other_players) + 1}")
+                print(f"   🔫 Balas ativas: {len(self.bullets)}")
+                stats = self.take_network_stats()
+                if stats["frames"]:
+                    print(f"   📨 Eventos de rede: {stats['events']} em {stats['frames']} frames - "
+                          f"média {stats['apply_time'] / stats['frames'] * 1000:.3f}ms/frame, "
+                          f"pico {stats['max_frame_time'] * 1000:.3f}ms, posições agrupadas {stats['coalesced']}")
+                self.last_performance_check = time.time()
+        else:
+            self.last_performance_check = time.time()
+
+    def run(self, duration=None):
+        """Loop principal do jogo (duration: encerra após N segundos, útil no modo headless)"""
         if not self.connect_websocket():
             print("❌ Falha ao conectar ao servidor")
             return
 
-        last_ping_time = 0
-        ping_interval = 30  # 30 segundos
+        self.last_frame_time = time.perf_counter()
+        end_time = time.time() + duration if duration else None
 
         while self.running:
-            # Processa eventos
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
-                        self.running = False
-                    elif event.key == pygame.K_r and not self.connected:
-                        self.try_reconnect()
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    # Debug adicional para eventos do mouse
-                    if event.button == 1:  # Botão esquerdo
-                        print(f"🖱️ Mouse click detected: {event.pos} - Button: {event.button}")
-                        if not self.dead and self.connected:
-                            self.send_shot(event.pos[0], event.pos[1])
-
-            # Atualiza timer de respawn
-            if self.dead and self.respawn_timer > 0:
-                self.respawn_timer -= 1/60  # 60 FPS
-                if self.respawn_timer <= 0:
-                    self.respawn_timer = 0
-
-            # Processa entrada
-            self.handle_input()
+            self.run_frame()
+            self.clock.tick(FPS)
+            if end_time is not None and time.time() >= end_time:
+                self.running = False
 
-            # Atualiza balas
-            self.update_bullets()
+        # Limpeza
+        self.disconnect()
+        pygame.quit()
 
-            # Envia atualizações
-            self.send_position_update()
 
-            # Ping periódico
-            current_time = time.time()
-            if current_time - last_ping_time > ping_interval:
-                self.send_ping()
-                last_ping_time = current_time
+def run_bots(count, duration=None, config=None, room_id=None):
+    """Roda `count` bots headless no mesmo processo, cada um com sua conexão WebSocket"""
+    all_games = []
+    for i in range(count):
+        game = MultiplayerGame(headless=True, controller=BotController(config, seed=i), room_id=room_id)
+        if game.connect_websocket():
+            all_games.append(game)
+        else:
+            print(f"❌ Bot {i + 1} não conseguiu conectar")
 
-            # Desenha
-            self.draw()
+    if not all_games:
+        print("❌ Nenhum bot conectado")
+        return
+    print(f"🤖 {len(all_games)} bots conectados")
 
-            # Atualiza display
-            pygame.display.flip()
-            current_fps = self.clock.tick(FPS)
-            
-            # Debug de performance
-            if hasattr(self, 'last_performance_check'):
-                if time.time() - self.last_performance_check > 10:  # A cada 10 segundos
-                    print(f"📊 Performance: FPS atual: {current_fps:.1f}, Target: {FPS}")
-                    print(f"   🎮 Jogadores: {len(self.other_players) + 1}")
-                    print(f"   🔫 Balas ativas: {len(self.bullets)}")
-                    self.last_performance_check = time.time()
-            else:
-                self.last_performance_check = time.time()
+    clock = pygame.time.Clock()
+    end_time = time.time() + duration if duration else None
+    now = time.perf_counter()
+    for game in all_games:
+        game.last_frame_time = now
 
-        # Limpeza
-        self.disconnect()
-        pygame.quit()
+    games = list(all_games)
+    try:
+        while games and (end_time is None or time.time() < end_time):
+            for game in games:
+                game.run_frame()
+            games = [game for game in games if game.running]
+            clock.tick(FPS)
+    finally:
+        for game in all_games:
+            game.disconnect()
+        print("🤖 Bots encerrados")
 
 
 def check_dependencies():
@@ -1101,6 +1580,15 @@ def check_dependencies():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cliente do Jogo Multiplayer - Captura de Bandeira")
+    parser.add_argument("--headless", action="store_true", help="Roda sem janela (rede e simulação completas)")
+    parser.add_argument("--duration", type=float, default=None, help="Encerra após N segundos")
+    parser.add_argument("--bots", type=int, default=0, help="Roda N bots headless em vez do jogo com janela")
+    parser.add_argument("--bot-config", type=json.loads, default=None,
+                        help='Taxas dos bots em JSON, ex.: \'{"shots_per_second": 3}\' (ver game_bots.DEFAULT_BOT_CONFIG)')
+    parser.add_argument("--room", default=None, help="Sala da partida (padrão: GAME_ROOM ou a escolhida pelo lobby)")
+    args = parser.parse_args()
+
     if not check_dependencies():
         sys.exit(1)
 
@@ -1109,12 +1597,20 @@ if __name__ == "__main__":
         print("🔧 Configure a variável de ambiente WEBSOCKET_URL ou crie um arquivo .env")
         sys.exit(1)
 
+    if args.bots > 0:
+        print(f"🤖 Iniciando {args.bots} bots em: {WEBSOCKET_URL}")
+        try:
+            run_bots(args.bots, duration=args.duration, config=args.bot_config, room_id=args.room)
+        except KeyboardInterrupt:
+            print("\n👋 Bots interrompidos pelo usuário")
+        sys.exit(0)
+
     print("🎮 Iniciando Jogo Multiplayer - Captura de Bandeira")
     print(f"🌐 Conectando em: {WEBSOCKET_URL}")
     
-    game = MultiplayerGame()
+    game = MultiplayerGame(headless=args.headless, room_id=args.room)
     try:
-        game.run()
+        game.run(duration=args.duration)
     except KeyboardInterrupt:
         print("\n👋 Jogo interrompido pelo usuário")
     except Exception as e:
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Bots do Jogo - Política de jogadores simulados para geração de carga
+Usado por game-client.py (python game-client.py --bots N)
+
+Um BotController é um controle (ver game_input.py) que decide a entrada de
+cada frame a partir do estado do MultiplayerGame: vai até a bandeira inimiga,
+leva a bandeira para a própria base, desvia das caixas de colisão, atira em
+inimigos visíveis, às vezes solta a bandeira e respawna ao morrer. As taxas
+de ação são configuráveis para reproduzir a mistura de mensagens de partidas
+reais.
+"""
+
+import math
+import random
+import time
+from typing import Any, Dict, Optional
+
+from game_input import IDLE_INPUT, ControlInput
+from game_simulation import (
+    BULLET_SPEED,
+    GAME_HEIGHT,
+    GAME_WIDTH,
+    PLAYER_SIZE,
+    TEAMS,
+    bullet_hits_box,
+    enemy_team,
+    flag_capture_error,
+    near_flag,
+    player_blocked,
+    step_player,
+)
+
+
+# Configuração padrão dos bots (taxas por segundo, distâncias em pixels)
+DEFAULT_BOT_CONFIG: Dict[str, Any] = {
+    "shots_per_second": 1.5,  # Tiros por segundo no máximo (o cliente ainda aplica o cooldown)
+    "shoot_range": 300,  # Distância máxima para atirar
+    "aim_jitter": 15,  # Erro de mira (pixels)
+    "drop_flag_per_second": 0.02,  # Chance por segundo de soltar a bandeira sem motivo
+    "wander_per_second": 0.1,  # Chance por segundo de andar numa direção aleatória
+    "wander_duration": 0.8,  # Duração de uma andança aleatória (segundos)
+    "capture_retry": 0.3,  # Intervalo entre pedidos de captura enquanto perto da bandeira
+    "respawn_delay": 0.5,  # Espera extra depois que o respawn é liberado
+    "stuck_time": 0.5,  # Tempo parado até considerar o bot preso
+}
+
+# Oito direções de movimento (a simulação aceita -1, 0 ou 1 por eixo)
+DIRECTIONS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+
+
+def line_of_sight(grid, from_x, from_y, to_x, to_y) -> bool:
+    """Verifica se nenhuma caixa bloqueia o segmento (amostrado no passo de uma bala)"""
+    dx = to_x - from_x
+    dy = to_y - from_y
+    steps = max(1, int(math.hypot(dx, dy) // (BULLET_SPEED / 2)))
+    for i in range(1, steps):
+        t = i / steps
+        if bullet_hits_box(grid, from_x + dx * t, from_y + dy * t) is not None:
+            return False
+    return True
+
+
+class BotController:
+    """Controle automático de um jogador (ver DEFAULT_BOT_CONFIG para as taxas)"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, seed: Optional[int] = None):
+        self.config = dict(DEFAULT_BOT_CONFIG)
+        if config:
+            self.config.update(config)
+        self.rng = random.Random(seed)
+
+        self.last_poll = None
+        self.last_shot = 0.0
+        self.last_capture = 0.0
+        self.dead_since = None
+        self.wander_until = 0.0
+        self.wander_direction = (0, 0)
+        self.last_position = None
+        self.still_since = None
+
+    def chance(self, per_second: float, elapsed: float) -> bool:
+        """Sorteia um evento com taxa `per_second` num intervalo de `elapsed` segundos"""
+        return per_second > 0 and self.rng.random() < per_second * elapsed
+
+    def poll(self, game) -> ControlInput:
+        now = time.monotonic()
+        elapsed = 0.0 if self.last_poll is None else min(now - self.last_poll, 1.0)
+        self.last_poll = now
+
+        team = game.local_player["team"]
+        if team is None or not game.connected:
+            return IDLE_INPUT
+
+        if game.dead:
+            return self.respawn_input(game, now)
+        self.dead_since = None
+
+        x, y = game.local_player["x"], game.local_player["y"]
+        carrying = game.local_player["carrying_flag"]
+        enemy = enemy_team(team)
+
+        # Objetivo: com a bandeira, volta para a base; sem ela, busca a bandeira inimiga
+        capture = False
+        drop = False
+        if carrying:
+            target_x, target_y = TEAMS[team]["base_x"], TEAMS[team]["base_y"]
+            drop = self.chance(self.config["drop_flag_per_second"], elapsed)
+        else:
+            flag = game.flags[enemy]
+            if flag_capture_error(team, game.local_player["hp"], enemy, flag) is None:
+                target_x, target_y = flag["x"], flag["y"]
+                capture = near_flag(x, y, flag) and now - self.last_capture >= self.config["capture_retry"]
+                if capture:
+                    self.last_capture = now
+            else:
+                # Bandeira já capturada: pressiona a base inimiga
+                target_x, target_y = TEAMS[enemy]["base_x"], TEAMS[enemy]["base_y"]
+
+        move_x, move_y = self.steer(game, x, y, target_x, target_y, now, elapsed)
+        shoot_at = self.pick_shot(game, team, x, y, now)
+        return ControlInput(move_x, move_y, shoot_at, capture, drop, False)
+
+    def respawn_input(self, game, now) -> ControlInput:
+        """Pede respawn quando o timer acabar (mais um pequeno atraso)"""
+        if self.dead_since is None:
+            self.dead_since = now
+        if game.respawn_timer <= 0 and now - self.dead_since >= self.config["respawn_delay"]:
+            self.dead_since = now  # Tenta de novo só depois de outro atraso
+            return ControlInput(0, 0, None, False, False, True)
+        return IDLE_INPUT
+
+    def steer(self, game, x, y, target_x, target_y, now, elapsed):
+        """Escolhe a direção que mais aproxima do alvo sem bater nas caixas"""
+        grid = game.occupancy_grid
+
+        # Detecção de bot preso (parado apesar de estar se movendo)
+        if self.last_position is not None and abs(x - self.last_position[0]) < 0.5 and abs(y - self.last_position[1]) < 0.5:
+            if self.still_since is None:
+                self.still_since = now
+            elif now - self.still_since > self.config["stuck_time"] and now >= self.wander_until:
+                self.start_wander(now)
+        else:
+            self.still_since = None
+        self.last_position = (x, y)
+
+        if now >= self.wander_until and self.chance(self.config["wander_per_second"], elapsed):
+            self.start_wander(now)
+        if now < self.wander_until:
+            return self.wander_direction
+
+        if math.hypot(target_x - x, target_y - y) < PLAYER_SIZE:
+            return 0, 0
+
+        best = (0, 0)
+        best_distance = math.hypot(target_x - x, target_y - y)
+        for move_x, move_y in DIRECTIONS:
+            new_x, new_y = step_player(x, y, move_x, move_y, grid)
+            if (new_x, new_y) == (x, y) or player_blocked(grid, new_x, new_y):
+                continue
+            distance = math.hypot(target_x - new_x, target_y - new_y)
+            if distance < best_distance:
+                best, best_distance = (move_x, move_y), distance
+        return best
+
+    def start_wander(self, now):
+        self.wander_direction = self.rng.choice(DIRECTIONS)
+        self.wander_until = now + self.config["wander_duration"]
+        self.still_since = None
+
+    def pick_shot(self, game, team, x, y, now):
+        """Alvo do tiro no inimigo visível mais próximo, respeitando a taxa de tiros"""
+        shots_per_second = self.config["shots_per_second"]
+        if shots_per_second <= 0 or now - self.last_shot < 1 / shots_per_second:
+            return None
+
+        shoot_range = self.config["shoot_range"]
+        best = None
+        best_distance = shoot_range
+        for player in game.other_players.values():
+            if player.get("team") == team or player.get("hp", 0) <= 0:
+                continue
+            distance = math.hypot(player["x"] - x, player["y"] - y)
+            if distance < best_distance and line_of_sight(game.occupancy_grid, x, y, player["x"], player["y"]):
+                best, best_distance = player, distance
+
+        if best is None:
+            return None
+
+        self.last_shot = now
+        jitter = self.config["aim_jitter"]
+        aim_x = best["x"] + self.rng.uniform(-jitter, jitter)
+        aim_y = best["y"] + self.rng.uniform(-jitter, jitter)
+        return (max(0, min(GAME_WIDTH, int(aim_x))), max(0, min(GAME_HEIGHT, int(aim_y))))
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Entrada do Jogo - Controles do jogador local
+Usado por game-client.py
+
+A cada frame o cliente pede ao seu controle um ControlInput (direção do
+movimento e ações). O teclado e o mouse são só uma das fontes possíveis: o modo
+headless, os bots e os benchmarks usam controles scriptados, sem janela.
+"""
+
+from collections import namedtuple
+
+import pygame
+
+from game_simulation import GAME_HEIGHT, GAME_WIDTH
+
+
+# Entrada de um frame
+# move_x/move_y: direção (-1, 0 ou 1); shoot_at: alvo (x, y) do tiro ou None
+ControlInput = namedtuple(
+    "ControlInput",
+    ["move_x", "move_y", "shoot_at", "capture_flag", "drop_flag", "respawn"]
+)
+
+IDLE_INPUT = ControlInput(0, 0, None, False, False, False)
+
+
+class KeyboardController:
+    """Controle pelo teclado e mouse (requer a janela do pygame)"""
+
+    def poll(self, game) -> ControlInput:
+        keys = pygame.key.get_pressed()
+
+        move_x = 0
+        move_y = 0
+        if keys[pygame.K_w] or keys[pygame.K_UP]:
+            move_y -= 1
+        if keys[pygame.K_s] or keys[pygame.K_DOWN]:
+            move_y += 1
+        if keys[pygame.K_a] or keys[pygame.K_LEFT]:
+            move_x -= 1
+        if keys[pygame.K_d] or keys[pygame.K_RIGHT]:
+            move_x += 1
+
+        # Tiro com clique do mouse
+        shoot_at = None
+        if pygame.mouse.get_pressed()[0]:  # Botão esquerdo
+            mouse_x, mouse_y = pygame.mouse.get_pos()
+            # Verifica se as coordenadas são válidas
+            if 0 <= mouse_x <= GAME_WIDTH and 0 <= mouse_y <= GAME_HEIGHT:
+                shoot_at = (mouse_x, mouse_y)
+            else:
+                print(f"⚠️ Coordenadas do mouse inválidas: ({mouse_x}, {mouse_y})")
+
+        return ControlInput(
+            move_x,
+            move_y,
+            shoot_at,
+            bool(keys[pygame.K_e]),  # Captura de bandeira com E
+            bool(keys[pygame.K_q]),  # Solta bandeira com Q
+            bool(keys[pygame.K_r])   # Respawn com R
+        )
+
+
+class ScriptedController:
+    """
+    Controle programável, sem teclado nem janela.
+    `script` pode ser uma função script(game) -> ControlInput, chamada a cada
+    frame, ou uma sequência de ControlInput consumida um por frame (com
+    loop=True recomeça do início; senão fica parado ao terminar).
+    """
+
+    def __init__(self, script=None, loop=False):
+        self.script = script
+        self.loop = loop
+        self.frame = 0
+
+    def poll(self, game) -> ControlInput:
+        frame = self.frame
+        self.frame += 1
+
+        if self.script is None:
+            return IDLE_INPUT
+        if callable(self.script):
+            return self.script(game) or IDLE_INPUT
+
+        if not self.script:
+            return IDLE_INPUT
+        if frame >= len(self.script):
+            if not self.loop:
+                return IDLE_INPUT
+            frame %= len(self.script)
+        return self.script[frame]
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Mapas do Jogo - Geração determinística e cache de geometria
+Compartilhado entre o servidor (websocket_game_handler.py) e o cliente (game-client.py)
+
+Um mapa é identificado por "<versão>:<seed>:<hash>". O servidor guarda e envia
+apenas esse id; cada lado regenera as caixas de colisão a partir da seed (ou
+carrega do cache local) e confere o hash do conteúdo.
+"""
+
+import hashlib
+import json
+import math
+import os
+import random
+from array import array
+from typing import Any, Dict, List, Optional
+
+from game_simulation import BASE_SIZE, BOX_SIZE, FLAG_SIZE, GAME_HEIGHT, GAME_WIDTH, TEAMS
+
+
+# Versão do formato/gerador de mapas (mude sempre que a geração mudar)
+MAP_FORMAT_VERSION = 1
+
+# Configurações das caixas de colisão
+NUM_BOXES = 12  # Número de caixas a serem geradas
+BOX_MIN_DISTANCE = 100  # Distância mínima entre caixas e outros objetos
+
+# Resolução da grade de ocupação (pixels por célula)
+GRID_CELL_SIZE = 2
+
+# Diretório do cache local de mapas do cliente
+MAP_CACHE_DIR = os.environ.get(
+    "MAP_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "multiplayer-online-game", "maps")
+)
+
+# Cache em memória: hash -> caixas de colisão
+_loaded_maps: Dict[str, List[Dict[str, Any]]] = {}
+
+
+def new_map_seed() -> int:
+    """Gera uma seed nova para um mapa"""
+    return random.SystemRandom().randrange(1, 2**31)
+
+
+def forbidden_areas() -> List[Dict[str, Any]]:
+    """Áreas onde não podem existir caixas (bases, bandeiras e spawns)"""
+    areas = []
+    for team in TEAMS.values():
+        areas.append({"x": team["base_x"], "y": team["base_y"], "radius": BASE_SIZE // 2 + BOX_MIN_DISTANCE})
+        areas.append({"x": team["flag_x"], "y": team["flag_y"], "radius": FLAG_SIZE // 2 + BOX_MIN_DISTANCE})
+        areas.append({"x": team["spawn_x"], "y": team["spawn_y"], "radius": 50 + BOX_MIN_DISTANCE})
+    return areas
+
+
+def generate_collision_boxes(seed: int) -> List[Dict[str, Any]]:
+    """Gera as caixas de colisão do mapa de forma determinística a partir da seed"""
+    rng = random.Random(seed)
+    areas = forbidden_areas()
+
+    boxes = []
+    attempts = 0
+    max_attempts = 1000
+
+    while len(boxes) < NUM_BOXES and attempts < max_attempts:
+        attempts += 1
+
+        # Gera posição aleatória
+        x = rng.randint(BOX_SIZE // 2, GAME_WIDTH - BOX_SIZE // 2)
+        y = rng.randint(BOX_SIZE // 2, GAME_HEIGHT - BOX_SIZE // 2)
+
+        # Verifica se está longe das áreas proibidas e das caixas já colocadas
+        valid_position = all(
+            math.hypot(x - area["x"], y - area["y"]) >= area["radius"] for area in areas
+        ) and all(
+            math.hypot(x - box["x"], y - box["y"]) >= BOX_MIN_DISTANCE for box in boxes
+        )
+
+        if valid_position:
+            boxes.append({
+                "id": f"box_{len(boxes)}",
+                "x": x,
+                "y": y,
+                "size": BOX_SIZE
+            })
+
+    return boxes
+
+
+def compute_map_hash(collision_boxes: List[Dict[str, Any]]) -> str:
+    """Calcula o hash do conteúdo do mapa (caixas de colisão)"""
+    canonical = json.dumps(
+        [{"id": str(b["id"]), "x": int(b["x"]), "y": int(b["y"]), "size": int(b["size"])} for b in collision_boxes],
+        sort_keys=True,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def build_map_id(seed: int, map_hash: str, version: int = MAP_FORMAT_VERSION) -> str:
+    """Monta o id do mapa no formato <versão>:<seed>:<hash>"""
+    return f"{version}:{seed}:{map_hash}"
+
+
+def parse_map_id(map_id: str):
+    """Separa o id do mapa em (versão, seed, hash)"""
+    try:
+        version, seed, map_hash = str(map_id).split(":")
+        return int(version), int(seed), map_hash
+    except ValueError:
+        raise ValueError(f"Id de mapa inválido: {map_id}")
+
+
+def create_map(seed: Optional[int] = None) -> Dict[str, Any]:
+    """Cria um mapa novo e retorna id, seed, hash e caixas de colisão"""
+    if seed is None:
+        seed = new_map_seed()
+
+    collision_boxes = generate_collision_boxes(seed)
+    map_hash = compute_map_hash(collision_boxes)
+    _loaded_maps[map_hash] = collision_boxes
+
+    map_id = build_map_id(seed, map_hash)
+    print(f"🗺️ Mapa {map_id} gerado com {len(collision_boxes)} caixas de colisão")
+    return {
+        "map_id": map_id,
+        "seed": seed,
+        "hash": map_hash,
+        "collision_boxes": collision_boxes
+    }
+
+
+def _cache_path(cache_dir: str, map_hash: str) -> str:
+    return os.path.join(cache_dir, f"{map_hash}.json")
+
+
+def _read_cached_map(cache_dir: str, map_hash: str) -> Optional[List[Dict[str, Any]]]:
+    """Lê um mapa do cache em disco, conferindo o hash"""
+    path = _cache_path(cache_dir, map_hash)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            collision_boxes = json.load(f).get("collision_boxes", [])
+    except (OSError, ValueError):
+        return None
+
+    if compute_map_hash(collision_boxes) != map_hash:
+        print(f"⚠️ Cache de mapa corrompido: {path}")
+        return None
+    return collision_boxes
+
+
+def _write_cached_map(cache_dir: str, map_id: str, map_hash: str, collision_boxes: List[Dict[str, Any]]):
+    """Salva o mapa no cache em disco (falhas são apenas logadas)"""
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(_cache_path(cache_dir, map_hash), "w", encoding="utf-8") as f:
+            json.dump({"map_id": map_id, "collision_boxes": collision_boxes}, f)
+    except OSError as e:
+        print(f"⚠️ Erro ao salvar mapa no cache: {e}")
+
+
+def load_map(map_id: str, cache_dir: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Obtém as caixas de colisão de um mapa pelo id.
+    Ordem: cache em memória, cache em disco (se cache_dir) e por fim regeneração pela seed.
+    """
+    version, seed, map_hash = parse_map_id(map_id)
+
+    if map_hash in _loaded_maps:
+        return _loaded_maps[map_hash]
+
+    if cache_dir:
+        collision_boxes = _read_cached_map(cache_dir, map_hash)
+        if collision_boxes is not None:
+            _loaded_maps[map_hash] = collision_boxes
+            return collision_boxes
+
+    if version != MAP_FORMAT_VERSION:
+        raise ValueError(f"Mapa {map_id} usa versão {version}, gerador local é v{MAP_FORMAT_VERSION}")
+
+    collision_boxes = generate_collision_boxes(seed)
+    if compute_map_hash(collision_boxes) != map_hash:
+        raise ValueError(f"Hash do mapa {map_id} não confere com a geometria regenerada")
+
+    _loaded_maps[map_hash] = collision_boxes
+    if cache_dir:
+        _write_cached_map(cache_dir, map_id, map_hash, collision_boxes)
+    return collision_boxes
+
+
+class OccupancyGrid:
+    """
+    Grade de ocupação rasterizada do mapa estático.
+    Cada célula guarda o índice + 1 da caixa que a ocupa (0 = livre), então
+    consultas de ponto e de círculo são só alguns acessos por índice,
+    independente do número de caixas. A rasterização é conservadora: uma
+    célula tocada por uma caixa conta como ocupada (erro máximo de uma célula).
+    """
+
+    def __init__(self, collision_boxes: List[Dict[str, Any]], width: int = GAME_WIDTH,
+                 height: int = GAME_HEIGHT, cell_size: int = GRID_CELL_SIZE):
+        self.boxes = collision_boxes
+        self.width = width
+        self.height = height
+        self.cell_size = cell_size
+        self.cols = -(-width // cell_size)
+        self.rows = -(-height // cell_size)
+        self.cells = self._rasterize(0)
+        # Grades infladas por raio (soma de Minkowski caixa + círculo)
+        self._inflated: Dict[float, Any] = {}
+
+    def _new_cells(self):
+        size = self.cols * self.rows
+        # bytearray comporta até 254 caixas; acima disso usa 16 bits por célula
+        if len(self.boxes) < 255:
+            return bytearray(size)
+        return array("H", bytes(2 * size))
+
+    def _rasterize(self, radius: float):
+        """Marca as células cobertas pelas caixas expandidas por `radius`"""
+        cells = self._new_cells()
+        cs = self.cell_size
+        fill_type = bytes if isinstance(cells, bytearray) else (lambda v: array("H", v))
+
+        for index, box in enumerate(self.boxes):
+            half = int(box.get("size", BOX_SIZE)) // 2
+            box_x = int(box.get("x", 0))
+            box_y = int(box.get("y", 0))
+            x0, x1 = box_x - half, box_x + half
+            y0, y1 = box_y - half, box_y + half
+            value = index + 1
+
+            first_row = max(0, int((y0 - radius) // cs))
+            last_row = min(self.rows - 1, int((y1 + radius) // cs))
+            for row in range(first_row, last_row + 1):
+                # Distância vertical entre a linha de células e a caixa
+                row_y0 = row * cs
+                dy = max(0, y0 - (row_y0 + cs), row_y0 - y1)
+                if dy > radius:
+                    continue
+                reach = math.sqrt(radius * radius - dy * dy) if radius else 0
+
+                first_col = max(0, int((x0 - reach) // cs))
+                last_col = min(self.cols - 1, int((x1 + reach) // cs))
+                if first_col > last_col:
+                    continue
+                start = row * self.cols + first_col
+                count = last_col - first_col + 1
+                cells[start:start + count] = fill_type([value]) * count
+
+        return cells
+
+    def _index(self, x, y) -> int:
+        """Índice da célula do ponto, ou -1 se estiver fora do mapa"""
+        if x < 0 or y < 0 or x >= self.width or y >= self.height:
+            return -1
+        return int(y) // self.cell_size * self.cols + int(x) // self.cell_size
+
+    def box_at(self, x, y) -> Optional[Dict[str, Any]]:
+        """Retorna a caixa que contém o ponto (x, y), ou None"""
+        index = self._index(x, y)
+        if index < 0:
+            return None
+        value = self.cells[index]
+        return self.boxes[value - 1] if value else None
+
+    def point_blocked(self, x, y) -> bool:
+        """Verifica se o ponto (x, y) está dentro de alguma caixa"""
+        index = self._index(x, y)
+        return index >= 0 and self.cells[index] != 0
+
+    def circle_blocked(self, x, y, radius: float) -> bool:
+        """Verifica se um círculo de raio `radius` em (x, y) toca alguma caixa"""
+        index = self._index(x, y)
+        if index < 0:
+            return False
+        cells = self._inflated.get(radius)
+        if cells is None:
+            cells = self._rasterize(radius)
+            self._inflated[radius] = cells
+        return cells[index] != 0
+
+
+# Cache de grades por lista de caixas (as listas vêm de _loaded_maps, então são estáveis)
+_occupancy_grids: Dict[int, Any] = {}
+
+
+def get_occupancy_grid(collision_boxes: List[Dict[str, Any]]) -> OccupancyGrid:
+    """Obtém (ou constrói uma única vez) a grade de ocupação do mapa"""
+    entry = _occupancy_grids.get(id(collision_boxes))
+    if entry is not None and entry[0] is collision_boxes:
+        return entry[1]
+
+    if len(_occupancy_grids) >= 8:
+        _occupancy_grids.clear()
+    grid = OccupancyGrid(collision_boxes)
+    _occupancy_grids[id(collision_boxes)] = (collision_boxes, grid)
+    return grid
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Núcleo de Simulação - Regras determinísticas do jogo
+Compartilhado entre o servidor (websocket_game_handler.py) e o cliente (game-client.py)
+
+Concentra constantes, movimento, balas, colisão com caixas e regras de
+bandeira, para que a predição do cliente e a autoridade do servidor
+concordem. As funções são puras e trabalham com números soltos (sem criar
+dicts ou objetos intermediários), para poderem ser medidas e otimizadas aqui.
+"""
+
+import math
+
+
+# Configurações do jogo
+GAME_WIDTH = 800
+GAME_HEIGHT = 600
+PLAYER_SIZE = 20  # Raio do jogador
+PLAYER_SPEED = 5  # Pixels por passo de simulação
+DIAGONAL_FACTOR = 0.707  # Normalização do movimento diagonal
+FLAG_SIZE = 30
+BASE_SIZE = 100
+BOX_SIZE = 50  # Tamanho das caixas de colisão
+PLAYER_MAX_HP = 100
+RESPAWN_TIME = 5  # segundos
+
+# Configurações das balas
+BULLET_SIZE = 5
+BULLET_SPEED = 40  # Pixels por passo de bala
+BULLET_TICK = 1 / 30  # Intervalo entre passos de bala (segundos)
+BULLET_DAMAGE = 25
+BULLET_HIT_RADIUS = 30  # Raio de colisão bala x jogador
+BULLET_MAX_AGE = 30  # Segundos até a bala expirar
+
+# Times
+TEAMS = {
+    "red": {
+        "name": "Time Vermelho",
+        "color": [255, 100, 100],
+        "base_x": 50,
+        "base_y": GAME_HEIGHT // 2,
+        "flag_x": 50,
+        "flag_y": GAME_HEIGHT // 2,
+        "spawn_x": 100,
+        "spawn_y": GAME_HEIGHT // 2
+    },
+    "blue": {
+        "name": "Time Azul",
+        "color": [100, 100, 255],
+        "base_x": GAME_WIDTH - 50,
+        "base_y": GAME_HEIGHT // 2,
+        "flag_x": GAME_WIDTH - 50,
+        "flag_y": GAME_HEIGHT // 2,
+        "spawn_x": GAME_WIDTH - 100,
+        "spawn_y": GAME_HEIGHT // 2
+    }
+}
+
+_BULLET_HIT_RADIUS_SQ = BULLET_HIT_RADIUS * BULLET_HIT_RADIUS
+_BASE_RADIUS_SQ = (BASE_SIZE // 2) ** 2
+_FLAG_REACH_SQ = FLAG_SIZE * FLAG_SIZE
+
+
+def enemy_team(team):
+    """Retorna o time adversário"""
+    return "blue" if team == "red" else "red"
+
+
+# ---------------------------------------------------------------------------
+# Movimento
+# ---------------------------------------------------------------------------
+
+def player_blocked(grid, x, y):
+    """Verifica se o jogador em (x, y) colide com alguma caixa"""
+    return grid is not None and grid.circle_blocked(x, y, PLAYER_SIZE)
+
+
+def step_player(x, y, move_x, move_y, grid=None):
+    """
+    Avança o jogador um passo de simulação.
+    move_x/move_y são a direção da entrada (-1, 0 ou 1). Se o passo completo
+    colidir com uma caixa, tenta deslizar apenas no eixo X e depois no Y.
+    Retorna a nova posição (x, y).
+    """
+    dx = move_x * PLAYER_SPEED
+    dy = move_y * PLAYER_SPEED
+    if dx != 0 and dy != 0:
+        dx *= DIAGONAL_FACTOR
+        dy *= DIAGONAL_FACTOR
+
+    max_x = GAME_WIDTH - PLAYER_SIZE
+    max_y = GAME_HEIGHT - PLAYER_SIZE
+    new_x = max(0, min(max_x, x + dx))
+    new_y = max(0, min(max_y, y + dy))
+
+    if not player_blocked(grid, new_x, new_y):
+        return new_x, new_y
+
+    # Colisão: tenta movimento apenas em um eixo
+    if dx != 0 and not player_blocked(grid, new_x, y):
+        x = new_x
+    if dy != 0 and not player_blocked(grid, x, new_y):
+        y = new_y
+    return x, y
+
+
+def player_position_valid(x, y, grid=None):
+    """Verifica se (x, y) é uma posição válida para o jogador (dentro do mapa e fora das caixas)"""
+    if x < 0 or x > GAME_WIDTH - PLAYER_SIZE or y < 0 or y > GAME_HEIGHT - PLAYER_SIZE:
+        return False
+    return not player_blocked(grid, x, y)
+
+
+# ---------------------------------------------------------------------------
+# Balas
+# ---------------------------------------------------------------------------
+
+def bullet_velocity(from_x, from_y, target_x, target_y):
+    """Calcula o vetor de velocidade (por passo) de uma bala em direção ao alvo"""
+    dx = target_x - from_x
+    dy = target_y - from_y
+    distance = math.sqrt(dx * dx + dy * dy)
+    if distance > 0:
+        return dx / distance * BULLET_SPEED, dy / distance * BULLET_SPEED
+    return 0, BULLET_SPEED
+
+
+def step_bullet(x, y, dx, dy):
+    """Avança a bala um passo"""
+    return x + dx, y + dy
+
+
+def bullet_out_of_bounds(x, y):
+    """Verifica se a bala saiu da tela"""
+    return x < 0 or x > GAME_WIDTH or y < 0 or y > GAME_HEIGHT
+
+
+def bullet_expired(created_at, now):
+    """Verifica se a bala ultrapassou o tempo máximo de vida"""
+    return now - created_at > BULLET_MAX_AGE
+
+
+def bullet_hits_box(grid, x, y):
+    """Retorna a caixa atingida pela bala em (x, y), ou None"""
+    return grid.box_at(x, y) if grid is not None else None
+
+
+def bullet_hits_player(bullet_x, bullet_y, player_x, player_y):
+    """Verifica se a bala atinge o jogador"""
+    dx = bullet_x - player_x
+    dy = bullet_y - player_y
+    return dx * dx + dy * dy < _BULLET_HIT_RADIUS_SQ
+
+
+def apply_damage(hp):
+    """Retorna o HP após um tiro"""
+    return max(0, hp - BULLET_DAMAGE)
+
+
+# ---------------------------------------------------------------------------
+# Bandeiras
+# ---------------------------------------------------------------------------
+
+def flag_capture_error(player_team, player_hp, flag_team, flag):
+    """
+    Verifica as regras de captura de bandeira.
+    Retorna None se a captura é permitida, ou o motivo: "dead", "own_team" ou "captured".
+    """
+    if player_hp <= 0:
+        return "dead"
+    if player_team == flag_team:
+        return "own_team"
+    if flag["captured"]:
+        return "captured"
+    return None
+
+
+def near_flag(x, y, flag):
+    """Verifica se o jogador está perto o bastante para pegar a bandeira"""
+    dx = x - flag["x"]
+    dy = y - flag["y"]
+    return dx * dx + dy * dy < _FLAG_REACH_SQ
+
+
+def flag_scored(flag_team, carrier_x, carrier_y):
+    """Verifica se o portador levou a bandeira `flag_team` até a própria base"""
+    base = TEAMS[enemy_team(flag_team)]
+    dx = carrier_x - base["base_x"]
+    dy = carrier_y - base["base_y"]
+    return dx * dx + dy * dy < _BASE_RADIUS_SQ
+
+
+def flag_home_position(flag_team):
+    """Posição inicial da bandeira do time"""
+    team = TEAMS[flag_team]
+    return team["flag_x"], team["flag_y"]
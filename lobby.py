@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Lobby - Registro de salas e distribuição de jogadores
+Usado por websocket_game_handler.py
+
+Cada sala tem um item na tabela game_rooms com contadores mantidos por
+operações atômicas (ADD) do DynamoDB: jogadores na sala e jogadores por time.
+Um jogador sem sala escolhida vai para a sala aberta menos cheia que ainda tem
+vaga; se todas estiverem cheias, uma sala nova é criada. As candidatas vêm de
+uma Query no índice global de salas abertas (partição status, ordenação
+players), sem varrer a tabela: só as salas menos cheias com vaga são lidas. O
+time é escolhido pelos contadores da sala, sem varrer a tabela de conexões.
+Quando o último jogador sai, a sala é aposentada.
+"""
+
+import time
+import uuid
+from collections import namedtuple
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from botocore.exceptions import ClientError
+
+from game_simulation import TEAMS
+
+
+DEFAULT_ROOM_CAPACITY = 10  # Jogadores por sala (5 contra 5)
+MAX_PLACEMENT_ATTEMPTS = 5  # Salas tentadas antes de criar uma nova (outras invocações podem lotar a escolhida)
+ROOM_ID_PREFIX = "sala-"
+
+ROOM_OPEN = "open"
+# Índice global de game_rooms (partição status, ordenação players)
+OPEN_ROOMS_INDEX = "status-players-index"
+
+# Resultado de uma colocação: sala, time, se a sala foi criada, tentativas e tempo gasto
+Placement = namedtuple("Placement", ["room_id", "team", "created", "attempts", "elapsed_ms"])
+
+
+class RoomFullError(Exception):
+    """A sala pedida não tem vaga"""
+
+
+def _is_conditional_failure(error: ClientError) -> bool:
+    return error.response["Error"]["Code"] == "ConditionalCheckFailedException"
+
+
+def pick_team(room: Dict[str, Any]) -> str:
+    """Time com menos jogadores na sala (vermelho no empate)"""
+    return min(TEAMS, key=lambda team: (int(room.get(team, 0)), team != "red"))
+
+
+class RoomRegistry:
+    """Salas abertas e seus contadores (tabela game_rooms, partição room_id)"""
+
+    def __init__(self, table, capacity: int = DEFAULT_ROOM_CAPACITY, index: str = OPEN_ROOMS_INDEX):
+        self.table = table
+        self.capacity = capacity
+        self.index = index
+
+    def open_rooms(self, limit: int = MAX_PLACEMENT_ATTEMPTS) -> List[Dict[str, Any]]:
+        """Salas abertas com vaga, da menos cheia para a mais cheia (no máximo `limit`, lidas pelo índice)"""
+        response = self.table.query(
+            IndexName=self.index,
+            KeyConditionExpression="#status = :open AND players < :capacity",
+            ExpressionAttributeNames={"#status": "status"},
+            ExpressionAttributeValues={":open": ROOM_OPEN, ":capacity": self.capacity},
+            Limit=limit
+        )
+        return [room for room in response.get("Items", []) if room.get("players", 0) < room.get("capacity", self.capacity)]
+
+    def create_room(self, room_id: Optional[str] = None) -> Dict[str, Any]:
+        """Registra uma sala vazia (não faz nada se ela já existir)"""
+        room = {
+            "room_id": room_id or f"{ROOM_ID_PREFIX}{uuid.uuid4().hex[:8]}",
+            "status": ROOM_OPEN,
+            "capacity": self.capacity,
+            "players": 0,
+            **{team: 0 for team in TEAMS},
+            "created_at": int(time.time())
+        }
+        try:
+            self.table.put_item(Item=room, ConditionExpression="attribute_not_exists(room_id)")
+        except ClientError as e:
+            if not _is_conditional_failure(e):
+                raise
+            return self.table.get_item(Key={"room_id": room["room_id"]}).get("Item", room)
+        return room
+
+    def join_room(self, room: Dict[str, Any], team: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Ocupa uma vaga da sala no time pedido (ou no menos cheio) com um ADD
+        condicional; levanta RoomFullError se a sala lotou ou foi aposentada.
+        """
+        team = team or pick_team(room)
+        try:
+            response = self.table.update_item(
+                Key={"room_id": room["room_id"]},
+                UpdateExpression="SET last_activity = :time ADD players :one, #team :one",
+                ConditionExpression="#status = :open AND players < :capacity",
+                ExpressionAttributeNames={"#status": "status", "#team": team},
+                ExpressionAttributeValues={
+                    ":one": 1,
+                    ":open": ROOM_OPEN,
+                    ":capacity": room.get("capacity", self.capacity),
+                    ":time": int(time.time())
+                },
+                ReturnValues="ALL_NEW"
+            )
+        except ClientError as e:
+            if _is_conditional_failure(e):
+                raise RoomFullError(room["room_id"]) from e
+            raise
+        return {**response["Attributes"], "team": team}
+
+    def place(self, room_id: Optional[str] = None, team: Optional[str] = None) -> Placement:
+        """
+        Coloca um jogador numa sala: a pedida (criada se não existir) ou a
+        aberta menos cheia com vaga, criando uma nova quando todas lotarem.
+        """
+        start = time.perf_counter()
+        if room_id:
+            room = self.table.get_item(Key={"room_id": room_id}).get("Item") or self.create_room(room_id)
+            joined = self.join_room(room, team)
+            return Placement(room_id, joined["team"], False, 1, (time.perf_counter() - start) * 1000)
+
+        attempts = 0
+        for room in self.open_rooms():
+            attempts += 1
+            try:
+                joined = self.join_room(room, team)
+                return Placement(room["room_id"], joined["team"], False, attempts, (time.perf_counter() - start) * 1000)
+            except RoomFullError:
+                continue  # Outra invocação pegou a última vaga
+
+        room = self.create_room()
+        joined = self.join_room(room, team)
+        return Placement(room["room_id"], joined["team"], True, attempts + 1, (time.perf_counter() - start) * 1000)
+
+    def leave(self, room_id: str, team: Optional[str], retire_when_empty: bool = True) -> bool:
+        """
+        Libera a vaga do jogador; com a sala vazia, aposenta a sala.
+        Retorna True se a sala foi aposentada.
+        """
+        update = "SET last_activity = :time ADD players :minus_one"
+        names = {}
+        if team in TEAMS:
+            update += ", #team :minus_one"
+            names["#team"] = team
+        params = {
+            "Key": {"room_id": room_id},
+            "UpdateExpression": update,
+            "ConditionExpression": "players > :zero",
+            "ExpressionAttributeValues": {":minus_one": -1, ":zero": 0, ":time": int(time.time())},
+            "ReturnValues": "ALL_NEW"
+        }
+        if names:
+            params["ExpressionAttributeNames"] = names
+        try:
+            room = self.table.update_item(**params)["Attributes"]
+        except ClientError as e:
+            if _is_conditional_failure(e):
+                return False  # Sala inexistente ou já vazia
+            raise
+
+        if retire_when_empty and room.get("players", 0) <= 0:
+            return self.retire(room_id)
+        return False
+
+    def retire(self, room_id: str) -> bool:
+        """Remove a sala do registro se ela continuar vazia"""
+        try:
+            self.table.delete_item(
+                Key={"room_id": room_id},
+                ConditionExpression="players <= :zero",
+                ExpressionAttributeValues={":zero": 0}
+            )
+            return True
+        except ClientError as e:
+            if _is_conditional_failure(e):
+                return False  # Alguém entrou nesse meio tempo
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Salas abertas e ocupação total"""
+        rooms = self.table.scan().get("Items", [])
+        return {
+            "rooms": len(rooms),
+            "players": int(sum(room.get("players", Decimal(0)) for room in rooms)),
+            "full_rooms": sum(1 for room in rooms if room.get("players", 0) >= room.get("capacity", self.capacity))
+        }
@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+"""
+Backend Local - Substitutos em memória do DynamoDB e do API Gateway
+Usado por local_server.py e pelos benchmarks para rodar websocket_game_handler.py
+sem AWS
+
+As tabelas aceitam o mesmo subconjunto da API de Table do boto3 que o servidor
+usa (put_item, get_item, update_item, delete_item, scan, query) e se comportam como o
+DynamoDB nos detalhes que importam: números voltam como Decimal, float é
+rejeitado, cada leitura devolve uma cópia e, com ReturnConsumedCapacity, a
+resposta traz uma estimativa da capacidade consumida. Cada tabela conta operações e itens
+lidos, e o cliente do API Gateway conta mensagens e bytes enviados.
+"""
+
+import copy
+import json
+import math
+import re
+import threading
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional
+
+from botocore.exceptions import ClientError
+
+from lobby import OPEN_ROOMS_INDEX
+
+
+def to_dynamo_item(value, path="Item"):
+    """Converte um valor para o que o DynamoDB guardaria (números viram Decimal)"""
+    if isinstance(value, bool) or value is None or isinstance(value, (str, Decimal)):
+        return value
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, float):
+        # Mesmo erro do serializador do boto3
+        raise TypeError(f"Float types are not supported. Use Decimal types instead. ({path})")
+    if isinstance(value, dict):
+        return {key: to_dynamo_item(item, f"{path}.{key}") for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_dynamo_item(item, f"{path}[{i}]") for i, item in enumerate(value)]
+    raise TypeError(f"Unsupported type {type(value)} for value {value} ({path})")
+
+
+def _validation_error(message, operation):
+    return ClientError({"Error": {"Code": "ValidationException", "Message": message}}, operation)
+
+
+def _conditional_check_failed(operation):
+    return ClientError(
+        {"Error": {"Code": "ConditionalCheckFailedException", "Message": "The conditional request failed"}},
+        operation
+    )
+
+
+# Condições suportadas: termos ligados por AND e OR, com grupos entre parênteses
+#   attribute_exists(a) | attribute_not_exists(a) | a = :v | a <> :v | a < :v | a <= :v | a > :v | a >= :v
+_CONDITION_TERM = re.compile(
+    r"^\s*(?:(attribute_exists|attribute_not_exists)\(\s*([\w#]+)\s*\)"
+    r"|([\w#]+)\s*(=|<>|<=|>=|<|>)\s*(:\w+))\s*$"
+)
+
+
+def _resolve_name(name, names):
+    return names.get(name, name) if name.startswith("#") else name
+
+
+def _split_top_level(expression, keyword):
+    """Separa a expressão pelo operador lógico fora de parênteses"""
+    parts, depth, start = [], 0, 0
+    separator = re.compile(rf"\s+{keyword}\s+", re.IGNORECASE)
+    i = 0
+    while i < len(expression):
+        char = expression[i]
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif depth == 0:
+            match = separator.match(expression, i)
+            if match:
+                parts.append(expression[start:i])
+                start = i = match.end()
+                continue
+        i += 1
+    parts.append(expression[start:])
+    return parts
+
+
+def _is_group(expression):
+    """Expressão inteira entre um par de parênteses (e não attribute_exists(a))"""
+    if not (expression.startswith("(") and expression.endswith(")")):
+        return False
+    depth = 0
+    for i, char in enumerate(expression):
+        depth += {"(": 1, ")": -1}.get(char, 0)
+        if depth == 0 and i < len(expression) - 1:
+            return False
+    return True
+
+
+def evaluate_condition(expression: str, item: Optional[Dict[str, Any]], values: Dict[str, Any],
+                       names: Optional[Dict[str, str]] = None) -> bool:
+    """Avalia uma FilterExpression/ConditionExpression simples sobre o item"""
+    names = names or {}
+    item = item or {}
+    expression = expression.strip()
+    alternatives = _split_top_level(expression, "OR")
+    if len(alternatives) > 1:
+        return any(evaluate_condition(alternative, item, values, names) for alternative in alternatives)
+    for term in _split_top_level(expression, "AND"):
+        term = term.strip()
+        if _is_group(term):
+            if not evaluate_condition(term[1:-1], item, values, names):
+                return False
+            continue
+        match = _CONDITION_TERM.match(term)
+        if not match:
+            raise _validation_error(f"Expressão não suportada localmente: {term}", "Condition")
+        function, function_attr, attr, operator, placeholder = match.groups()
+        if function:
+            exists = _resolve_name(function_attr, names) in item
+            if exists != (function == "attribute_exists"):
+                return False
+            continue
+
+        attr = _resolve_name(attr, names)
+        expected = to_dynamo_item(values[placeholder])
+        if attr not in item:
+            # Atributo ausente: só "<>" é verdadeiro (como no DynamoDB)
+            if operator != "<>":
+                return False
+            continue
+        actual = item[attr]
+        if operator == "=":
+            ok = actual == expected
+        elif operator == "<>":
+            ok = actual != expected
+        else:
+            try:
+                ok = {"<": actual < expected, "<=": actual <= expected,
+                      ">": actual > expected, ">=": actual >= expected}[operator]
+            except TypeError:
+                ok = False
+        if not ok:
+            return False
+    return True
+
+
+_UPDATE_CLAUSE = re.compile(r"\b(SET|ADD|REMOVE)\b", re.IGNORECASE)
+
+
+def _split_actions(body):
+    """Separa as ações de uma cláusula por vírgulas fora de parênteses"""
+    parts, depth, current = [], 0, []
+    for char in body:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+        else:
+            current.append(char)
+    if "".join(current).strip():
+        parts.append("".join(current).strip())
+    return parts
+
+
+def _set_value(expression, item, values, names):
+    """Valor do lado direito de um SET: :v, a, if_not_exists(a, :v), x + :v ou x - :v"""
+    expression = expression.strip()
+    arithmetic = re.match(r"^(.+?)\s*([+-])\s*(:\w+)$", expression)
+    if arithmetic:
+        left = _set_value(arithmetic.group(1), item, values, names)
+        right = to_dynamo_item(values[arithmetic.group(3)])
+        return left + right if arithmetic.group(2) == "+" else left - right
+    function = re.match(r"^if_not_exists\(\s*([\w#]+)\s*,\s*(:\w+)\s*\)$", expression)
+    if function:
+        attr = _resolve_name(function.group(1), names)
+        return item[attr] if attr in item else to_dynamo_item(values[function.group(2)])
+    if expression.startswith(":"):
+        return to_dynamo_item(values[expression])
+    return item[_resolve_name(expression, names)]
+
+
+def apply_update(item: Dict[str, Any], expression: str, values: Dict[str, Any],
+                 names: Optional[Dict[str, str]] = None):
+    """Aplica uma UpdateExpression (SET, ADD e REMOVE) ao item, no lugar"""
+    names = names or {}
+    pieces = _UPDATE_CLAUSE.split(expression)
+    for i in range(1, len(pieces), 2):
+        clause = pieces[i].upper()
+        for action in _split_actions(pieces[i + 1]):
+            if clause == "SET":
+                attr, value = action.split("=", 1)
+                item[_resolve_name(attr.strip(), names)] = _set_value(value, item, values, names)
+            elif clause == "ADD":
+                attr, placeholder = action.split()
+                attr = _resolve_name(attr, names)
+                item[attr] = item.get(attr, Decimal(0)) + to_dynamo_item(values[placeholder])
+            else:
+                item.pop(_resolve_name(action.strip(), names), None)
+
+
+def item_size(item: Optional[Dict[str, Any]]) -> int:
+    """Tamanho aproximado do item como o DynamoDB cobra (nomes + valores)"""
+    return len(json.dumps(item, default=str).encode("utf-8")) if item else 0
+
+
+def read_units(size: int, consistent: bool = False) -> float:
+    """Leitura: 1 unidade por 4 KB (metade com leitura eventualmente consistente, o padrão)"""
+    return max(1, math.ceil(size / 4096)) * (1.0 if consistent else 0.5)
+
+
+def write_units(size: int) -> float:
+    """Escrita: 1 unidade por KB"""
+    return float(max(1, math.ceil(size / 1024)))
+
+
+# Índice por sala das tabelas de conexões e balas (mesmo nome de websocket_game_handler.ROOM_INDEX)
+ROOM_INDEX = "room_id-index"
+
+_KEY_CONDITION = re.compile(
+    r"^\s*([\w#]+)\s*=\s*(:\w+)\s*(?:AND\s+([\w#]+)\s*(=|<=|>=|<|>)\s*(:\w+)\s*)?$", re.IGNORECASE)
+
+
+class LocalTable:
+    """Tabela do DynamoDB em memória (thread-safe)"""
+
+    def __init__(self, name: str, key: str, indexes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.table_name = name
+        self.key = key
+        self.indexes = dict(indexes or {})  # nome do índice -> atributo de partição ou (partição, ordenação)
+        self.items: Dict[Any, Dict[str, Any]] = {}
+        self.sizes: Dict[Any, tuple] = {}  # chave -> (item, tamanho): o tamanho é calculado uma vez por versão do item
+        self.lock = threading.RLock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {"get": 0, "put": 0, "update": 0, "delete": 0, "scan": 0, "query": 0, "items_read": 0}
+
+    def _size(self, item: Optional[Dict[str, Any]]) -> int:
+        if item is None:
+            return 0
+        key = item.get(self.key)
+        cached = self.sizes.get(key)
+        if cached is None or cached[0] is not item:
+            cached = self.sizes[key] = (item, item_size(item))
+        return cached[1]
+
+    def _with_capacity(self, response: Dict[str, Any], units: float, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Inclui a capacidade consumida estimada se pedida (ReturnConsumedCapacity)"""
+        if kwargs.get("ReturnConsumedCapacity") in ("TOTAL", "INDEXES"):
+            response["ConsumedCapacity"] = {"TableName": self.name, "CapacityUnits": units}
+        return response
+
+    def _key_of(self, key: Dict[str, Any]):
+        if set(key) != {self.key}:
+            raise _validation_error(f"Chave inválida para {self.name}: {key}", "Key")
+        return to_dynamo_item(key[self.key])
+
+    def put_item(self, Item, ConditionExpression=None, ExpressionAttributeValues=None,
+                 ExpressionAttributeNames=None, **kwargs):
+        item = to_dynamo_item(Item)
+        with self.lock:
+            self.stats["put"] += 1
+            key = item[self.key]
+            if ConditionExpression and not evaluate_condition(
+                    ConditionExpression, self.items.get(key), ExpressionAttributeValues or {}, ExpressionAttributeNames):
+                raise _conditional_check_failed("PutItem")
+            old = self.items.get(key)
+            self.items[key] = item
+        return self._with_capacity({}, write_units(max(self._size(item), self._size(old))), kwargs)
+
+    def get_item(self, Key, **kwargs):
+        with self.lock:
+            self.stats["get"] += 1
+            item = self.items.get(self._key_of(Key))
+            units = read_units(self._size(item), kwargs.get("ConsistentRead", False))
+            if item is None:
+                return self._with_capacity({}, units, kwargs)
+            self.stats["items_read"] += 1
+            return self._with_capacity({"Item": copy.deepcopy(item)}, units, kwargs)
+
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues=None, ExpressionAttributeNames=None,
+                    ConditionExpression=None, ReturnValues="NONE", **kwargs):
+        values = ExpressionAttributeValues or {}
+        with self.lock:
+            self.stats["update"] += 1
+            key = self._key_of(Key)
+            current = self.items.get(key)
+            if ConditionExpression and not evaluate_condition(ConditionExpression, current, values, ExpressionAttributeNames):
+                raise _conditional_check_failed("UpdateItem")
+            # Como no DynamoDB, atualizar um item inexistente cria o item
+            item = copy.deepcopy(current) if current is not None else {self.key: key}
+            apply_update(item, UpdateExpression, values, ExpressionAttributeNames)
+            self.items[key] = item
+            units = write_units(max(self._size(item), self._size(current)))
+            if ReturnValues == "ALL_NEW":
+                return self._with_capacity({"Attributes": copy.deepcopy(item)}, units, kwargs)
+            if ReturnValues == "ALL_OLD" and current is not None:
+                return self._with_capacity({"Attributes": copy.deepcopy(current)}, units, kwargs)
+        return self._with_capacity({}, units, kwargs)
+
+    def delete_item(self, Key, ConditionExpression=None, ExpressionAttributeValues=None,
+                    ExpressionAttributeNames=None, ReturnValues="NONE", **kwargs):
+        with self.lock:
+            self.stats["delete"] += 1
+            key = self._key_of(Key)
+            if ConditionExpression and not evaluate_condition(
+                    ConditionExpression, self.items.get(key), ExpressionAttributeValues or {}, ExpressionAttributeNames):
+                raise _conditional_check_failed("DeleteItem")
+            old = self.items.pop(key, None)
+            units = write_units(self._size(old))
+            self.sizes.pop(key, None)
+            if ReturnValues == "ALL_OLD" and old is not None:
+                return self._with_capacity({"Attributes": old}, units, kwargs)
+        return self._with_capacity({}, units, kwargs)
+
+    def scan(self, FilterExpression=None, ExpressionAttributeValues=None, ExpressionAttributeNames=None, **kwargs):
+        with self.lock:
+            self.stats["scan"] += 1
+            # O scan lê (e cobra) a tabela inteira, mesmo com filtro
+            self.stats["items_read"] += len(self.items)
+            items = list(self.items.values())
+            units = read_units(sum(self._size(item) for item in items), kwargs.get("ConsistentRead", False))
+            if FilterExpression:
+                items = [item for item in items if evaluate_condition(
+                    FilterExpression, item, ExpressionAttributeValues or {}, ExpressionAttributeNames)]
+            response = {"Items": copy.deepcopy(items), "Count": len(items), "ScannedCount": len(self.items)}
+            return self._with_capacity(response, units, kwargs)
+
+    def query(self, KeyConditionExpression, ExpressionAttributeValues=None, ExpressionAttributeNames=None,
+              IndexName=None, FilterExpression=None, ScanIndexForward=True, Limit=None, **kwargs):
+        """
+        Query por igualdade na chave de partição (da tabela ou de um índice global), com condição opcional
+        na chave de ordenação do índice; os itens saem ordenados por ela e Limit conta os itens lidos
+        """
+        values = ExpressionAttributeValues or {}
+        names = ExpressionAttributeNames or {}
+        match = _KEY_CONDITION.match(KeyConditionExpression)
+        if not match:
+            raise _validation_error(f"KeyConditionExpression não suportada localmente: {KeyConditionExpression}", "Query")
+        attr = _resolve_name(match.group(1), names)
+        index_keys = self.indexes.get(IndexName) if IndexName else self.key
+        partition_attr, sort_attr = index_keys if isinstance(index_keys, tuple) else (index_keys, None)
+        if attr != partition_attr:
+            raise _validation_error(f"{attr} não é a chave de partição de {IndexName or self.name}", "Query")
+        sort_condition = None
+        if match.group(3):
+            if _resolve_name(match.group(3), names) != sort_attr:
+                raise _validation_error(f"{match.group(3)} não é a chave de ordenação de {IndexName or self.name}", "Query")
+            sort_condition = " ".join(match.group(3, 4, 5))
+        expected = to_dynamo_item(values[match.group(2)])
+
+        with self.lock:
+            self.stats["query"] += 1
+            items = [item for item in self.items.values() if item.get(attr) == expected]
+            if sort_attr is not None:
+                # Índice esparso: só entram itens com a chave de ordenação
+                items = [item for item in items if sort_attr in item
+                         and (sort_condition is None or evaluate_condition(sort_condition, item, values, names))]
+                items.sort(key=lambda item: item[sort_attr], reverse=not ScanIndexForward)
+            if Limit is not None:
+                items = items[:Limit]
+            self.stats["items_read"] += len(items)
+            # O filtro é aplicado depois da leitura: a capacidade é a dos itens da partição
+            units = read_units(sum(self._size(item) for item in items), kwargs.get("ConsistentRead", False))
+            if FilterExpression:
+                items = [item for item in items if evaluate_condition(FilterExpression, item, values, names)]
+            return self._with_capacity({"Items": copy.deepcopy(items), "Count": len(items)}, units, kwargs)
+
+
+def new_rooms_table() -> LocalTable:
+    """Tabela game_rooms com o índice de salas abertas do lobby (status, players)"""
+    return LocalTable("game_rooms", "room_id", indexes={OPEN_ROOMS_INDEX: ("status", "players")})
+
+
+class LocalApiGatewayClient:
+    """
+    Substituto do cliente apigatewaymanagementapi.
+    `sender(connection_id, data)` entrega a mensagem e retorna False se a
+    conexão não existe mais (vira GoneException, como na AWS).
+    """
+
+    def __init__(self, sender: Optional[Callable[[str, str], bool]] = None):
+        self.sender = sender
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {"messages": 0, "bytes": 0, "gone": 0}
+
+    def post_to_connection(self, ConnectionId, Data):
+        data = Data.decode("utf-8") if isinstance(Data, bytes) else Data
+        delivered = self.sender(ConnectionId, data) if self.sender else True
+        with self.lock:
+            if not delivered:
+                self.stats["gone"] += 1
+            else:
+                self.stats["messages"] += 1
+                self.stats["bytes"] += len(data.encode("utf-8"))
+        if not delivered:
+            raise ClientError({"Error": {"Code": "GoneException", "Message": f"{ConnectionId} is gone"}},
+                              "PostToConnection")
+        return {}
+
+
+class LocalBackend:
+    """Conjunto de tabelas em memória + cliente do API Gateway, instalável no handler"""
+
+    def __init__(self, sender: Optional[Callable[[str, str], bool]] = None):
+        self.connections_table = LocalTable("WebSocketConnections", "connection_id", indexes={ROOM_INDEX: "room_id"})
+        self.bullets_table = LocalTable("game_bullets", "id", indexes={ROOM_INDEX: "room_id"})
+        self.game_state_table = LocalTable("game_state", "id")
+        self.rooms_table = new_rooms_table()
+        self.api_gateway_client = LocalApiGatewayClient(sender)
+
+    @property
+    def tables(self) -> List[LocalTable]:
+        return [self.connections_table, self.bullets_table, self.game_state_table, self.rooms_table]
+
+    def install(self, handler_module):
+        """Troca as tabelas (instrumentadas como as do handler) e o cliente do API Gateway pelos locais"""
+        instrument = handler_module.InstrumentedTable
+        handler_module.connections_table = instrument(self.connections_table, "connections")
+        handler_module.bullets_table = instrument(self.bullets_table, "bullets")
+        handler_module.game_state_table = instrument(self.game_state_table, "game_state")
+        handler_module.rooms_table = instrument(self.rooms_table, "rooms")
+        handler_module.room_registry = handler_module.RoomRegistry(handler_module.rooms_table, handler_module.ROOM_CAPACITY)
+        handler_module.get_api_gateway_client = lambda domain_name, stage: self.api_gateway_client
+        return self
+
+    def _room_tables(self, room_id: str, state_key: str):
+        """Tabelas e filtro dos itens que pertencem a uma sala"""
+        in_room = lambda item: item.get("room_id") == room_id  # noqa: E731
+        return {
+            "connections": (self.connections_table, in_room),
+            "bullets": (self.bullets_table, in_room),
+            "rooms": (self.rooms_table, in_room),
+            "game_state": (self.game_state_table, lambda item: item.get("id") == state_key),
+        }
+
+    def export_room(self, room_id: str, state_key: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Retira das tabelas todos os itens da sala (para mover a sala para outro processo)"""
+        exported = {}
+        for name, (table, belongs) in self._room_tables(room_id, state_key).items():
+            with table.lock:
+                keys = [key for key, item in table.items.items() if belongs(item)]
+                exported[name] = [table.items.pop(key) for key in keys]
+        return exported
+
+    def import_room(self, exported: Dict[str, List[Dict[str, Any]]]):
+        """Recebe os itens de uma sala exportada por export_room"""
+        tables = self._room_tables(None, None)
+        for name, items in exported.items():
+            table = tables[name][0]
+            with table.lock:
+                for item in items:
+                    table.items[item[table.key]] = item
+
+    def reset_stats(self):
+        for table in self.tables:
+            table.reset_stats()
+        self.api_gateway_client.reset_stats()
+
+    def stats(self) -> Dict[str, Any]:
+        """Operações por tabela e mensagens enviadas"""
+        return {
+            "tables": {table.name: dict(table.stats) for table in self.tables},
+            "api_gateway": dict(self.api_gateway_client.stats)
+        }
+
+
+def make_event(connection_id: str, route_key: str, body: Optional[str] = None,
+               domain_name: str = "localhost", stage: str = "local",
+               params: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Monta um evento do API Gateway WebSocket como o Lambda recebe"""
+    event = {
+        "requestContext": {
+            "connectionId": connection_id,
+            "domainName": domain_name,
+            "stage": stage,
+            "routeKey": route_key
+        }
+    }
+    if body is not None:
+        event["body"] = body
+    if params:
+        event["queryStringParameters"] = params  # Parâmetros da URL do $connect (?room=...)
+    return event
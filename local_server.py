@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Servidor Local - Roda websocket_game_handler.py sem AWS
+Para desenvolvimento, bots e testes de carga
+
+Um servidor WebSocket mínimo (asyncio, sem dependências extras) faz o papel do
+API Gateway: cada conexão, desconexão e mensagem vira um evento $connect,
+$disconnect ou $default para o lambda_handler, executado no mesmo processo com
+as tabelas em memória de local_backend.py. As invocações são serializadas numa
+única thread, como um Lambda com concorrência 1.
+
+Com --nodes N, sobem N servidores (portas seguidas) que dividem as tabelas e
+cada um só alcança as próprias conexões: os broadcasts de sala passam pelo
+barramento (broadcast_bus.py), em processo ou por um broker TCP (--broker).
+
+Uso:
+    python local_server.py [--host 127.0.0.1] [--port 8765] [--verbose]
+    python local_server.py --nodes 3 [--broker 127.0.0.1:8790]
+    WEBSOCKET_URL=ws://127.0.0.1:8765 python game-client.py
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import struct
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+# Região padrão para rodar sem configuração da AWS (o handler só cria clientes do boto3 se eles forem usados)
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+import websocket_game_handler as handler  # noqa: E402
+from broadcast_bus import InProcessBus, InProcessHub, SocketBus, parse_address  # noqa: E402
+from local_backend import LocalBackend, make_event  # noqa: E402
+from telemetry import MetricsSummary  # noqa: E402
+
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+MAX_MESSAGE_SIZE = 128 * 1024  # Limite de mensagem do API Gateway WebSocket
+
+OPCODE_CONTINUATION = 0x0
+OPCODE_TEXT = 0x1
+OPCODE_BINARY = 0x2
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+
+def encode_frame(payload: bytes, opcode: int = OPCODE_TEXT) -> bytes:
+    """Monta um frame WebSocket do servidor (sem máscara)"""
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+async def read_frame(reader: asyncio.StreamReader):
+    """Lê um frame do cliente e retorna (fin, opcode, payload)"""
+    first, second = await reader.readexactly(2)
+    fin = bool(first & 0x80)
+    opcode = first & 0x0F
+    masked = bool(second & 0x80)
+    length = second & 0x7F
+    if length == 126:
+        (length,) = struct.unpack("!H", await reader.readexactly(2))
+    elif length == 127:
+        (length,) = struct.unpack("!Q", await reader.readexactly(8))
+    if length > MAX_MESSAGE_SIZE:
+        raise ValueError(f"Mensagem maior que {MAX_MESSAGE_SIZE} bytes")
+
+    mask = await reader.readexactly(4) if masked else None
+    payload = await reader.readexactly(length)
+    if mask and length:
+        # XOR da máscara de uma vez (inteiros grandes), em vez de byte a byte
+        key = (mask * (length // 4 + 1))[:length]
+        payload = (int.from_bytes(payload, "big") ^ int.from_bytes(key, "big")).to_bytes(length, "big")
+    return fin, opcode, payload
+
+
+def silence_handler_logs():
+    """Desliga os prints do handler (só do módulo dele, o resto do processo continua logando)"""
+    handler.print = lambda *args, **kwargs: None
+
+
+class WebSocketGateway:
+    """
+    Papel do API Gateway: aceita conexões WebSocket e transforma cada conexão,
+    mensagem e desconexão num evento para call_handler (definido pelas subclasses)
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, verbose: bool = False):
+        self.host = host
+        self.port = port
+        self.verbose = verbose
+        self.connections = {}  # connection_id -> StreamWriter
+        self.loop = None
+        self.server = None
+        self.ready = threading.Event()
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def call_handler(self, connection_id: str, route_key: str, body: str = None, params: dict = None):
+        """Processa um evento $connect (com os parâmetros da URL), $default ou $disconnect"""
+        raise NotImplementedError
+
+    def send_to_connection(self, connection_id: str, data: str) -> bool:
+        """Entrega uma mensagem do handler para o cliente (chamado pela thread do handler)"""
+        writer = self.connections.get(connection_id)
+        if writer is None or writer.is_closing():
+            return False
+        frame = encode_frame(data.encode("utf-8"))
+        self.loop.call_soon_threadsafe(self._write, writer, frame)
+        return True
+
+    @staticmethod
+    def _write(writer, frame):
+        if not writer.is_closing():
+            writer.write(frame)
+
+    async def handshake(self, reader, writer):
+        """Handshake HTTP do WebSocket (RFC 6455); retorna os parâmetros da URL ou None se falhar"""
+        request = await reader.readuntil(b"\r\n\r\n")
+        lines = request.decode("latin-1").split("\r\n")
+        request_line = lines[0].split(" ")
+        params = dict(parse_qsl(urlsplit(request_line[1]).query)) if len(request_line) > 1 else {}
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        key = headers.get("sec-websocket-key")
+        if not key or headers.get("upgrade", "").lower() != "websocket":
+            writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+            await writer.drain()
+            return None
+
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+        writer.write((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+        ).encode())
+        await writer.drain()
+        return params
+
+    async def handle_client(self, reader, writer):
+        try:
+            params = await self.handshake(reader, writer)
+            if params is None:
+                writer.close()
+                return
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.LimitOverrunError):
+            writer.close()
+            return
+
+        # Ids no formato do API Gateway (base64 curto)
+        connection_id = base64.b64encode(uuid.uuid4().bytes[:12]).decode().rstrip("=")
+        self.connections[connection_id] = writer
+        await self.call_handler(connection_id, "$connect", params=params)
+
+        fragments = []
+        try:
+            while True:
+                fin, opcode, payload = await read_frame(reader)
+                if opcode == OPCODE_CLOSE:
+                    writer.write(encode_frame(payload[:2], OPCODE_CLOSE))
+                    break
+                if opcode == OPCODE_PING:
+                    writer.write(encode_frame(payload, OPCODE_PONG))
+                    continue
+                if opcode == OPCODE_PONG:
+                    continue
+
+                fragments.append(payload)
+                if not fin:
+                    continue
+                message = b"".join(fragments).decode("utf-8", errors="replace")
+                fragments = []
+                await self.call_handler(connection_id, "$default", message)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self.connections.pop(connection_id, None)
+            await self.call_handler(connection_id, "$disconnect")
+            writer.close()
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        # Porta 0: o sistema escolhe uma porta livre
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.ready.set()
+        async with self.server:
+            try:
+                await self.server.serve_forever()
+            except asyncio.CancelledError:
+                pass  # stop(): server.close() cancela o serve_forever
+
+    def start_in_thread(self):
+        """Sobe o servidor numa thread daemon e espera ele aceitar conexões"""
+        thread = threading.Thread(target=lambda: asyncio.run(self.serve()), daemon=True, name="local-server")
+        thread.start()
+        self.ready.wait()
+        return self
+
+    def stop(self):
+        if self.loop and self.server:
+            self.loop.call_soon_threadsafe(self.server.close)
+
+
+class LocalGameServer(WebSocketGateway):
+    """Servidor WebSocket local que encaminha os eventos para o lambda_handler"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, verbose: bool = False,
+                 backend: LocalBackend = None, executor: ThreadPoolExecutor = None, bus=None):
+        super().__init__(host, port, verbose)
+        # Nós de um cluster local dividem as tabelas e o executor (passados pelo primeiro nó)
+        self.backend = backend or LocalBackend(sender=self.send_to_connection).install(handler)
+        if not verbose:
+            silence_handler_logs()
+        # Invocações do handler em série (o estado global do handler não é thread-safe)
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="lambda")
+        self.bus = bus
+        self.invocations = 0
+        self.telemetry = MetricsSummary()  # Métricas das invocações por ação (telemetry.py)
+
+    def invoke(self, connection_id: str, route_key: str, body: str = None, params: dict = None):
+        """Chama o lambda_handler com um evento do API Gateway (na thread do executor)"""
+        event = make_event(connection_id, route_key, body, params=params)
+        self.invocations += 1
+        handler.broadcast_bus = self.bus  # Broadcasts desta invocação saem pelo barramento deste nó
+        handler.telemetry_sink = self.telemetry.add
+        return handler.lambda_handler(event, None)
+
+    async def call_handler(self, connection_id: str, route_key: str, body: str = None, params: dict = None):
+        return await self.loop.run_in_executor(self.executor, self.invoke, connection_id, route_key, body, params)
+
+    async def flush_positions_periodically(self):
+        """Grava as posições do buffer do handler mesmo sem novas invocações (na thread do handler)"""
+        while True:
+            await asyncio.sleep(handler.POSITION_FLUSH_INTERVAL)
+            await self.loop.run_in_executor(self.executor, handler.flush_due_positions)
+
+    async def serve(self):
+        flusher = None
+        if handler.position_buffer is not None:
+            flusher = asyncio.get_running_loop().create_task(self.flush_positions_periodically())
+        try:
+            await super().serve()
+        finally:
+            if flusher is not None:
+                flusher.cancel()
+
+    def stop(self):
+        super().stop()
+        self.executor.shutdown(wait=False)
+        if self.bus is not None:
+            self.bus.close()
+
+
+def create_cluster(host: str = "127.0.0.1", port: int = 8765, nodes: int = 2, verbose: bool = False, broker=None):
+    """
+    N servidores locais (portas seguidas a partir de `port`) com tabelas e executor compartilhados.
+    Cada nó só alcança as próprias conexões nos broadcasts: eles passam pelo barramento, em processo
+    ou pelo broker TCP em `broker` (host, porta).
+    """
+    servers = []
+
+    def send(connection_id, data):
+        # Respostas diretas do handler: o nó que mantém o socket da conexão
+        return any(server.send_to_connection(connection_id, data) for server in servers)
+
+    backend = LocalBackend(sender=send).install(handler)
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lambda")
+    hub = InProcessHub() if broker is None else None
+    for i in range(nodes):
+        server = LocalGameServer(host, port + i if port else 0, verbose, backend, executor)
+        if hub is not None:
+            server.bus = InProcessBus(server.send_to_connection, hub, node_id=f"node-{i}")
+        else:
+            server.bus = SocketBus(server.send_to_connection, *broker, node_id=f"node-{i}")
+        servers.append(server)
+    return servers
+
+
+async def serve_all(servers):
+    await asyncio.gather(*(server.serve() for server in servers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local do jogo (sem AWS)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--nodes", type=int, default=1, help="Nós com tabelas compartilhadas e broadcast pelo barramento")
+    parser.add_argument("--broker", type=parse_address, default=None,
+                        help="Broker do barramento (host:porta, ver broadcast_bus.py); sem ele, barramento em processo")
+    parser.add_argument("--verbose", action="store_true", help="Mostra os logs do handler")
+    args = parser.parse_args()
+
+    if args.nodes > 1 or args.broker:
+        servers = create_cluster(args.host, args.port, args.nodes, args.verbose, args.broker)
+    else:
+        servers = [LocalGameServer(args.host, args.port, verbose=args.verbose)]
+    for server in servers:
+        print(f"🖥️ Servidor local em {server.url} (handler v{handler.SERVER_VERSION}, tabelas em memória)")
+    print(f"🔧 Cliente: WEBSOCKET_URL={servers[0].url} python game-client.py")
+    try:
+        asyncio.run(serve_all(servers))
+    except KeyboardInterrupt:
+        print("\n👋 Servidor encerrado")
+        print(f"📊 {json.dumps(servers[0].backend.stats())}")
+        for server in servers:
+            if server.bus is not None:
+                print(f"📡 {server.bus.node_id}: {json.dumps(server.bus.stats)}")
+            print(f"📈 Métricas por invocação em {server.url} (médias por ação)")
+            server.telemetry.print_report()
+
+
+if __name__ == "__main__":
+    main()
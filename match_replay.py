@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Replay de Partidas - Gravação compacta e reprodução das partidas
+Usado por websocket_game_handler.py (gravação, com REPLAY_DIR configurado)
+
+Cada sala grava um arquivo binário por partida (da criação da sala até ela ser
+aposentada) com registros prefixados pelo tamanho:
+
+    cabeçalho do arquivo: MAGIC + versão (1 byte)
+    registro:             tamanho (uint32) | tipo (uint8) | ms desde o início da partida (uint32) | dados
+
+    MATCH  - JSON: sala, versão do servidor, início e estado inicial da sala
+    ACTION - ação aceita pelo handler: rota, conexão, ids gerados pelo servidor e corpo original da mensagem
+    EVENT  - JSON de cada broadcast da sala (entradas, movimentos, tiros, acertos, capturas, pontos)
+
+No caminho quente a gravação é um struct.pack e uma escrita num buffer; o
+arquivo vai para o disco a cada FLUSH_INTERVAL segundos e ao fechar a partida.
+
+A reprodução passa as ações de volta pelo lambda_handler, com tabelas em
+memória (local_backend.py), relógio virtual e os mesmos ids, na velocidade
+máxima; compara os eventos emitidos com os gravados (teste de regressão) e
+mede a vazão (benchmark determinístico).
+
+Uso:
+    REPLAY_DIR=replays python local_server.py
+    python match_replay.py replays/sala-1a2b3c4d-1700000000000.replay [--repeat 5] [--no-check] [--output results/replay.json]
+"""
+
+import argparse
+import atexit
+import datetime
+import json
+import os
+import re
+import statistics
+import struct
+import sys
+import time
+from collections import Counter, namedtuple
+
+
+MAGIC = b"CTFR"
+FORMAT_VERSION = 1
+RECORD_HEADER = struct.Struct("!IBI")  # Tamanho dos dados, tipo, ms desde o início da partida
+ACTION_HEADER = struct.Struct("!BB")  # Rota, tamanho do connection_id
+SHORT_LENGTH = struct.Struct("!B")
+
+RECORD_MATCH = 1
+RECORD_ACTION = 2
+RECORD_EVENT = 3
+
+ROUTES = ("$connect", "$disconnect", "$default")
+
+WRITE_BUFFER_SIZE = 64 * 1024
+FLUSH_INTERVAL = 1.0  # Segundos entre escritas no disco
+
+# Campos que dependem do relógio de parede e são ignorados na comparação dos eventos
+IGNORED_EVENT_KEYS = frozenset({"timestamp", "created_at", "ttl"})
+
+Record = namedtuple("Record", ["kind", "t_ms", "data"])
+Action = namedtuple("Action", ["route_key", "connection_id", "ids", "body"])
+
+
+def encode_action(route_key, connection_id, ids, body):
+    connection = connection_id.encode("utf-8")
+    parts = [ACTION_HEADER.pack(ROUTES.index(route_key), len(connection)), connection, SHORT_LENGTH.pack(len(ids))]
+    for generated in ids:
+        encoded = generated.encode("utf-8")
+        parts += [SHORT_LENGTH.pack(len(encoded)), encoded]
+    parts.append((body or "").encode("utf-8"))
+    return b"".join(parts)
+
+
+def decode_action(data):
+    route, length = ACTION_HEADER.unpack_from(data)
+    offset = ACTION_HEADER.size
+    connection_id = data[offset:offset + length].decode("utf-8")
+    offset += length
+    (count,) = SHORT_LENGTH.unpack_from(data, offset)
+    offset += 1
+    ids = []
+    for _ in range(count):
+        (length,) = SHORT_LENGTH.unpack_from(data, offset)
+        ids.append(data[offset + 1:offset + 1 + length].decode("utf-8"))
+        offset += 1 + length
+    return Action(ROUTES[route], connection_id, ids, data[offset:].decode("utf-8") or None)
+
+
+class MatchLog:
+    """Arquivo de uma partida aberto para gravação"""
+
+    def __init__(self, path, started_at):
+        self.path = path
+        self.started_at = started_at
+        self.file = open(path, "wb", buffering=WRITE_BUFFER_SIZE)
+        self.file.write(MAGIC + bytes([FORMAT_VERSION]))
+        self.records = 0
+
+    def write(self, kind, at, data):
+        t_ms = max(0, int((at - self.started_at) * 1000))
+        self.file.write(RECORD_HEADER.pack(len(data), kind, t_ms) + data)
+        self.records += 1
+
+    def close(self):
+        self.file.close()
+
+
+class MatchRecorder:
+    """
+    Grava as partidas de cada sala em `directory`. O handler chama begin() no
+    início de cada invocação e registra ações, eventos e ids gerados. Uma
+    partida começa no join que abre a sala (open_match) e termina quando a
+    sala é aposentada; salas já em jogo quando a gravação começa ficam de fora
+    até um novo join.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.matches = {}  # room_id -> MatchLog
+        self.ids = []  # Ids gerados pelo servidor na invocação atual
+        self.events = []  # Eventos da invocação atual: (sala, JSON), gravados depois da ação
+        self.invocation_started = time.time()
+        self.last_flush = time.monotonic()
+        atexit.register(self.close)
+
+    def begin(self):
+        """Início de uma invocação do handler"""
+        self.ids = []
+        self.events = []
+        self.invocation_started = time.time()
+
+    def open_match(self, room_id, state=None, server_version=None):
+        """Abre o arquivo da partida da sala (se ainda não estiver aberto) com o estado inicial"""
+        match = self.matches.get(room_id)
+        if match is not None:
+            return match
+        safe_room = re.sub(r"[^\w.-]", "_", room_id)
+        path = os.path.join(self.directory, f"{safe_room}-{int(self.invocation_started * 1000)}.replay")
+        match = self.matches[room_id] = MatchLog(path, self.invocation_started)
+        header = {"room_id": room_id, "started_at": self.invocation_started, "server_version": server_version, "state": state}
+        match.write(RECORD_MATCH, self.invocation_started, json.dumps(header, separators=(",", ":"), default=float).encode("utf-8"))
+        return match
+
+    def record_action(self, room_id, connection_id, route_key, body):
+        """
+        Ação aceita, seguida dos eventos que ela emitiu (um arquivo interrompido
+        termina numa invocação completa; eventos de ações recusadas não são gravados)
+        """
+        match = self.matches.get(room_id)
+        if match is not None:
+            match.write(RECORD_ACTION, self.invocation_started, encode_action(route_key, connection_id, self.ids, body))
+        for event_room, data in self.events:
+            event_match = self.matches.get(event_room)
+            if event_match is not None:  # Sala sem partida aberta (aposentada ou anterior à gravação)
+                event_match.write(RECORD_EVENT, self.invocation_started, data)
+        self.events = []
+        self._maybe_flush()
+
+    def record_event(self, room_id, message):
+        self.events.append((room_id, json.dumps(message, separators=(",", ":")).encode("utf-8")))
+
+    def _maybe_flush(self):
+        now = time.monotonic()
+        if now - self.last_flush >= FLUSH_INTERVAL:
+            for match in self.matches.values():
+                match.file.flush()
+            self.last_flush = now
+
+    def close_match(self, room_id):
+        """Fim da partida (sala aposentada)"""
+        match = self.matches.pop(room_id, None)
+        if match is not None:
+            match.close()
+
+    def close(self):
+        for room_id in list(self.matches):
+            self.close_match(room_id)
+
+
+def read_match(path):
+    """Registros de um arquivo de partida, com os dados decodificados"""
+    with open(path, "rb") as f:
+        header = f.read(len(MAGIC) + 1)
+        if header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} não é um replay de partida")
+        if header[len(MAGIC)] != FORMAT_VERSION:
+            raise ValueError(f"Versão de replay não suportada: {header[len(MAGIC)]}")
+        while True:
+            raw = f.read(RECORD_HEADER.size)
+            if len(raw) < RECORD_HEADER.size:
+                return  # Fim do arquivo (ou registro incompleto de um processo interrompido)
+            length, kind, t_ms = RECORD_HEADER.unpack(raw)
+            data = f.read(length)
+            if len(data) < length:
+                return
+            if kind == RECORD_ACTION:
+                yield Record(kind, t_ms, decode_action(data))
+            else:
+                yield Record(kind, t_ms, json.loads(data))
+
+
+def strip_ignored(value):
+    if isinstance(value, dict):
+        return {key: strip_ignored(item) for key, item in value.items() if key not in IGNORED_EVENT_KEYS}
+    if isinstance(value, list):
+        return [strip_ignored(item) for item in value]
+    return value
+
+
+class ReplayClock:
+    """Substitui o módulo time no handler: time() devolve o horário gravado da ação"""
+
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+class EventCollector:
+    """Faz o papel do MatchRecorder na reprodução: só guarda os eventos emitidos"""
+
+    def __init__(self):
+        self.events = []
+        self.ids = []
+
+    def begin(self):
+        pass
+
+    def open_match(self, room_id, state=None, server_version=None):
+        pass
+
+    def record_action(self, room_id, connection_id, route_key, body):
+        pass
+
+    def record_event(self, room_id, message):
+        self.events.append(json.loads(json.dumps(message)))
+
+    def close_match(self, room_id):
+        pass
+
+
+class MatchReplay:
+    """Partida gravada, pronta para ser reproduzida pelo lambda_handler"""
+
+    def __init__(self, path):
+        records = list(read_match(path))
+        if not records or records[0].kind != RECORD_MATCH:
+            raise ValueError(f"{path} não começa com o registro da partida")
+        self.path = path
+        self.header = records[0].data
+        self.room_id = self.header["room_id"]
+        self.actions = [record for record in records if record.kind == RECORD_ACTION]
+        self.events = [record.data for record in records if record.kind == RECORD_EVENT]
+
+    def seed_state(self, handler):
+        state = self.header.get("state")
+        if state:
+            handler.game_state_table.put_item(Item={
+                "id": handler.game_state_key(self.room_id),
+                **handler.to_dynamodb_value(state)
+            })
+
+    def run(self, handler, check=True):
+        """Reproduz as ações no handler (tabelas novas em memória) e compara os eventos"""
+        from local_backend import LocalBackend, make_event
+
+        LocalBackend(sender=lambda connection_id, data: True).install(handler)
+        collector = EventCollector()
+        clock = ReplayClock(self.header["started_at"])
+        pending_ids = []
+        saved = {name: getattr(handler, name) for name in ("time", "new_id", "match_recorder", "broadcast_bus")}
+        handler.time = clock
+        handler.new_id = lambda: pending_ids.pop(0) if pending_ids else saved["new_id"]()
+        handler.match_recorder = collector
+        handler.broadcast_bus = None
+
+        routes = Counter()
+        connected = set()
+        try:
+            self.seed_state(handler)
+            start = time.perf_counter()
+            for record in self.actions:
+                action = record.data
+                clock.now = self.header["started_at"] + record.t_ms / 1000
+                if action.connection_id not in connected:
+                    handler.lambda_handler(make_event(action.connection_id, "$connect"), None)
+                    connected.add(action.connection_id)
+
+                body = action.body
+                if action.route_key == "$default" and body:
+                    message = json.loads(body)
+                    if message.get("action") == "join":
+                        # O lobby escolheu esta sala na partida gravada
+                        body = json.dumps({**message, "room_id": self.room_id})
+                    routes[message.get("action")] += 1
+                else:
+                    routes[action.route_key] += 1
+
+                pending_ids[:] = action.ids
+                handler.lambda_handler(make_event(action.connection_id, action.route_key, body), None)
+            elapsed = time.perf_counter() - start
+        finally:
+            for name, value in saved.items():
+                setattr(handler, name, value)
+
+        result = {
+            "actions": len(self.actions),
+            "elapsed_seconds": elapsed,
+            "actions_per_second": len(self.actions) / elapsed if elapsed else 0.0,
+            "routes": dict(routes),
+            "events_recorded": len(self.events),
+            "events_replayed": len(collector.events),
+        }
+        if check:
+            result["mismatch"] = self.compare(collector.events)
+        return result
+
+    def compare(self, replayed):
+        """Primeira diferença entre os eventos gravados e os reproduzidos (None se iguais)"""
+        for i, (expected, got) in enumerate(zip(self.events, replayed)):
+            if strip_ignored(expected) != strip_ignored(got):
+                return {"index": i, "expected": expected, "got": got}
+        if len(self.events) != len(replayed):
+            return {"index": min(len(self.events), len(replayed)), "expected_count": len(self.events), "got_count": len(replayed)}
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproduz partidas gravadas pelo handler (regressão e vazão)")
+    parser.add_argument("replays", nargs="+", help="Arquivos .replay")
+    parser.add_argument("--repeat", type=int, default=1, help="Reproduções de cada partida (vazão pela mediana)")
+    parser.add_argument("--no-check", action="store_true", help="Não compara os eventos reproduzidos com os gravados")
+    parser.add_argument("--verbose", action="store_true", help="Mostra os logs do handler")
+    parser.add_argument("--output", help="Salva o resultado em JSON (para comparar entre commits)")
+    args = parser.parse_args()
+
+    os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    os.environ.pop("REPLAY_DIR", None)  # A reprodução não grava outra partida
+    import websocket_game_handler as handler
+    from local_server import silence_handler_logs
+    if not args.verbose:
+        silence_handler_logs()
+
+    results = []
+    failed = False
+    print(f"🎬 lambda_handler v{handler.SERVER_VERSION}: {args.repeat} reprodução(ões) por partida")
+    for path in args.replays:
+        replay = MatchReplay(path)
+        runs = [replay.run(handler, check=not args.no_check) for _ in range(args.repeat)]
+        rates = [run["actions_per_second"] for run in runs]
+        mismatch = runs[0].get("mismatch")
+        failed = failed or mismatch is not None
+        result = {**runs[0], "path": path, "room_id": replay.room_id,
+                  "recorded_version": replay.header.get("server_version"),
+                  "actions_per_second": statistics.median(rates)}
+        results.append(result)
+
+        status = "" if args.no_check else (" ✅ eventos iguais" if mismatch is None else f" ❌ diferença no evento {mismatch['index']}")
+        print(f"\n📼 {path} (sala {replay.room_id}, gravada na v{result['recorded_version']})")
+        print(f"   {result['actions']} ações, {result['events_recorded']} eventos gravados, "
+              f"{result['events_replayed']} reproduzidos - {result['actions_per_second']:.0f} ações/s{status}")
+        print(f"   {', '.join(f'{name}: {count}' for name, count in sorted(result['routes'].items()))}")
+        if mismatch and "expected" in mismatch:
+            print(f"   esperado: {json.dumps(mismatch['expected'], default=str)[:300]}")
+            print(f"   obtido:   {json.dumps(mismatch['got'], default=str)[:300]}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "server_version": handler.SERVER_VERSION,
+                "repeat": args.repeat,
+                "results": results,
+            }, f, indent=2, default=str)
+        print(f"\n💾 Resultado salvo em {args.output}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Buffer de Posições - Escrita adiada (write-behind) das posições dos jogadores
+Usado por websocket_game_handler.py (handler.position_buffer)
+
+O cliente manda 10 updates de posição por segundo (outros clientes, até 60)
+e cada um virava um update_item em WebSocketConnections. Posições são
+efêmeras: o buffer guarda só a última posição de cada conexão e a grava a cada
+`interval` segundos ou antes de eventos importantes (morte, captura e ponto,
+desconexão). Quem lê posições no handler passa pelo overlay(), que devolve o
+valor em memória ainda não gravado.
+
+O buffer é para o servidor de longa duração, em que um processo é dono das
+salas: todos os leitores da sala estão no mesmo processo e veem o overlay, e
+um timer (flush_due) grava as pendentes mesmo sem novas mensagens. No Lambda
+cada container teria o seu buffer e nada acorda um container parado para
+gravar o dele: lá o handler deixa o buffer desligado por padrão.
+Com action_seq, a gravação é condicional (last_action_seq até o da posição):
+um processo com uma posição mais antiga não sobrescreve a mais nova gravada
+por outro. Se o buffer for ligado no Lambda, o handler reserva o action_seq na
+tabela a cada update, antes do broadcast.
+"""
+
+import threading
+import time
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional
+
+from botocore.exceptions import ClientError
+
+
+# Só grava se a posição for mais nova que a última aplicada (atributo last_action_seq da conexão)
+STALE_SEQ_CONDITION = "(attribute_not_exists(last_action_seq) OR last_action_seq < :seq)"
+# Na gravação do buffer o mesmo seq também vale: no Lambda o handler já reservou o seq antes do broadcast
+FLUSH_SEQ_CONDITION = "(attribute_not_exists(last_action_seq) OR last_action_seq <= :seq)"
+
+
+class PositionBuffer:
+    """Última posição pendente de cada conexão, gravada em lote na tabela de conexões"""
+
+    def __init__(self, interval: float, clock=time.monotonic):
+        self.interval = interval
+        self.clock = clock
+        self.pending = {}  # connection_id -> {"x", "y", "time", "seq", "input_seq"}
+        self.last_flush = clock()
+        self.lock = threading.Lock()
+        self.stats = {"buffered": 0, "written": 0, "dropped": 0}
+
+    def put(self, connection_id: str, x, y, activity_time: int, seq: Optional[int] = None,
+            input_seq: Optional[int] = None):
+        """
+        Guarda a posição (substitui a pendente da mesma conexão).
+        seq é o action_seq do update; input_seq, a última entrada do cliente aplicada nesta posição.
+        """
+        with self.lock:
+            previous = self.pending.get(connection_id)
+            if previous is not None:
+                seq = previous["seq"] if seq is None else seq
+                input_seq = previous["input_seq"] if input_seq is None else input_seq
+            self.pending[connection_id] = {"x": x, "y": y, "time": activity_time, "seq": seq, "input_seq": input_seq}
+            self.stats["buffered"] += 1
+
+    def overlay(self, connection_id: str, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Item da tabela com a posição pendente da conexão, se houver"""
+        position = self.pending.get(connection_id)
+        if position is None or not item:
+            return item
+        item = {**item, "x": Decimal(str(position["x"])), "y": Decimal(str(position["y"])),
+                "last_activity": position["time"]}
+        if position["seq"] is not None:
+            item["last_action_seq"] = Decimal(position["seq"])
+        if position["input_seq"] is not None:
+            item["last_input_seq"] = Decimal(position["input_seq"])
+        return item
+
+    def overlay_items(self, items: Iterable[Dict[str, Any]]) -> list:
+        return [self.overlay(item.get("connection_id"), item) for item in items]
+
+    def discard(self, connection_id: str):
+        """Descarta a posição pendente (conexão saiu, ou o servidor gravou outra posição)"""
+        with self.lock:
+            self.pending.pop(connection_id, None)
+
+    def flush_due(self, table):
+        """Grava as posições pendentes se o intervalo já passou (fim de cada invocação e timer do servidor)"""
+        if self.pending and self.clock() - self.last_flush >= self.interval:
+            self.flush(table)
+
+    def flush(self, table):
+        """Grava todas as posições pendentes na tabela de conexões (uma escrita por conexão, não por update)"""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.last_flush = self.clock()
+        for connection_id, position in pending.items():
+            # Só atualiza conexões que ainda existem (update_item criaria o item de volta)
+            update = "SET x = :x, y = :y, last_activity = :time"
+            condition = "attribute_exists(connection_id)"
+            values = {
+                ":x": Decimal(str(position["x"])),
+                ":y": Decimal(str(position["y"])),
+                ":time": position["time"]
+            }
+            if position["input_seq"] is not None:
+                update += ", last_input_seq = :input_seq"
+                values[":input_seq"] = position["input_seq"]
+            if position["seq"] is not None:
+                update += ", last_action_seq = :seq"
+                condition += " AND " + FLUSH_SEQ_CONDITION
+                values[":seq"] = position["seq"]
+            try:
+                table.update_item(
+                    Key={"connection_id": connection_id},
+                    UpdateExpression=update,
+                    ConditionExpression=condition,
+                    ExpressionAttributeValues=values
+                )
+                self.stats["written"] += 1
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    print(f"⚠️ Erro ao gravar posição de {connection_id}: {e}")
+                self.stats["dropped"] += 1
+
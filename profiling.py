@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Profiling sob demanda - cProfile e tracemalloc por ação do handler
+Usado por websocket_game_handler.py (handler.action_profiler)
+
+Desligado por padrão. Ligado por variável de ambiente (ou pelo debug_handler,
+sem novo deploy), o ActionProfiler envolve o despacho das ações escolhidas:
+
+    PROFILE_ACTIONS      ações perfiladas, separadas por vírgula ("*" = todas)
+    PROFILE_MODE         cpu (cProfile), memory (tracemalloc) ou both (padrão cpu)
+    PROFILE_SAMPLE_RATE  fração das invocações perfiladas (padrão 1.0)
+    PROFILE_TOP          linhas de cada relatório (padrão 20)
+    PROFILE_DUMP_EVERY   invocações perfiladas entre relatórios (padrão 100)
+    PROFILE_DIR          onde gravar os .pstats e relatórios (vazio = só no log; no Lambda, /tmp)
+
+Os perfis se acumulam por ação. A cada PROFILE_DUMP_EVERY invocações
+perfiladas (e na saída do processo) o relatório agregado vai para o log: as
+funções com mais tempo acumulado e as linhas que mais alocaram memória. Com
+PROFILE_DIR, os .pstats ficam gravados para abrir com pstats ou snakeviz.
+O tracemalloc vê o processo todo: no Lambda só o handler roda, mas num
+processo com outras threads (ex.: clientes do teste de carga) as alocações
+delas entram no relatório.
+
+Comandos do debug_handler (evento {"profile": ...}):
+    {"profile": {"actions": ["update", "shoot"], "mode": "both", "sample_rate": 0.1}}
+    {"profile": "report"}   relatório agregado no corpo da resposta (e no log)
+    {"profile": "off"}      desliga e descarta os perfis
+"""
+
+import atexit
+import cProfile
+import io
+import os
+import pstats
+import random
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterable, Optional
+
+MODES = ("cpu", "memory", "both")
+
+
+class ActionProfiler:
+    """Perfis de CPU e de alocações agregados por ação"""
+
+    def __init__(self, actions: Iterable[str], mode: str = "cpu", sample_rate: float = 1.0, top: int = 20,
+                 dump_every: int = 100, directory: Optional[str] = None):
+        if mode not in MODES:
+            raise ValueError(f"Modo de profiling inválido: {mode} (use {', '.join(MODES)})")
+        self.actions = set(actions)
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.top = top
+        self.dump_every = dump_every
+        self.directory = directory
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.profiles = {}  # ação -> cProfile.Profile (acumula entre invocações)
+        self.allocations = defaultdict(lambda: defaultdict(lambda: [0, 0]))  # ação -> linha -> [bytes, blocos]
+        self.peaks = defaultdict(int)  # ação -> maior pico de memória numa invocação
+        self.samples = defaultdict(int)  # ação -> invocações perfiladas
+        self.since_dump = 0
+        atexit.register(self.dump)
+
+    @classmethod
+    def from_env(cls, environ=os.environ) -> Optional["ActionProfiler"]:
+        """Profiler configurado pelas variáveis PROFILE_*; None se PROFILE_ACTIONS estiver vazio"""
+        actions = [action.strip() for action in environ.get("PROFILE_ACTIONS", "").split(",") if action.strip()]
+        if not actions:
+            return None
+        return cls(
+            actions,
+            mode=environ.get("PROFILE_MODE", "cpu"),
+            sample_rate=float(environ.get("PROFILE_SAMPLE_RATE", 1.0)),
+            top=int(environ.get("PROFILE_TOP", 20)),
+            dump_every=int(environ.get("PROFILE_DUMP_EVERY", 100)),
+            directory=environ.get("PROFILE_DIR") or None,
+        )
+
+    def wants(self, action: Optional[str]) -> bool:
+        if action is None or ("*" not in self.actions and action not in self.actions):
+            return False
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def profile(self, action: Optional[str]):
+        """Contexto que perfila a ação se ela foi escolhida e sorteada (senão não faz nada)"""
+        if not self.wants(action):
+            return nullcontext()
+        return self._profile(action)
+
+    @contextmanager
+    def _profile(self, action: str):
+        profiler = None
+        if self.mode in ("cpu", "both"):
+            profiler = self.profiles.get(action)
+            if profiler is None:
+                profiler = self.profiles[action] = cProfile.Profile()
+        trace_memory = self.mode in ("memory", "both")
+        if trace_memory:
+            # Rastreia só durante a invocação: o snapshot final tem o que ela alocou e ainda vive
+            was_tracing = tracemalloc.is_tracing()
+            before = tracemalloc.take_snapshot() if was_tracing else None
+            if not was_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            if trace_memory:
+                self._add_allocations(action, tracemalloc.take_snapshot(), before)
+                self.peaks[action] = max(self.peaks[action], tracemalloc.get_traced_memory()[1])
+                if not was_tracing:
+                    tracemalloc.stop()
+            self.samples[action] += 1
+            self.since_dump += 1
+            if self.dump_every and self.since_dump >= self.dump_every:
+                self.dump()
+
+    def _add_allocations(self, action, snapshot, before):
+        snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),
+                                           tracemalloc.Filter(False, __file__)))
+        if before is not None:
+            stats = [(stat.traceback[0], stat.size_diff, stat.count_diff) for stat in snapshot.compare_to(before, "lineno")]
+        else:
+            stats = [(stat.traceback[0], stat.size, stat.count) for stat in snapshot.statistics("lineno")]
+        lines = self.allocations[action]
+        for frame, size, count in stats:
+            if size > 0:
+                totals = lines[f"{frame.filename}:{frame.lineno}"]
+                totals[0] += size
+                totals[1] += count
+
+    def report(self) -> str:
+        """Relatório agregado por ação: top N funções por tempo acumulado e top N linhas por bytes alocados"""
+        out = io.StringIO()
+        for action in sorted(self.samples):
+            count = self.samples[action]
+            out.write(f"🔬 PROFILE {action}: {count} invocações perfiladas\n")
+            profiler = self.profiles.get(action)
+            if profiler is not None:
+                stats = pstats.Stats(profiler, stream=out)
+                stats.strip_dirs().sort_stats("cumulative").print_stats(self.top)
+            lines = self.allocations.get(action)
+            if lines:
+                out.write(f"   Memória: pico {self.peaks[action] / 1024:.1f} KB numa invocação; "
+                          f"linhas que mais alocaram (média por invocação):\n")
+                top = sorted(lines.items(), key=lambda item: item[1][0], reverse=True)[:self.top]
+                for line, (size, blocks) in top:
+                    out.write(f"   {size / count / 1024:>10.2f} KB {blocks / count:>8.1f} blocos  {line}\n")
+        return out.getvalue()
+
+    def dump(self) -> str:
+        """Relatório no log (e em PROFILE_DIR, com os .pstats de cada ação)"""
+        self.since_dump = 0
+        if not self.samples:
+            return ""
+        report = self.report()
+        print(report)
+        if self.directory:
+            stamp = int(time.time() * 1000)
+            for action, profiler in self.profiles.items():
+                profiler.dump_stats(os.path.join(self.directory, f"profile-{action}-{stamp}.pstats"))
+            with open(os.path.join(self.directory, f"profile-{stamp}.txt"), "w", encoding="utf-8") as f:
+                f.write(report)
+            print(f"🔬 Perfis gravados em {self.directory}")
+        return report
+
+    def close(self):
+        atexit.unregister(self.dump)
+
+
+def configure(profiler: Optional[ActionProfiler], command: Any) -> Dict[str, Any]:
+    """
+    Aplica um comando do debug_handler ao profiler atual.
+    Retorna {"profiler": novo profiler (ou None), "body": resposta}.
+    """
+    if command == "report":
+        return {"profiler": profiler, "body": (profiler.dump() or "Nenhuma invocação perfilada ainda") if profiler else "Profiling desligado"}
+    if command == "off":
+        if profiler is not None:
+            profiler.close()
+        return {"profiler": None, "body": "Profiling desligado"}
+    if not isinstance(command, dict) or not command.get("actions"):
+        raise ValueError('Comando de profiling inválido: use "report", "off" ou {"actions": [...], ...}')
+    if profiler is not None:
+        profiler.close()
+    profiler = ActionProfiler(
+        command["actions"],
+        mode=command.get("mode", "cpu"),
+        sample_rate=float(command.get("sample_rate", 1.0)),
+        top=int(command.get("top", 20)),
+        dump_every=int(command.get("dump_every", 100)),
+        directory=command.get("directory") or None,
+    )
+    return {"profiler": profiler, "body": f"Profiling ligado: {sorted(profiler.actions)} ({profiler.mode}, "
+                                          f"amostragem {profiler.sample_rate})"}
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Workers de Salas - Servidor local com as salas espalhadas em vários processos
+Para testes de carga com muitas salas (um processo Python só usa um núcleo)
+
+O supervisor é o processo da frente: aceita as conexões WebSocket (o papel do
+API Gateway, ver local_server.py), coloca cada jogador numa sala pelo lobby
+(lobby.py) e encaminha os eventos da conexão para o worker dono da sala por um
+pipe local. Cada worker é um processo com o seu loop, o lambda_handler e as
+tabelas em memória só das suas salas.
+
+Um "tick" de worker é uma invocação do handler. A cada REPORT_INTERVAL cada
+worker informa os tempos dos ticks e a fração do tempo em que ficou ocupado,
+por sala. Um worker acima do orçamento (--budget) passa a sala mais pesada que
+caiba no worker mais folgado: os itens da sala são exportados das tabelas de um
+processo e importados no outro, e os eventos que chegam durante a mudança ficam
+retidos e são entregues em ordem no destino.
+
+Uso:
+    python room_workers.py [--workers 4] [--port 8765] [--budget 0.75] [--report-interval 5]
+    WEBSOCKET_URL=ws://127.0.0.1:8765 python game-client.py --bots 40
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+from game_simulation import TEAMS  # noqa: E402
+from lobby import DEFAULT_ROOM_CAPACITY, RoomFullError, RoomRegistry  # noqa: E402
+from local_backend import new_rooms_table  # noqa: E402
+from local_server import WebSocketGateway  # noqa: E402
+from websocket_game_handler import normalize_room_id  # noqa: E402
+
+
+REPORT_INTERVAL = 1.0  # Segundos entre os relatórios de cada worker
+WORKER_BUSY_BUDGET = 0.75  # Fração do tempo ocupada com ticks antes de mover salas
+REBALANCE_COOLDOWN = 10.0  # Segundos antes de mover de novo a mesma sala
+REBALANCE_SETTLE = 2 * REPORT_INTERVAL  # Espera entre mudanças (os relatórios precisam refletir a anterior)
+
+
+def percentile_ms(ordered, fraction):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000
+
+
+class WorkerStats:
+    """Tempos dos ticks (invocações do handler) de um worker num intervalo"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.started = time.perf_counter()
+        self.durations = []
+        self.room_busy = defaultdict(float)
+
+    def record(self, room_id, elapsed):
+        self.durations.append(elapsed)
+        self.room_busy[room_id] += elapsed
+
+    def report(self):
+        window = max(time.perf_counter() - self.started, 1e-9)
+        ordered = sorted(self.durations)
+        return {
+            "ticks": len(ordered),
+            "ticks_per_second": len(ordered) / window,
+            "busy": sum(ordered) / window,
+            "p50_ms": percentile_ms(ordered, 0.50),
+            "p95_ms": percentile_ms(ordered, 0.95),
+            "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+            "rooms": {room_id: busy / window for room_id, busy in self.room_busy.items()},
+        }
+
+
+def install_worker_backend(handler, sender, capacity=DEFAULT_ROOM_CAPACITY):
+    """Tabelas em memória do worker, com o lobby na mesma capacidade de sala do supervisor"""
+    from local_backend import LocalBackend
+
+    backend = LocalBackend(sender=sender).install(handler)
+    handler.ROOM_CAPACITY = capacity
+    handler.room_registry = RoomRegistry(handler.rooms_table, capacity)
+    return backend
+
+
+def is_join(body) -> bool:
+    try:
+        message = json.loads(body or "{}")
+    except ValueError:
+        return False
+    return isinstance(message, dict) and message.get("action") == "join"
+
+
+def worker_main(worker_id, conn, verbose=False, capacity=DEFAULT_ROOM_CAPACITY):
+    """Processo worker: executa o lambda_handler para os eventos das suas salas"""
+    import websocket_game_handler as handler
+    from local_backend import make_event
+    from local_server import silence_handler_logs
+
+    if not verbose:
+        silence_handler_logs()
+
+    def send(connection_id, data):
+        conn.send(("send", connection_id, data))
+        return True
+
+    backend = install_worker_backend(handler, send, capacity)
+    stats = WorkerStats()
+    next_report = time.perf_counter() + REPORT_INTERVAL
+    try:
+        while True:
+            # Acorda também para gravar as posições do buffer do handler (salas sem invocações)
+            wake_at = next_report
+            if handler.position_buffer is not None:
+                wake_at = min(wake_at, time.perf_counter() + handler.POSITION_FLUSH_INTERVAL)
+            if conn.poll(max(0.0, wake_at - time.perf_counter())):
+                message = conn.recv()
+                kind = message[0]
+                if kind == "event":
+                    _, room_id, connection_id, route_key, body, params = message
+                    start = time.perf_counter()
+                    response = handler.lambda_handler(make_event(connection_id, route_key, body, params=params), None)
+                    stats.record(room_id, time.perf_counter() - start)
+                    # Join recusado pelo handler: o supervisor desfaz a rota e devolve a vaga ao lobby
+                    if route_key == "$default" and response.get("statusCode") != 200 and is_join(body):
+                        conn.send(("join_rejected", room_id, connection_id))
+                elif kind == "export_room":
+                    room_id = message[1]
+                    handler.flush_positions()  # Posições ainda no buffer vão junto com a sala
+                    conn.send(("room_exported", room_id, backend.export_room(room_id, handler.game_state_key(room_id))))
+                elif kind == "import_room":
+                    backend.import_room(message[2])
+                elif kind == "stop":
+                    break
+
+            handler.flush_due_positions()
+            if time.perf_counter() >= next_report:
+                conn.send(("stats", worker_id, stats.report()))
+                stats.reset()
+                next_report = time.perf_counter() + REPORT_INTERVAL
+    except (KeyboardInterrupt, EOFError, BrokenPipeError):
+        pass
+
+
+class WorkerHandle:
+    """Um worker visto pelo supervisor: processo, pipe, salas e último relatório"""
+
+    def __init__(self, worker_id, context, verbose=False, capacity=DEFAULT_ROOM_CAPACITY):
+        self.worker_id = worker_id
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=worker_main, args=(worker_id, child_conn, verbose, capacity), daemon=True,
+            name=f"room-worker-{worker_id}"
+        )
+        self.process.start()
+        child_conn.close()
+        self.rooms = set()
+        self.report = None
+
+        # Envio numa thread: o loop do supervisor nunca bloqueia esperando o pipe esvaziar
+        self.outbox = queue.SimpleQueue()
+        self.writer = threading.Thread(target=self._write_loop, daemon=True, name=f"room-worker-{worker_id}-pipe")
+        self.writer.start()
+
+    def _write_loop(self):
+        while True:
+            message = self.outbox.get()
+            try:
+                self.conn.send(message)
+            except (BrokenPipeError, OSError):
+                return
+            if message[0] == "stop":
+                return
+
+    def post(self, message):
+        self.outbox.put(message)
+
+    @property
+    def busy(self) -> float:
+        return self.report["busy"] if self.report else 0.0
+
+
+class RoomSupervisor(WebSocketGateway):
+    """Processo da frente: lobby, roteamento das conexões e balanceamento das salas entre workers"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, workers: int = None,
+                 capacity: int = DEFAULT_ROOM_CAPACITY, budget: float = WORKER_BUSY_BUDGET,
+                 report_interval: float = None, verbose: bool = False):
+        super().__init__(host, port, verbose)
+        self.worker_count = workers or os.cpu_count() or 1
+        self.workers = []
+        self.capacity = capacity
+        self.registry = RoomRegistry(new_rooms_table(), capacity)
+        self.budget = budget
+        self.report_interval = report_interval
+
+        self.room_owner = {}  # room_id -> WorkerHandle
+        self.routes = {}  # connection_id -> (room_id, team)
+        self.pending = {}  # connection_id -> parâmetros da URL, até o join
+        self.migrating = {}  # room_id -> eventos retidos durante a mudança de worker
+        self.migration_targets = {}  # room_id -> WorkerHandle de destino
+        self.moved_at = {}  # room_id -> instante da última mudança
+        self.last_rebalance = 0.0
+        self.migrations = 0
+
+    def start_workers(self):
+        context = multiprocessing.get_context("spawn")
+        for worker_id in range(self.worker_count):
+            worker = WorkerHandle(worker_id, context, self.verbose, self.capacity)
+            self.loop.add_reader(worker.conn.fileno(), self.on_worker_message, worker)
+            self.workers.append(worker)
+        print(f"⚙️ {self.worker_count} workers de salas iniciados")
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.start_workers()
+        if self.report_interval:
+            self.loop.create_task(self.report_loop())
+        await super().serve()
+
+    def on_worker_message(self, worker):
+        try:
+            while worker.conn.poll():
+                message = worker.conn.recv()
+                kind = message[0]
+                if kind == "send":
+                    self.send_to_connection(message[1], message[2])
+                elif kind == "stats":
+                    worker.report = message[2]
+                    self.rebalance()
+                elif kind == "room_exported":
+                    self.finish_migration(message[1], message[2])
+                elif kind == "join_rejected":
+                    self.reject_join(message[1], message[2])
+        except (EOFError, OSError):
+            self.loop.remove_reader(worker.conn.fileno())
+            print(f"❌ Worker {worker.worker_id} encerrou")
+
+    def dispatch(self, room_id, connection_id, route_key, body=None, params=None):
+        """Entrega um evento ao worker dono da sala (ou retém, se a sala estiver mudando de worker)"""
+        event = ("event", room_id, connection_id, route_key, body, params)
+        if room_id in self.migrating:
+            self.migrating[room_id].append(event)
+        else:
+            self.room_owner[room_id].post(event)
+
+    async def call_handler(self, connection_id: str, route_key: str, body: str = None, params: dict = None):
+        if route_key == "$connect":
+            # O worker só é conhecido depois que o lobby escolher a sala (no join)
+            self.pending[connection_id] = params or {}
+        elif route_key == "$default":
+            route = self.routes.get(connection_id)
+            if route:
+                self.dispatch(route[0], connection_id, "$default", body)
+            else:
+                self.join(connection_id, body)
+        elif route_key == "$disconnect":
+            self.pending.pop(connection_id, None)
+            route = self.routes.pop(connection_id, None)
+            if route:
+                room_id, team = route
+                self.dispatch(room_id, connection_id, "$disconnect")
+                if self.registry.leave(room_id, team):
+                    self.release_room(room_id)
+
+    def join(self, connection_id, body):
+        """Primeira mensagem da conexão: o lobby escolhe a sala e a conexão passa para o worker dela"""
+        try:
+            message = json.loads(body)
+        except ValueError:
+            message = None
+        if not isinstance(message, dict) or message.get("action") != "join":
+            if self.verbose:
+                print(f"⚠️ Mensagem de {connection_id} antes do join ignorada")
+            return
+
+        params = self.pending.pop(connection_id, {})
+        requested_room = message.get("room_id") or params.get("room")
+        requested_team = message.get("team") if message.get("team") in TEAMS else None
+        try:
+            placement = self.registry.place(normalize_room_id(requested_room) if requested_room else None, requested_team)
+        except RoomFullError:
+            self.send_to_connection(connection_id, json.dumps({"type": "error", "message": "Sala cheia"}))
+            return
+
+        room_id = placement.room_id
+        if room_id not in self.room_owner:
+            owner = min(self.workers, key=lambda worker: (worker.busy, len(worker.rooms)))
+            self.room_owner[room_id] = owner
+            owner.rooms.add(room_id)
+        self.routes[connection_id] = (room_id, placement.team)
+
+        # O worker recebe a sala e o time já escolhidos (seu lobby só registra a entrada)
+        message.update({"room_id": room_id, "team": placement.team})
+        self.dispatch(room_id, connection_id, "$connect", params={"room": room_id})
+        self.dispatch(room_id, connection_id, "$default", json.dumps(message))
+
+    def reject_join(self, room_id, connection_id):
+        """
+        O worker recusou o join (o handler já avisou o cliente): a conexão volta a ficar sem sala,
+        a cópia dela no worker é removida e a vaga volta para o lobby
+        """
+        route = self.routes.get(connection_id)
+        if route is None or route[0] != room_id:
+            return
+        del self.routes[connection_id]
+        self.dispatch(room_id, connection_id, "$disconnect")
+        if self.registry.leave(room_id, route[1]):
+            self.release_room(room_id)
+
+    def release_room(self, room_id):
+        """Sala aposentada pelo lobby (o worker aposenta a sua cópia no $disconnect)"""
+        owner = self.room_owner.pop(room_id, None)
+        if owner:
+            owner.rooms.discard(room_id)
+
+    def rebalance(self):
+        """Move uma sala do worker mais ocupado, se ele passou do orçamento, para o mais folgado"""
+        now = time.monotonic()
+        if len(self.workers) < 2 or now - self.last_rebalance < REBALANCE_SETTLE:
+            return
+        if any(worker.report is None for worker in self.workers):
+            return
+
+        source = max(self.workers, key=lambda worker: worker.busy)
+        target = min(self.workers, key=lambda worker: worker.busy)
+        if source.busy <= self.budget or source is target or len(source.rooms) < 2:
+            return
+
+        # A sala mais pesada que cabe no destino sem passar do orçamento
+        room_load = source.report["rooms"]
+        headroom = self.budget - target.busy
+        candidates = [
+            room_id for room_id in source.rooms
+            if room_id not in self.migrating
+            and now - self.moved_at.get(room_id, float("-inf")) >= REBALANCE_COOLDOWN
+            and room_load.get(room_id, 0.0) <= headroom
+        ]
+        if not candidates:
+            return
+        room_id = max(candidates, key=lambda room: room_load.get(room, 0.0))
+        self.migrate(room_id, source, target)
+        self.last_rebalance = now
+
+    def migrate(self, room_id, source, target):
+        print(f"🔀 Sala {room_id}: worker {source.worker_id} ({source.busy:.0%}) -> "
+              f"worker {target.worker_id} ({target.busy:.0%})")
+        self.migrating[room_id] = []
+        self.migration_targets[room_id] = target
+        self.moved_at[room_id] = time.monotonic()
+        self.migrations += 1
+        source.rooms.discard(room_id)
+        source.post(("export_room", room_id))
+
+    def finish_migration(self, room_id, exported):
+        """Itens da sala chegaram do worker antigo: importa no novo e entrega os eventos retidos"""
+        target = self.migration_targets.pop(room_id)
+        events = self.migrating.pop(room_id, [])
+        target.post(("import_room", room_id, exported))
+        for event in events:
+            target.post(event)
+        if room_id in self.room_owner:  # A sala pode ter sido aposentada durante a mudança
+            self.room_owner[room_id] = target
+            target.rooms.add(room_id)
+
+    def worker_stats(self):
+        """Último relatório de cada worker"""
+        return [
+            {"worker": worker.worker_id, "room_count": len(worker.rooms), **(worker.report or {})}
+            for worker in self.workers
+        ]
+
+    def print_report(self):
+        print(f"📊 {len(self.routes)} jogadores em {len(self.room_owner)} salas, {self.migrations} mudanças de worker")
+        for stats in self.worker_stats():
+            print(f"   worker {stats['worker']}: {stats['room_count']:>3} salas  "
+                  f"{stats.get('ticks_per_second', 0):>7.1f} ticks/s  ocupado {stats.get('busy', 0):>4.0%}  "
+                  f"p50 {stats.get('p50_ms', 0):6.2f} ms  p95 {stats.get('p95_ms', 0):6.2f} ms  "
+                  f"máx {stats.get('max_ms', 0):6.2f} ms")
+
+    async def report_loop(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            self.print_report()
+
+    def stop(self):
+        for worker in self.workers:
+            worker.post(("stop",))
+        super().stop()
+        for worker in self.workers:
+            worker.process.join(timeout=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local com as salas espalhadas em processos workers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="Processos workers (padrão: um por núcleo)")
+    parser.add_argument("--capacity", type=int, default=DEFAULT_ROOM_CAPACITY, help="Jogadores por sala")
+    parser.add_argument("--budget", type=float, default=WORKER_BUSY_BUDGET,
+                        help="Fração do tempo ocupada com ticks antes de mover salas do worker")
+    parser.add_argument("--report-interval", type=float, default=5, help="Segundos entre relatórios dos workers (0 = sem)")
+    parser.add_argument("--verbose", action="store_true", help="Mostra os logs do handler nos workers")
+    args = parser.parse_args()
+
+    supervisor = RoomSupervisor(args.host, args.port, args.workers, args.capacity, args.budget,
+                                args.report_interval or None, args.verbose)
+    print(f"🖥️ Servidor local em {supervisor.url} (salas em {supervisor.worker_count} workers)")
+    print(f"🔧 Cliente: WEBSOCKET_URL={supervisor.url} python game-client.py")
+    try:
+        asyncio.run(supervisor.serve())
+    except KeyboardInterrupt:
+        print("\n👋 Servidor encerrado")
+        supervisor.print_report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Telemetria - Métricas de desempenho por invocação do handler
+Usado por websocket_game_handler.py
+
+As tabelas do DynamoDB e o cliente do API Gateway do handler são embrulhados
+por InstrumentedTable e InstrumentedApiGateway, que contam, na invocação
+atual, as operações por tabela, o tempo gasto, a capacidade consumida
+(ReturnConsumedCapacity), os envios e os bytes enviados. O handler marca o
+tempo de cada fase (resolve, load, handle, flush) e, no fim do lambda_handler,
+emite um registro compacto com a ação, a sala e esses números; com um
+orçamento configurado, o registro marca as invocações que passaram de N
+chamadas ao DynamoDB ou de N envios.
+"""
+
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from botocore.exceptions import ClientError
+
+
+READ_OPERATIONS = ("get_item", "query", "scan")
+WRITE_OPERATIONS = ("put_item", "update_item", "delete_item")
+
+# Métricas da invocação em andamento (o handler processa uma invocação por vez)
+current = None
+
+
+class InvocationMetrics:
+    """Contadores e tempos de uma invocação do handler"""
+
+    def __init__(self, route_key: Optional[str]):
+        self.started = time.perf_counter()
+        self.route_key = route_key
+        self.action = None
+        self.room_id = None
+        self.phases = {}
+        self.dynamo_calls = 0
+        self.dynamo_seconds = 0.0
+        self.read_units = 0.0
+        self.write_units = 0.0
+        self.operations = defaultdict(int)  # "tabela.operação" -> chamadas
+        self.sends = 0
+        self.send_bytes = 0
+        self.send_seconds = 0.0
+        self.gone = 0
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def add_dynamo(self, table: str, operation: str, seconds: float, capacity: Optional[Dict[str, Any]]):
+        self.dynamo_calls += 1
+        self.dynamo_seconds += seconds
+        self.operations[f"{table}.{operation.replace('_item', '')}"] += 1
+        if capacity:
+            units = float(capacity.get("CapacityUnits", 0))
+            if operation in READ_OPERATIONS:
+                self.read_units += units
+            else:
+                self.write_units += units
+
+    def add_send(self, size: int, seconds: float, gone: bool = False):
+        self.sends += 1
+        self.send_bytes += size
+        self.send_seconds += seconds
+        self.gone += gone
+
+    def record(self, status: Optional[int] = None, dynamo_budget: int = 0, send_budget: int = 0) -> Dict[str, Any]:
+        """Registro compacto da invocação (tempos em ms)"""
+        record = {
+            "route": self.route_key,
+            "action": self.action,
+            "room": self.room_id,
+            "status": status,
+            "ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "phases": {name: round(seconds * 1000, 3) for name, seconds in self.phases.items()},
+            "dynamo": {
+                "calls": self.dynamo_calls,
+                "ms": round(self.dynamo_seconds * 1000, 3),
+                "rcu": round(self.read_units, 2),
+                "wcu": round(self.write_units, 2),
+                "ops": dict(self.operations),
+            },
+            "sends": {
+                "count": self.sends,
+                "bytes": self.send_bytes,
+                "ms": round(self.send_seconds * 1000, 3),
+                "gone": self.gone,
+            },
+        }
+        over_budget = []
+        if dynamo_budget and self.dynamo_calls > dynamo_budget:
+            over_budget.append("dynamo")
+        if send_budget and self.sends > send_budget:
+            over_budget.append("sends")
+        if over_budget:
+            record["over_budget"] = over_budget
+        return record
+
+
+def begin(route_key: Optional[str]) -> InvocationMetrics:
+    """Início de uma invocação: as tabelas e o cliente instrumentados passam a contar nela"""
+    global current
+    current = InvocationMetrics(route_key)
+    return current
+
+
+def end() -> Optional[InvocationMetrics]:
+    global current
+    metrics, current = current, None
+    return metrics
+
+
+class InstrumentedTable:
+    """Tabela do boto3 (ou local) que registra cada operação nas métricas da invocação atual"""
+
+    def __init__(self, table, name: str):
+        self.table = table
+        self.metrics_name = name
+
+    def __getattr__(self, attr):
+        return getattr(self.table, attr)
+
+    def _call(self, operation: str, kwargs: Dict[str, Any]):
+        metrics = current
+        if metrics is None:
+            return getattr(self.table, operation)(**kwargs)
+        kwargs.setdefault("ReturnConsumedCapacity", "TOTAL")
+        start = time.perf_counter()
+        response = None
+        try:
+            response = getattr(self.table, operation)(**kwargs)
+            return response
+        finally:
+            # Operações que falham (ex.: condição não atendida) também contam
+            metrics.add_dynamo(self.metrics_name, operation, time.perf_counter() - start,
+                               response.get("ConsumedCapacity") if response else None)
+
+    def get_item(self, **kwargs):
+        return self._call("get_item", kwargs)
+
+    def put_item(self, **kwargs):
+        return self._call("put_item", kwargs)
+
+    def update_item(self, **kwargs):
+        return self._call("update_item", kwargs)
+
+    def delete_item(self, **kwargs):
+        return self._call("delete_item", kwargs)
+
+    def query(self, **kwargs):
+        return self._call("query", kwargs)
+
+    def scan(self, **kwargs):
+        return self._call("scan", kwargs)
+
+
+class InstrumentedApiGateway:
+    """Cliente do API Gateway que registra envios, bytes e tempo nas métricas da invocação atual"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def __getattr__(self, attr):
+        return getattr(self.client, attr)
+
+    def post_to_connection(self, **kwargs):
+        metrics = current
+        if metrics is None:
+            return self.client.post_to_connection(**kwargs)
+        data = kwargs.get("Data", b"")
+        size = len(data.encode("utf-8") if isinstance(data, str) else data)
+        start = time.perf_counter()
+        try:
+            response = self.client.post_to_connection(**kwargs)
+        except ClientError as e:
+            metrics.add_send(size, time.perf_counter() - start, gone=e.response["Error"]["Code"] == "GoneException")
+            raise
+        metrics.add_send(size, time.perf_counter() - start)
+        return response
+
+
+class MetricsSummary:
+    """Agrega os registros das invocações por ação (para o servidor local e os testes de carga)"""
+
+    def __init__(self):
+        self.actions = defaultdict(lambda: defaultdict(float))
+
+    def add(self, record: Dict[str, Any]):
+        totals = self.actions[record["action"] or record["route"]]
+        totals["invocations"] += 1
+        totals["ms"] += record["ms"]
+        totals["dynamo_calls"] += record["dynamo"]["calls"]
+        totals["dynamo_ms"] += record["dynamo"]["ms"]
+        totals["rcu"] += record["dynamo"]["rcu"]
+        totals["wcu"] += record["dynamo"]["wcu"]
+        totals["sends"] += record["sends"]["count"]
+        totals["send_bytes"] += record["sends"]["bytes"]
+        totals["over_budget"] += bool(record.get("over_budget"))
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Médias por invocação de cada ação (over_budget é o total de invocações marcadas)"""
+        result = {}
+        for action, totals in self.actions.items():
+            count = totals["invocations"]
+            result[action] = {
+                name: (value if name in ("invocations", "over_budget") else round(value / count, 3))
+                for name, value in totals.items()
+            }
+        return result
+
+    def print_report(self):
+        print(f"   {'ação':<14} {'invoc.':>7} {'ms':>7} {'dynamo':>7} {'ms ddb':>7} {'rcu':>6} {'wcu':>6} "
+              f"{'envios':>7} {'KB':>7} {'estouros':>8}")
+        for action, row in sorted(self.summary().items()):
+            print(f"   {action:<14} {int(row['invocations']):>7} {row['ms']:>7.2f} {row['dynamo_calls']:>7.1f} "
+                  f"{row['dynamo_ms']:>7.2f} {row['rcu']:>6.1f} {row['wcu']:>6.1f} {row['sends']:>7.1f} "
+                  f"{row['send_bytes'] / 1024:>7.2f} {int(row['over_budget']):>8}")
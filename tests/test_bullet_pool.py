@@ -0,0 +1,99 @@
+import random
+
+import pytest
+
+from bullet_pool import HAS_NUMPY, REMOVED_BOX, REMOVED_EXPIRED, REMOVED_OUT_OF_BOUNDS, BulletPool
+from game_map import OccupancyGrid
+from game_simulation import BULLET_MAX_AGE, bullet_expired, bullet_hits_box, bullet_out_of_bounds, step_bullet
+
+pytestmark = pytest.mark.skipif(not HAS_NUMPY, reason="BulletPool requer NumPy")
+
+BOX = {"id": "box_0", "x": 400, "y": 300, "size": 50}
+
+
+def bullet(bullet_id, x, y, dx=0.0, dy=0.0, created_at=0.0):
+    return {"id": bullet_id, "x": x, "y": y, "dx": dx, "dy": dy, "created_at": created_at}
+
+
+def test_add_remove_keeps_slots_dense():
+    pool = BulletPool(capacity=2)
+    for i in range(5):
+        pool.add(bullet(f"b{i}", i, i))
+    assert len(pool) == 5 and pool.capacity >= 5
+    assert pool.remove("b1")
+    assert not pool.remove("b1")
+    assert "b1" not in pool and len(pool) == 4
+    # O último slot foi movido para o buraco
+    assert pool.position("b4") == (4.0, 4.0)
+    assert sorted(pool.ids) == ["b0", "b2", "b3", "b4"]
+    assert all(pool.ids[slot] == bullet_id for bullet_id, slot in pool.slots.items())
+
+
+def test_add_replaces_existing_bullet_and_rejects_bad_values():
+    pool = BulletPool()
+    pool.add(bullet("a", 1, 2))
+    pool.add(bullet("a", 5, 6), owned=True)
+    assert len(pool) == 1
+    assert pool.position("a") == (5.0, 6.0)
+    assert pool.owned_positions() == [("a", 5.0, 6.0)]
+    with pytest.raises(ValueError):
+        pool.add({"id": "b", "x": "não é número"})
+    assert "b" not in pool and len(pool) == 1
+
+
+def test_set_position_ignores_unknown_bullets():
+    pool = BulletPool()
+    pool.add(bullet("a", 1, 2))
+    pool.set_position("a", 10, 20)
+    pool.set_position("zzz", 10, 20)
+    assert pool.position("a") == (10.0, 20.0)
+    assert pool.position("zzz") is None
+
+
+def test_step_removes_with_reason():
+    grid = OccupancyGrid([BOX])
+    pool = BulletPool()
+    pool.add(bullet("expired", 100, 100, 1, 0, created_at=0))
+    pool.add(bullet("out", 795, 100, 10, 0, created_at=BULLET_MAX_AGE))
+    pool.add(bullet("box", BOX["x"] - 40, BOX["y"], 20, 0, created_at=BULLET_MAX_AGE))
+    pool.add(bullet("alive", 100, 100, 5, 5, created_at=BULLET_MAX_AGE))
+    removed = pool.step(BULLET_MAX_AGE + 1, grid)
+    reasons = {bullet_id: reason for bullet_id, reason, _, _ in removed}
+    assert reasons == {"expired": REMOVED_EXPIRED, "out": REMOVED_OUT_OF_BOUNDS, "box": REMOVED_BOX}
+    # Bala expirada não anda; a que bateu na caixa para no ponto do impacto
+    positions = {bullet_id: (x, y) for bullet_id, _, x, y in removed}
+    assert positions["expired"] == (100.0, 100.0)
+    assert positions["box"] == (BOX["x"] - 20.0, BOX["y"])
+    assert list(pool.ids) == ["alive"]
+    assert pool.position("alive") == (105.0, 105.0)
+
+
+def test_step_matches_the_scalar_simulation():
+    """O pool vetorizado remove as mesmas balas, nos mesmos passos, que o caminho por dicts"""
+    grid = OccupancyGrid([BOX, {"id": "box_1", "x": 200, "y": 450, "size": 50}])
+    rng = random.Random(5)
+    bullets = {}
+    pool = BulletPool(capacity=4)
+    for i in range(200):
+        b = bullet(f"b{i}", rng.uniform(0, 800), rng.uniform(0, 600), rng.uniform(-40, 40), rng.uniform(-40, 40),
+                   created_at=rng.uniform(0, 40))
+        bullets[b["id"]] = dict(b)
+        pool.add(b)
+
+    for step in range(40):
+        now = 30 + step * 0.1
+        expected = set()
+        for bullet_id, b in list(bullets.items()):
+            if bullet_expired(b["created_at"], now):
+                expected.add(bullet_id)
+                continue
+            b["x"], b["y"] = step_bullet(b["x"], b["y"], b["dx"], b["dy"])
+            if bullet_out_of_bounds(b["x"], b["y"]) or bullet_hits_box(grid, b["x"], b["y"]):
+                expected.add(bullet_id)
+        for bullet_id in expected:
+            del bullets[bullet_id]
+
+        removed = {bullet_id for bullet_id, _, _, _ in pool.step(now, grid)}
+        assert removed == expected, step
+        for bullet_id, b in bullets.items():
+            assert pool.position(bullet_id) == pytest.approx((b["x"], b["y"]))
@@ -0,0 +1,55 @@
+import importlib.util
+import os
+import random
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from bullet_pool import HAS_NUMPY, BulletPool  # noqa: E402
+from game_map import OccupancyGrid  # noqa: E402
+from game_simulation import BULLET_MAX_AGE  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def client():
+    spec = importlib.util.spec_from_file_location("game_client", os.path.join(ROOT, "game-client.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_game(client, bullets, pooled):
+    """Só o estado que a simulação das balas usa (sem janela nem WebSocket)"""
+    game = client.MultiplayerGame.__new__(client.MultiplayerGame)
+    game.player_id = "eu"
+    game.occupancy_grid = OccupancyGrid([{"id": "box_0", "x": 400, "y": 300, "size": 50}])
+    game.collision_effects = []
+    game.bullet_snapshots = {}
+    game.outgoing_bullet_updates = {}
+    game.bullet_pool = BulletPool() if pooled else None
+    game.set_bullets([dict(bullet) for bullet in bullets])
+    return game
+
+
+@pytest.mark.skipif(not HAS_NUMPY, reason="BulletPool requer NumPy")
+def test_pool_and_dict_paths_move_every_bullet_the_same(client):
+    rng = random.Random(3)
+    bullets = [{"id": f"b{i}", "shooter_id": "eu" if i % 3 == 0 else "outro", "x": rng.uniform(0, 800),
+                "y": rng.uniform(0, 600), "dx": rng.uniform(-40, 40), "dy": rng.uniform(-40, 40),
+                "created_at": 0.0} for i in range(60)]
+    pooled = make_game(client, bullets, pooled=True)
+    plain = make_game(client, bullets, pooled=False)
+
+    for step in range(30):
+        now = BULLET_MAX_AGE - 1 + step * 0.1
+        pooled.step_bullet_pool(now)
+        plain.step_bullet_dicts(now)
+        assert pooled.bullets.keys() == plain.bullets.keys(), step
+        for bullet_id, bullet in plain.bullets.items():
+            # Balas remotas sem snapshots (ex.: vindas do game_state) são desenhadas pelo dict
+            other = pooled.bullets[bullet_id]
+            assert (other["x"], other["y"]) == pytest.approx((bullet["x"], bullet["y"])), (step, bullet_id)
@@ -0,0 +1,96 @@
+import math
+import random
+
+import pytest
+
+from game_map import GRID_CELL_SIZE, OccupancyGrid, create_map, generate_collision_boxes, get_occupancy_grid
+from game_simulation import GAME_HEIGHT, GAME_WIDTH, PLAYER_SIZE
+
+
+def box_contains(boxes, x, y):
+    """Verificação por caixa (a que a grade substituiu): ponto dentro de alguma caixa"""
+    for box in boxes:
+        half = int(box["size"]) // 2
+        if box["x"] - half <= x <= box["x"] + half and box["y"] - half <= y <= box["y"] + half:
+            return True
+    return False
+
+
+def box_distance(box, x, y):
+    """Distância do ponto até a caixa (0 dentro dela)"""
+    half = int(box["size"]) // 2
+    dx = max(box["x"] - half - x, 0, x - box["x"] - half)
+    dy = max(box["y"] - half - y, 0, y - box["y"] - half)
+    return math.hypot(dx, dy)
+
+
+def near_edge(boxes, x, y, margin):
+    """Ponto a menos de `margin` da borda de alguma caixa (onde a rasterização pode diferir)"""
+    for box in boxes:
+        half = int(box["size"]) // 2
+        inside_x = box["x"] - half - margin <= x <= box["x"] + half + margin
+        inside_y = box["y"] - half - margin <= y <= box["y"] + half + margin
+        edge_x = min(abs(x - (box["x"] - half)), abs(x - (box["x"] + half))) <= margin
+        edge_y = min(abs(y - (box["y"] - half)), abs(y - (box["y"] + half))) <= margin
+        if inside_x and inside_y and (edge_x or edge_y):
+            return True
+    return False
+
+
+@pytest.fixture(params=[1, 42, 123456])
+def boxes(request):
+    return generate_collision_boxes(request.param)
+
+
+def test_point_queries_agree_with_box_check(boxes):
+    grid = OccupancyGrid(boxes)
+    rng = random.Random(7)
+    for _ in range(20000):
+        x = rng.uniform(0, GAME_WIDTH - 0.001)
+        y = rng.uniform(0, GAME_HEIGHT - 0.001)
+        expected = box_contains(boxes, x, y)
+        if expected:
+            # Conservadora: nunca deixa passar um ponto dentro de uma caixa
+            assert grid.point_blocked(x, y), (x, y)
+        elif not near_edge(boxes, x, y, GRID_CELL_SIZE):
+            assert not grid.point_blocked(x, y), (x, y)
+
+
+def test_box_at_returns_the_box_hit(boxes):
+    grid = OccupancyGrid(boxes)
+    for box in boxes:
+        assert grid.box_at(box["x"], box["y"]) is box
+    assert grid.box_at(-1, 10) is None
+    assert grid.box_at(GAME_WIDTH, 10) is None
+
+
+def test_circle_queries_agree_with_distance_check(boxes):
+    grid = OccupancyGrid(boxes)
+    rng = random.Random(11)
+    tolerance = GRID_CELL_SIZE * math.sqrt(2)
+    for _ in range(20000):
+        x = rng.uniform(0, GAME_WIDTH - 0.001)
+        y = rng.uniform(0, GAME_HEIGHT - 0.001)
+        distance = min(box_distance(box, x, y) for box in boxes)
+        blocked = grid.circle_blocked(x, y, PLAYER_SIZE)
+        if distance < PLAYER_SIZE:
+            assert blocked, (x, y, distance)
+        elif distance > PLAYER_SIZE + tolerance:
+            assert not blocked, (x, y, distance)
+
+
+def test_many_boxes_use_wide_cells():
+    rng = random.Random(3)
+    boxes = [{"id": f"box_{i}", "x": rng.randint(0, GAME_WIDTH - 1), "y": rng.randint(0, GAME_HEIGHT - 1), "size": 4}
+             for i in range(300)]
+    grid = OccupancyGrid(boxes)
+    # Mais de 254 caixas não cabem num byte por célula
+    assert not isinstance(grid.cells, bytearray)
+    assert all(box_contains(boxes, box["x"], box["y"]) for box in boxes)
+    assert all(grid.point_blocked(box["x"], box["y"]) for box in boxes)
+
+
+def test_grid_is_cached_per_box_list():
+    collision_boxes = create_map(99)["collision_boxes"]
+    assert get_occupancy_grid(collision_boxes) is get_occupancy_grid(collision_boxes)
+    assert get_occupancy_grid(list(collision_boxes)) is not get_occupancy_grid(collision_boxes)
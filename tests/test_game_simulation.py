@@ -0,0 +1,109 @@
+import math
+
+import pytest
+
+from game_map import OccupancyGrid
+from game_simulation import (
+    BULLET_DAMAGE, BULLET_MAX_AGE, BULLET_SPEED, DIAGONAL_FACTOR, GAME_HEIGHT, GAME_WIDTH, PLAYER_MAX_HP,
+    PLAYER_SIZE, PLAYER_SPEED, TEAMS, apply_damage, bullet_expired, bullet_hits_box, bullet_hits_player,
+    bullet_out_of_bounds, bullet_velocity, enemy_team, flag_capture_error, flag_home_position, flag_scored,
+    near_flag, player_position_valid, step_bullet, step_player
+)
+
+BOX = {"id": "box_0", "x": 400, "y": 300, "size": 50}
+
+
+@pytest.fixture
+def grid():
+    return OccupancyGrid([BOX])
+
+
+def test_enemy_team():
+    assert enemy_team("red") == "blue"
+    assert enemy_team("blue") == "red"
+
+
+def test_step_player_moves_and_normalizes_diagonals():
+    assert step_player(100, 100, 1, 0) == (100 + PLAYER_SPEED, 100)
+    x, y = step_player(100, 100, 1, 1)
+    assert x == pytest.approx(100 + PLAYER_SPEED * DIAGONAL_FACTOR)
+    assert y == pytest.approx(100 + PLAYER_SPEED * DIAGONAL_FACTOR)
+    assert step_player(100, 100, 0, 0) == (100, 100)
+
+
+def test_step_player_clamps_to_the_map():
+    assert step_player(1, 1, -1, -1) == (0, 0)
+    assert step_player(GAME_WIDTH - PLAYER_SIZE, GAME_HEIGHT - PLAYER_SIZE, 1, 1) == (
+        GAME_WIDTH - PLAYER_SIZE, GAME_HEIGHT - PLAYER_SIZE)
+
+
+def test_step_player_stops_at_boxes_and_slides(grid):
+    # Encostado à esquerda da caixa: o passo para a direita é bloqueado
+    x = BOX["x"] - BOX["size"] // 2 - PLAYER_SIZE - 4  # Folga maior que uma célula da grade
+    assert step_player(x, BOX["y"], 1, 0, grid) == (x, BOX["y"])
+    # Na diagonal, desliza só no eixo livre (Y)
+    new_x, new_y = step_player(x, BOX["y"], 1, 1, grid)
+    assert new_x == x
+    assert new_y == pytest.approx(BOX["y"] + PLAYER_SPEED * DIAGONAL_FACTOR)
+
+
+def test_step_player_is_deterministic(grid):
+    path = [(1, 0), (1, 1), (0, 1), (-1, 1), (1, -1)] * 40
+    def run():
+        x, y = 100.0, 100.0
+        for move in path:
+            x, y = step_player(x, y, *move, grid)
+        return x, y
+    assert run() == run()
+
+
+def test_player_position_valid(grid):
+    assert player_position_valid(100, 100, grid)
+    assert not player_position_valid(BOX["x"], BOX["y"], grid)
+    assert not player_position_valid(-1, 100)
+    assert not player_position_valid(GAME_WIDTH - PLAYER_SIZE + 1, 100)
+    assert player_position_valid(GAME_WIDTH - PLAYER_SIZE, GAME_HEIGHT - PLAYER_SIZE)
+
+
+def test_bullet_velocity_and_step():
+    dx, dy = bullet_velocity(0, 0, 30, 40)
+    assert math.hypot(dx, dy) == pytest.approx(BULLET_SPEED)
+    assert (dx, dy) == pytest.approx((BULLET_SPEED * 0.6, BULLET_SPEED * 0.8))
+    # Alvo no próprio atirador: a bala desce
+    assert bullet_velocity(10, 10, 10, 10) == (0, BULLET_SPEED)
+    assert step_bullet(1, 2, 3, 4) == (4, 6)
+
+
+def test_bullet_bounds_age_and_hits(grid):
+    assert not bullet_out_of_bounds(0, GAME_HEIGHT)
+    assert bullet_out_of_bounds(-0.1, 10)
+    assert bullet_out_of_bounds(10, GAME_HEIGHT + 0.1)
+    assert not bullet_expired(100, 100 + BULLET_MAX_AGE)
+    assert bullet_expired(100, 100 + BULLET_MAX_AGE + 0.01)
+    assert bullet_hits_box(grid, BOX["x"], BOX["y"]) is BOX
+    assert bullet_hits_box(grid, 10, 10) is None
+    assert bullet_hits_box(None, BOX["x"], BOX["y"]) is None
+    assert bullet_hits_player(100, 100, 120, 120)
+    assert not bullet_hits_player(100, 100, 130, 100)
+
+
+def test_apply_damage_never_goes_negative():
+    assert apply_damage(PLAYER_MAX_HP) == PLAYER_MAX_HP - BULLET_DAMAGE
+    assert apply_damage(BULLET_DAMAGE - 1) == 0
+
+
+def test_flag_rules():
+    flag = {"x": TEAMS["blue"]["flag_x"], "y": TEAMS["blue"]["flag_y"], "captured": False}
+    assert flag_capture_error("red", 100, "blue", flag) is None
+    assert flag_capture_error("red", 0, "blue", flag) == "dead"
+    assert flag_capture_error("blue", 100, "blue", flag) == "own_team"
+    assert flag_capture_error("red", 100, "blue", {**flag, "captured": True}) == "captured"
+
+    assert near_flag(flag["x"] + 29, flag["y"], flag)
+    assert not near_flag(flag["x"] + 30, flag["y"], flag)
+
+    # A bandeira azul pontua na base vermelha
+    red_base = TEAMS["red"]
+    assert flag_scored("blue", red_base["base_x"], red_base["base_y"])
+    assert not flag_scored("blue", TEAMS["blue"]["base_x"], TEAMS["blue"]["base_y"])
+    assert flag_home_position("blue") == (flag["x"], flag["y"])
@@ -0,0 +1,116 @@
+import threading
+from collections import Counter
+
+import pytest
+
+from lobby import MAX_PLACEMENT_ATTEMPTS, RoomFullError, RoomRegistry, pick_team
+from local_backend import new_rooms_table
+
+
+def run_concurrently(count, target):
+    barrier = threading.Barrier(count)
+    results = [None] * count
+    errors = []
+
+    def worker(index):
+        barrier.wait()
+        try:
+            results[index] = target(index)
+        except Exception as e:  # noqa: BLE001 - a falha aparece no assert abaixo
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    return results
+
+
+def test_pick_team_prefers_the_smaller_team():
+    assert pick_team({"red": 0, "blue": 0}) == "red"
+    assert pick_team({"red": 3, "blue": 2}) == "blue"
+
+
+def test_place_fills_least_full_room_then_creates():
+    registry = RoomRegistry(new_rooms_table(), capacity=2)
+    first = registry.place()
+    assert first.created
+    second = registry.place()
+    assert second.room_id == first.room_id and not second.created
+    assert {first.team, second.team} == {"red", "blue"}
+    third = registry.place()
+    assert third.created and third.room_id != first.room_id
+
+
+def test_open_rooms_reads_only_rooms_with_seats_least_full_first():
+    table = new_rooms_table()
+    registry = RoomRegistry(table, capacity=3)
+    rooms = [registry.create_room(f"sala-{i}") for i in range(MAX_PLACEMENT_ATTEMPTS + 3)]
+    for room, players in zip(rooms, [3, 2, 0, 1, 3, 2, 1, 0]):
+        for _ in range(players):
+            registry.join_room(room)
+    table.reset_stats()
+    open_rooms = registry.open_rooms()
+    assert [room["players"] for room in open_rooms] == [0, 0, 1, 1, 2]
+    assert table.stats["scan"] == 0
+    assert table.stats["items_read"] == MAX_PLACEMENT_ATTEMPTS
+
+
+def test_requested_room_raises_when_full():
+    registry = RoomRegistry(new_rooms_table(), capacity=1)
+    assert registry.place("sala-x").room_id == "sala-x"
+    with pytest.raises(RoomFullError):
+        registry.place("sala-x")
+
+
+def test_concurrent_place_never_overfills_rooms():
+    table = new_rooms_table()
+    registry = RoomRegistry(table, capacity=4)
+    placements = run_concurrently(60, lambda _: registry.place())
+
+    per_room = Counter(placement.room_id for placement in placements)
+    assert max(per_room.values()) <= 4
+    for room_id, seated in per_room.items():
+        room = table.get_item(Key={"room_id": room_id})["Item"]
+        assert room["players"] == seated
+        assert room["red"] + room["blue"] == seated
+        teams = Counter(p.team for p in placements if p.room_id == room_id)
+        assert (room["red"], room["blue"]) == (teams["red"], teams["blue"])
+    assert registry.stats()["players"] == 60
+
+
+def test_concurrent_leave_retires_empty_rooms_once():
+    table = new_rooms_table()
+    registry = RoomRegistry(table, capacity=4)
+    placements = [registry.place() for _ in range(20)]
+    retired = run_concurrently(len(placements), lambda i: registry.leave(placements[i].room_id, placements[i].team))
+
+    assert sum(retired) == len({placement.room_id for placement in placements})
+    assert registry.stats() == {"rooms": 0, "players": 0, "full_rooms": 0}
+    # Sala já aposentada: a saída não faz nada
+    assert registry.leave(placements[0].room_id, placements[0].team) is False
+
+
+def test_concurrent_join_and_leave_keep_counters_consistent():
+    table = new_rooms_table()
+    registry = RoomRegistry(table, capacity=4)
+    seated = [registry.place() for _ in range(12)]
+
+    def churn(index):
+        if index % 2:
+            placement = seated[index // 2]
+            return registry.leave(placement.room_id, placement.team)
+        return registry.place()
+
+    results = run_concurrently(2 * len(seated), churn)
+    joined = results[0::2]
+    assert all(placement.team in ("red", "blue") for placement in joined)
+
+    # Todos os jogadores originais saíram; só os que entraram agora continuam sentados
+    rooms = table.scan()["Items"]
+    assert sum(room["players"] for room in rooms) == len(joined)
+    assert all(0 <= room["players"] <= 4 and room["red"] + room["blue"] == room["players"] for room in rooms)
+    per_room = Counter(placement.room_id for placement in joined)
+    assert {room["room_id"]: room["players"] for room in rooms if room["players"]} == dict(per_room)
@@ -0,0 +1,98 @@
+from decimal import Decimal
+
+import pytest
+from botocore.exceptions import ClientError
+
+from local_backend import LocalTable, apply_update, evaluate_condition, new_rooms_table
+from lobby import OPEN_ROOMS_INDEX
+
+ITEM = {"connection_id": "c1", "status": "open", "players": Decimal(3), "last_action_seq": Decimal(5)}
+
+
+@pytest.mark.parametrize("expression, values, expected", [
+    ("attribute_exists(connection_id)", {}, True),
+    ("attribute_not_exists(connection_id)", {}, False),
+    ("attribute_not_exists(team)", {}, True),
+    ("players = :v", {":v": 3}, True),
+    ("players <> :v", {":v": 3}, False),
+    ("players < :v", {":v": 4}, True),
+    ("players <= :v", {":v": 3}, True),
+    ("players > :v", {":v": 3}, False),
+    ("players >= :v", {":v": 3}, True),
+    # Atributo ausente: só "<>" é verdadeiro
+    ("team = :v", {":v": "red"}, False),
+    ("team <> :v", {":v": "red"}, True),
+    # Tipos diferentes não se comparam
+    ("status < :v", {":v": 1}, False),
+])
+def test_single_terms(expression, values, expected):
+    assert evaluate_condition(expression, ITEM, values) is expected
+
+
+@pytest.mark.parametrize("seq, expected", [(4, False), (5, False), (6, True)])
+def test_stale_seq_condition_with_or_group(seq, expected):
+    expression = "attribute_exists(connection_id) AND (attribute_not_exists(last_action_seq) OR last_action_seq < :seq)"
+    assert evaluate_condition(expression, ITEM, {":seq": seq}) is expected
+    # Sem last_action_seq, o lado attribute_not_exists do OR vale
+    assert evaluate_condition(expression, {"connection_id": "c1"}, {":seq": seq}) is True
+
+
+def test_and_binds_tighter_than_or():
+    values = {":a": 3, ":b": "closed", ":c": 99}
+    # players = 3 OR (status = closed AND players = 99)
+    assert evaluate_condition("players = :a OR status = :b AND players = :c", ITEM, values) is True
+    assert evaluate_condition("(players = :a OR status = :b) AND players = :c", ITEM, values) is False
+    assert evaluate_condition("players = :c or status = :b OR attribute_exists(players)", ITEM, values) is True
+
+
+def test_nested_groups_and_names():
+    names = {"#s": "status"}
+    values = {":open": "open", ":one": 1, ":seq": 9}
+    expression = "((#s = :open AND players > :one) OR last_action_seq > :seq) AND attribute_exists(#s)"
+    assert evaluate_condition(expression, ITEM, values, names) is True
+    assert evaluate_condition(expression, {**ITEM, "status": "full"}, values, names) is False
+
+
+def test_missing_item_and_unsupported_terms():
+    assert evaluate_condition("attribute_not_exists(connection_id)", None, {}) is True
+    with pytest.raises(ClientError) as error:
+        evaluate_condition("begins_with(status, :v)", ITEM, {":v": "o"})
+    assert error.value.response["Error"]["Code"] == "ValidationException"
+
+
+def test_apply_update_set_add_remove():
+    item = {"players": Decimal(1), "red": Decimal(1), "x": 5}
+    apply_update(item, "SET last_activity = :t, hp = if_not_exists(hp, :hp), y = x + :d ADD players :one, #team :one REMOVE x",
+                 {":t": 10, ":hp": 100, ":d": 2, ":one": 1}, {"#team": "blue"})
+    assert item == {"players": 2, "red": 1, "blue": 1, "last_activity": 10, "hp": 100, "y": 7}
+
+
+def test_conditional_update_failure_leaves_item_untouched():
+    table = LocalTable("WebSocketConnections", "connection_id")
+    table.put_item(Item=dict(ITEM))
+    with pytest.raises(ClientError) as error:
+        table.update_item(Key={"connection_id": "c1"}, UpdateExpression="SET x = :x",
+                          ConditionExpression="last_action_seq < :seq", ExpressionAttributeValues={":x": 1, ":seq": 5})
+    assert error.value.response["Error"]["Code"] == "ConditionalCheckFailedException"
+    assert "x" not in table.get_item(Key={"connection_id": "c1"})["Item"]
+
+
+def test_query_on_sort_key_index_is_ordered_sparse_and_limited():
+    table = new_rooms_table()
+    for i, players in enumerate([4, 1, 3, 0, 2]):
+        table.put_item(Item={"room_id": f"sala-{i}", "status": "open", "players": players})
+    table.put_item(Item={"room_id": "sem-contador", "status": "open"})  # Fora do índice (esparso)
+    table.put_item(Item={"room_id": "fechada", "status": "closed", "players": 0})
+
+    response = table.query(IndexName=OPEN_ROOMS_INDEX, KeyConditionExpression="#s = :open AND players < :cap",
+                           ExpressionAttributeNames={"#s": "status"}, ExpressionAttributeValues={":open": "open", ":cap": 4},
+                           Limit=3)
+    assert [item["players"] for item in response["Items"]] == [0, 1, 2]
+
+    response = table.query(IndexName=OPEN_ROOMS_INDEX, KeyConditionExpression="status = :open",
+                           ExpressionAttributeValues={":open": "open"}, ScanIndexForward=False)
+    assert [item["players"] for item in response["Items"]] == [4, 3, 2, 1, 0]
+
+    with pytest.raises(ClientError):
+        table.query(IndexName=OPEN_ROOMS_INDEX, KeyConditionExpression="status = :open AND red < :cap",
+                    ExpressionAttributeValues={":open": "open", ":cap": 4})
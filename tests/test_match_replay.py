@@ -0,0 +1,45 @@
+import glob
+import json
+
+import pytest
+
+import websocket_game_handler as handler
+from local_backend import make_event
+from local_server import silence_handler_logs
+from match_replay import RECORD_ACTION, RECORD_EVENT, MatchRecorder, read_match
+from room_workers import install_worker_backend
+
+INSTALLED = ("connections_table", "bullets_table", "game_state_table", "rooms_table", "room_registry",
+             "get_api_gateway_client", "ROOM_CAPACITY", "match_recorder")
+
+
+@pytest.fixture
+def recording_handler(monkeypatch, tmp_path):
+    """Handler com backend local gravando as partidas em tmp_path (restaurado no fim do teste)"""
+    for name in INSTALLED:
+        monkeypatch.setattr(handler, name, getattr(handler, name))
+    silence_handler_logs()
+    install_worker_backend(handler, lambda connection_id, data: True, 4)
+    handler.match_recorder = MatchRecorder(str(tmp_path))
+    yield handler
+    handler.match_recorder.close()
+
+
+def test_retiring_disconnect_is_recorded_before_the_match_closes(recording_handler, tmp_path):
+    room_id = "sala-teste"
+    for connection_id in ("c1", "c2"):
+        recording_handler.lambda_handler(make_event(connection_id, "$connect", params={"room": room_id}), None)
+        body = json.dumps({"action": "join", "player_id": None, "room_id": room_id, "team": None})
+        assert recording_handler.lambda_handler(make_event(connection_id, "$default", body), None)["statusCode"] == 200
+    for connection_id in ("c1", "c2"):
+        assert recording_handler.lambda_handler(make_event(connection_id, "$disconnect"), None)["statusCode"] == 200
+
+    # A sala foi aposentada e sua partida fechada
+    assert room_id not in recording_handler.match_recorder.matches
+    (path,) = glob.glob(str(tmp_path / "*.replay"))
+    records = list(read_match(path))
+    last_action = max(i for i, record in enumerate(records) if record.kind == RECORD_ACTION)
+    assert records[last_action].data.route_key == "$disconnect"
+    assert records[last_action].data.connection_id == "c2"
+    assert any(record.kind == RECORD_EVENT and record.data.get("type") == "player_left"
+               for record in records[last_action + 1:])
@@ -0,0 +1,133 @@
+from decimal import Decimal
+
+import pytest
+from botocore.exceptions import ClientError
+
+from local_backend import LocalTable
+from position_buffer import STALE_SEQ_CONDITION, PositionBuffer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def table():
+    table = LocalTable("WebSocketConnections", "connection_id")
+    for connection_id in ("c1", "c2"):
+        table.put_item(Item={"connection_id": connection_id, "x": 0, "y": 0, "team": "red"})
+    table.reset_stats()
+    return table
+
+
+def item(table, connection_id):
+    return table.get_item(Key={"connection_id": connection_id}).get("Item")
+
+
+def test_put_keeps_only_the_latest_position(table, clock):
+    buffer = PositionBuffer(1.0, clock)
+    for i in range(10):
+        buffer.put("c1", i, i * 2, 100 + i, seq=i + 1, input_seq=i)
+    buffer.flush(table)
+    assert table.stats["update"] == 1
+    stored = item(table, "c1")
+    assert (stored["x"], stored["y"], stored["last_activity"]) == (9, 18, 109)
+    assert (stored["last_action_seq"], stored["last_input_seq"]) == (10, 9)
+    assert buffer.stats == {"buffered": 10, "written": 1, "dropped": 0}
+    assert not buffer.pending
+
+
+def test_put_without_seq_keeps_the_pending_seq(table, clock):
+    buffer = PositionBuffer(1.0, clock)
+    buffer.put("c1", 1, 1, 100, seq=5, input_seq=7)
+    buffer.put("c1", 2, 2, 101)
+    assert buffer.pending["c1"]["seq"] == 5
+    assert buffer.pending["c1"]["input_seq"] == 7
+
+
+def test_flush_due_waits_for_the_interval(table, clock):
+    buffer = PositionBuffer(1.0, clock)
+    buffer.put("c1", 5, 5, 100)
+    clock.now = 0.5
+    buffer.flush_due(table)
+    assert item(table, "c1")["x"] == 0
+    clock.now = 1.0
+    buffer.flush_due(table)
+    assert item(table, "c1")["x"] == 5
+    # Sem pendências, nada é gravado
+    clock.now = 5.0
+    buffer.flush_due(table)
+    assert table.stats["update"] == 1
+
+
+def test_overlay_shows_unwritten_position(table, clock):
+    buffer = PositionBuffer(1.0, clock)
+    buffer.put("c1", 3.5, 4, 100, seq=2, input_seq=9)
+    overlaid = buffer.overlay("c1", item(table, "c1"))
+    assert (overlaid["x"], overlaid["y"]) == (Decimal("3.5"), Decimal("4"))
+    assert (overlaid["last_action_seq"], overlaid["last_input_seq"]) == (2, 9)
+    assert overlaid["team"] == "red"
+    assert buffer.overlay("c2", item(table, "c2"))["x"] == 0
+    # Conexão sem item: nada a sobrepor
+    assert buffer.overlay("c1", {}) == {}
+    assert [i["x"] for i in buffer.overlay_items([item(table, "c1"), item(table, "c2")])] == [Decimal("3.5"), 0]
+
+
+def test_discard_drops_the_pending_position(table, clock):
+    buffer = PositionBuffer(1.0, clock)
+    buffer.put("c1", 5, 5, 100)
+    buffer.discard("c1")
+    buffer.flush(table)
+    assert item(table, "c1")["x"] == 0
+
+
+def test_flush_does_not_recreate_removed_connections(table, clock):
+    buffer = PositionBuffer(1.0, clock)
+    buffer.put("c1", 5, 5, 100)
+    buffer.put("gone", 5, 5, 100, seq=3)
+    buffer.flush(table)
+    assert item(table, "gone") is None
+    assert buffer.stats["written"] == 1 and buffer.stats["dropped"] == 1
+
+
+def test_flush_skips_stale_positions(table, clock):
+    """Outro processo já gravou um update mais novo: a posição antiga do buffer não sobrescreve"""
+    buffer = PositionBuffer(1.0, clock)
+    buffer.put("c1", 5, 5, 100, seq=3)
+    table.update_item(Key={"connection_id": "c1"}, UpdateExpression="SET x = :x, last_action_seq = :seq",
+                      ExpressionAttributeValues={":x": 9, ":seq": 4})
+    buffer.flush(table)
+    stored = item(table, "c1")
+    assert (stored["x"], stored["last_action_seq"]) == (9, 4)
+    assert buffer.stats["dropped"] == 1
+
+
+def test_flush_writes_a_position_whose_seq_was_already_claimed(table, clock):
+    """No Lambda o handler grava o last_action_seq antes do broadcast; a posição do mesmo seq ainda vale"""
+    table.update_item(Key={"connection_id": "c1"}, UpdateExpression="SET last_action_seq = :seq",
+                      ConditionExpression=STALE_SEQ_CONDITION, ExpressionAttributeValues={":seq": 3})
+    buffer = PositionBuffer(1.0, clock)
+    buffer.put("c1", 5, 5, 100, seq=3)
+    buffer.flush(table)
+    assert item(table, "c1")["x"] == 5
+    assert buffer.stats["written"] == 1
+
+
+def test_stale_seq_condition_rejects_equal_and_older_seqs(table):
+    table.update_item(Key={"connection_id": "c1"}, UpdateExpression="SET last_action_seq = :seq",
+                      ConditionExpression=STALE_SEQ_CONDITION, ExpressionAttributeValues={":seq": 3})
+    for seq in (2, 3):
+        with pytest.raises(ClientError) as error:
+            table.update_item(Key={"connection_id": "c1"}, UpdateExpression="SET last_action_seq = :seq",
+                              ConditionExpression=STALE_SEQ_CONDITION, ExpressionAttributeValues={":seq": seq})
+        assert error.value.response["Error"]["Code"] == "ConditionalCheckFailedException"
+    assert item(table, "c1")["last_action_seq"] == 3
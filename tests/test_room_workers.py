@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+import websocket_game_handler as handler
+from lobby import RoomRegistry
+from local_backend import make_event, new_rooms_table
+from local_server import silence_handler_logs
+from room_workers import RoomSupervisor, install_worker_backend
+
+INSTALLED = ("connections_table", "bullets_table", "game_state_table", "rooms_table", "room_registry",
+             "get_api_gateway_client", "ROOM_CAPACITY")
+
+
+@pytest.fixture
+def worker_handler(monkeypatch):
+    """O handler como um worker o configura (restaurado no fim do teste)"""
+    for name in INSTALLED:
+        monkeypatch.setattr(handler, name, getattr(handler, name))
+    silence_handler_logs()
+    return handler
+
+
+class FakeWorker:
+    def __init__(self):
+        self.events = []
+        self.rooms = set()
+        self.busy = 0.0
+
+    def post(self, message):
+        self.events.append(message)
+
+
+def join_body(room_id, team):
+    return json.dumps({"action": "join", "player_id": None, "room_id": room_id, "team": team})
+
+
+def test_worker_accepts_every_player_the_supervisor_seats(worker_handler):
+    capacity = 12
+    install_worker_backend(worker_handler, lambda connection_id, data: True, capacity)
+    supervisor_registry = RoomRegistry(new_rooms_table(), capacity)
+
+    statuses = []
+    for i in range(capacity):
+        placement = supervisor_registry.place()
+        connection_id = f"c{i}"
+        worker_handler.lambda_handler(make_event(connection_id, "$connect", params={"room": placement.room_id}), None)
+        response = worker_handler.lambda_handler(
+            make_event(connection_id, "$default", join_body(placement.room_id, placement.team)), None)
+        statuses.append(response["statusCode"])
+    assert statuses == [200] * capacity
+
+
+def test_rejected_join_is_rolled_back_on_the_supervisor():
+    supervisor = RoomSupervisor(workers=1, capacity=2)
+    worker = FakeWorker()
+    supervisor.workers = [worker]
+
+    supervisor.join("c1", json.dumps({"action": "join", "player_id": "p1"}))
+    room_id, team = supervisor.routes["c1"]
+    assert supervisor.room_owner[room_id] is worker
+    assert [event[3] for event in worker.events] == ["$connect", "$default"]
+
+    # Rejeição de outra sala (ex.: conexão já roteada de novo) é ignorada
+    supervisor.reject_join("outra-sala", "c1")
+    assert "c1" in supervisor.routes
+
+    supervisor.reject_join(room_id, "c1")
+    assert "c1" not in supervisor.routes
+    assert worker.events[-1][2:4] == ("c1", "$disconnect")
+    # A vaga voltou ao lobby: a sala ficou vazia e foi aposentada
+    assert supervisor.registry.stats()["players"] == 0
+    assert room_id not in supervisor.room_owner
@@ -5,39 +5,144 @@ AWS Lambda + DynamoDB + API Gateway WebSocket
 """
 
 import json
-import boto3
 import time
 import uuid
 import os
-import math
+from contextlib import nullcontext
 from typing import Dict, Any, List
 from botocore.exceptions import ClientError
 from decimal import Decimal
 
+import aws_clients
+from aws_clients import LazyTable
+from game_map import create_map, get_occupancy_grid, load_map
+from lobby import DEFAULT_ROOM_CAPACITY, OPEN_ROOMS_INDEX, RoomFullError, RoomRegistry
+from match_replay import MatchRecorder
+from position_buffer import STALE_SEQ_CONDITION, PositionBuffer
+import profiling
+from profiling import ActionProfiler
+import telemetry
+from telemetry import InstrumentedApiGateway, InstrumentedTable
+from game_simulation import (
+    BULLET_DAMAGE,
+    PLAYER_MAX_HP,
+    TEAMS,
+    apply_damage,
+    bullet_hits_box,
+    bullet_hits_player,
+    bullet_out_of_bounds,
+    bullet_velocity,
+    flag_capture_error,
+    flag_home_position,
+    flag_scored,
+    player_position_valid,
+)
+
 
 # Versão do servidor para verificar se foi deployado
-SERVER_VERSION = "2.1.0-bullet-fix"
+SERVER_VERSION = "2.2.0-rooms"
 
 # Configurações
 TABLE_NAME = os.environ.get("TABLE_NAME", "WebSocketConnections")
 AWS_REGION = os.environ.get("AWS_REGION", "us-east-1")
 API_GATEWAY_ENDPOINT = os.environ.get("API_GATEWAY_ENDPOINT")
 
-# Clientes AWS
-dynamodb = boto3.resource("dynamodb", region_name=AWS_REGION)
-connections_table = dynamodb.Table(TABLE_NAME)
+# Clientes AWS criados no primeiro uso e reaproveitados entre invocações (aws_clients.py)
+# Tabelas instrumentadas: cada invocação emite suas métricas, ver telemetry.py
+connections_table = InstrumentedTable(LazyTable(TABLE_NAME, AWS_REGION), "connections")
 
 # DynamoDB table para balas
-bullets_table = dynamodb.Table("game_bullets")
+bullets_table = InstrumentedTable(LazyTable("game_bullets", AWS_REGION), "bullets")
 
 # DynamoDB table para estado do jogo
-game_state_table = dynamodb.Table("game_state")
+game_state_table = InstrumentedTable(LazyTable("game_state", AWS_REGION), "game_state")
+
+# Salas: cada sala tem seu item no game_state, seu roster de conexões e suas balas
+DEFAULT_ROOM_ID = "default"
+MAX_ROOM_ID_LENGTH = 64
+# Índice global (partição room_id) em WebSocketConnections e game_bullets
+ROOM_INDEX = os.environ.get("ROOM_INDEX", "room_id-index")
+
+
+# Lobby: registro de salas com contadores de ocupação (tabela game_rooms)
+ROOMS_TABLE = os.environ.get("ROOMS_TABLE", "game_rooms")
+ROOM_CAPACITY = int(os.environ.get("ROOM_CAPACITY", DEFAULT_ROOM_CAPACITY))
+# Índice global de salas abertas em game_rooms (partição status, ordenação players)
+ROOMS_INDEX = os.environ.get("ROOMS_INDEX", OPEN_ROOMS_INDEX)
+rooms_table = InstrumentedTable(LazyTable(ROOMS_TABLE, AWS_REGION), "rooms")
+room_registry = RoomRegistry(rooms_table, ROOM_CAPACITY, ROOMS_INDEX)
+
+# Barramento de broadcast entre nós de um servidor próprio (broadcast_bus.py, instalado pelo servidor local)
+# None no Lambda: o API Gateway alcança todas as conexões
+broadcast_bus = None
+
+# Replay: ações aceitas e eventos de cada partida gravados em REPLAY_DIR (match_replay.py); desligado se vazio
+REPLAY_DIR = os.environ.get("REPLAY_DIR")
+match_recorder = MatchRecorder(REPLAY_DIR) if REPLAY_DIR else None
+# Salas aposentadas na invocação; a partida só é fechada no fim do process_event,
+# depois de gravada a ação que aposentou a sala (o último $disconnect e seu player_left)
+matches_to_close = []
+
+# Item da conexão lido pelo resolve_room_id, reaproveitado pelo handler da mesma invocação
+# (connection_id, item); usado uma vez e descartado no início de cada invocação
+connection_item = None
+
+# Telemetria: orçamentos por invocação (0 = sem orçamento); invocações acima deles são marcadas no registro
+DYNAMO_CALL_BUDGET = int(os.environ.get("DYNAMO_CALL_BUDGET", 0))
+SEND_BUDGET = int(os.environ.get("SEND_BUDGET", 0))
+# Recebe cada registro de métricas além do log (o servidor local agrega por ação)
+telemetry_sink = None
+
+# Profiling sob demanda (profiling.py): PROFILE_ACTIONS liga cProfile/tracemalloc nas ações escolhidas;
+# o debug_handler também liga, desliga e pede o relatório sem novo deploy
+action_profiler = ActionProfiler.from_env()
+
+# Posições dos jogadores gravadas a cada POSITION_FLUSH_INTERVAL segundos (position_buffer.py),
+# não a cada update; 0 grava direto no DynamoDB a cada update.
+# O buffer é do servidor de longa duração (local_server.py, room_workers.py), que grava as posições
+# pendentes num timer. No Lambda ele fica desligado por padrão: cada container teria o seu buffer e
+# nada grava o de um container que parou de receber invocações.
+RUNNING_ON_LAMBDA = "AWS_LAMBDA_FUNCTION_NAME" in os.environ
+POSITION_FLUSH_INTERVAL = float(os.environ.get("POSITION_FLUSH_INTERVAL", 0 if RUNNING_ON_LAMBDA else 1.0))
+position_buffer = PositionBuffer(POSITION_FLUSH_INTERVAL) if POSITION_FLUSH_INTERVAL > 0 else None
+
+
+def game_state_key(room_id):
+    """Id do item da sala no game_state (a sala padrão mantém o item de antes das salas)"""
+    return "current_game" if room_id == DEFAULT_ROOM_ID else f"room#{room_id}"
+
+
+def normalize_room_id(room_id):
+    """Id de sala pedido pelo cliente (vazio ou inválido vira a sala padrão)"""
+    if not isinstance(room_id, str):
+        return DEFAULT_ROOM_ID
+    return room_id.strip()[:MAX_ROOM_ID_LENGTH] or DEFAULT_ROOM_ID
+
+
+def query_room(table, room_id, filter_expression=None, values=None):
+    """Itens de uma sala pelo índice room_id (lê só a partição da sala, não a tabela toda)"""
+    params = {
+        "IndexName": ROOM_INDEX,
+        "KeyConditionExpression": "room_id = :room",
+        "ExpressionAttributeValues": {":room": room_id, **(values or {})}
+    }
+    if filter_expression:
+        params["FilterExpression"] = filter_expression
+    return table.query(**params).get("Items", [])
+
+
+def new_id():
+    """Id curto de jogador ou bala (gravado no replay, que reproduz os mesmos ids)"""
+    generated = str(uuid.uuid4())[:8]
+    if match_recorder is not None:
+        match_recorder.ids.append(generated)
+    return generated
 
 
 def get_api_gateway_client(domain_name, stage):
-    """Cria cliente para enviar mensagens WebSocket"""
-    endpoint_url = API_GATEWAY_ENDPOINT
-    return boto3.client("apigatewaymanagementapi", endpoint_url=endpoint_url, region_name=AWS_REGION)
+    """Cliente para enviar mensagens WebSocket (um por endpoint, reaproveitado nas invocações seguintes)"""
+    endpoint_url = API_GATEWAY_ENDPOINT or f"https://{domain_name}/{stage}"
+    return aws_clients.api_gateway_client(endpoint_url, AWS_REGION)
 
 
 def to_dynamodb_value(value):
@@ -90,119 +195,15 @@ def convert_decimals_recursive(obj, path=""):
         return str(obj)
 
 
-# Configurações do jogo
-GAME_WIDTH = 800
-GAME_HEIGHT = 600
-FLAG_SIZE = 30
-BASE_SIZE = 100
-BULLET_SPEED = 8
-BULLET_DAMAGE = 25
-PLAYER_MAX_HP = 100
-RESPAWN_TIME = 5  # segundos
-
-# Configurações das caixas de colisão
-BOX_SIZE = 50  # Tamanho das caixas quadradas (aumentado para melhor visibilidade)
-NUM_BOXES = 12  # Número de caixas a serem geradas (aumentado para mais estratégia)
-BOX_MIN_DISTANCE = 100  # Distância mínima entre caixas e outros objetos (aumentado)
-
-# Times
-TEAMS = {
-    "red": {
-        "name": "Time Vermelho",
-        "color": [255, 100, 100],
-        "base_x": 50,
-        "base_y": GAME_HEIGHT // 2,
-        "flag_x": 50,
-        "flag_y": GAME_HEIGHT // 2,
-        "spawn_x": 100,
-        "spawn_y": GAME_HEIGHT // 2
-    },
-    "blue": {
-        "name": "Time Azul", 
-        "color": [100, 100, 255],
-        "base_x": GAME_WIDTH - 50,
-        "base_y": GAME_HEIGHT // 2,
-        "flag_x": GAME_WIDTH - 50,
-        "flag_y": GAME_HEIGHT // 2,
-        "spawn_x": GAME_WIDTH - 100,
-        "spawn_y": GAME_HEIGHT // 2
-    }
-}
-
-def generate_collision_boxes():
-    """Gera caixas de colisão aleatórias no mapa"""
-    import random
-    
-    boxes = []
-    attempts = 0
-    max_attempts = 1000
-    
-    # Posições que devem ser evitadas (bases, bandeiras, spawns)
-    forbidden_areas = [
-        # Base vermelha
-        {"x": TEAMS["red"]["base_x"], "y": TEAMS["red"]["base_y"], "radius": BASE_SIZE // 2 + BOX_MIN_DISTANCE},
-        # Base azul
-        {"x": TEAMS["blue"]["base_x"], "y": TEAMS["blue"]["base_y"], "radius": BASE_SIZE // 2 + BOX_MIN_DISTANCE},
-        # Bandeira vermelha
-        {"x": TEAMS["red"]["flag_x"], "y": TEAMS["red"]["flag_y"], "radius": FLAG_SIZE // 2 + BOX_MIN_DISTANCE},
-        # Bandeira azul
-        {"x": TEAMS["blue"]["flag_x"], "y": TEAMS["blue"]["flag_y"], "radius": FLAG_SIZE // 2 + BOX_MIN_DISTANCE},
-        # Spawn vermelho
-        {"x": TEAMS["red"]["spawn_x"], "y": TEAMS["red"]["spawn_y"], "radius": 50 + BOX_MIN_DISTANCE},
-        # Spawn azul
-        {"x": TEAMS["blue"]["spawn_x"], "y": TEAMS["blue"]["spawn_y"], "radius": 50 + BOX_MIN_DISTANCE}
-    ]
-    
-    while len(boxes) < NUM_BOXES and attempts < max_attempts:
-        attempts += 1
-        
-        # Gera posição aleatória
-        x = random.randint(BOX_SIZE // 2, GAME_WIDTH - BOX_SIZE // 2)
-        y = random.randint(BOX_SIZE // 2, GAME_HEIGHT - BOX_SIZE // 2)
-        
-        # Verifica se está longe das áreas proibidas
-        valid_position = True
-        for area in forbidden_areas:
-            dx = x - area["x"]
-            dy = y - area["y"]
-            distance = math.sqrt(dx*dx + dy*dy)
-            if distance < area["radius"]:
-                valid_position = False
-                break
-        
-        # Verifica se está longe de outras caixas já colocadas
-        for box in boxes:
-            dx = x - box["x"]
-            dy = y - box["y"]
-            distance = math.sqrt(dx*dx + dy*dy)
-            if distance < BOX_MIN_DISTANCE:
-                valid_position = False
-                break
-        
-        if valid_position:
-            boxes.append({
-                "id": f"box_{len(boxes)}",
-                "x": x,
-                "y": y,
-                "size": BOX_SIZE
-            })
-            print(f"📦 Caixa de colisão gerada em ({x}, {y})")
-    
-    print(f"✅ Geradas {len(boxes)} caixas de colisão")
-    # Log das posições das caixas geradas
-    for i, box in enumerate(boxes):
-        print(f"   Caixa {i}: {box['id']} em ({box['x']}, {box['y']})")
-    return boxes
-
-
-def load_game_state():
-    """Carrega o estado do jogo do DynamoDB"""
+def load_game_state(room_id=DEFAULT_ROOM_ID):
+    """Carrega o estado do jogo da sala do DynamoDB"""
+    state_key = game_state_key(room_id)
     try:
-        print("🔄 Carregando estado do jogo do DynamoDB...")
-        print("🔍 ID da tabela: current_game")
+        print(f"🔄 Carregando estado da sala {room_id} do DynamoDB...")
+        print(f"🔍 ID da tabela: {state_key}")
         print("🔍 Nome da tabela: game_state")
         
-        response = game_state_table.get_item(Key={"id": "current_game"})
+        response = game_state_table.get_item(Key={"id": state_key})
         
         print(f"🔍 Resposta completa do DynamoDB: {json.dumps(response, default=str)}")
         print(f"🔍 'Item' presente na resposta: {'Item' in response}")
@@ -228,14 +229,22 @@ def load_game_state():
             
             print(f"🔍 Scores convertidos: {converted_scores}")
             
-            # Carrega caixas de colisão do DynamoDB
-            collision_boxes = item.get("collision_boxes", [])
-            if not collision_boxes:
-                print("📦 Nenhuma caixa de colisão encontrada no DynamoDB, gerando novas...")
-                collision_boxes = generate_collision_boxes()
-                # Salva as caixas geradas no DynamoDB para uso futuro
+            # Carrega o mapa pelo id (as caixas são regeneradas pela seed, não ficam no DynamoDB)
+            current_map = None
+            map_id = item.get("map_id")
+            if map_id:
+                try:
+                    current_map = {"map_id": map_id, "collision_boxes": load_map(map_id)}
+                    print(f"🗺️ Mapa {map_id} carregado com {len(current_map['collision_boxes'])} caixas de colisão")
+                except ValueError as e:
+                    print(f"⚠️ Não foi possível carregar o mapa {map_id}: {e}")
+
+            if not current_map:
+                print("🗺️ Nenhum mapa válido encontrado no DynamoDB, gerando novo...")
+                current_map = create_map()
+                # Salva o id do mapa gerado no DynamoDB para uso futuro
                 item_to_save = {
-                    "id": "current_game",
+                    "id": state_key,
                     "flags": item.get("flags", {
                         "red": {"x": TEAMS["red"]["flag_x"], "y": TEAMS["red"]["flag_y"], "captured": False, "carrier": None},
                         "blue": {"x": TEAMS["blue"]["flag_x"], "y": TEAMS["blue"]["flag_y"], "captured": False, "carrier": None}
@@ -243,21 +252,15 @@ def load_game_state():
                     "bullets": item.get("bullets", []),
                     "scores": converted_scores,
                     "game_started": item.get("game_started", False),
-                    "collision_boxes": collision_boxes,
+                    "map_id": current_map["map_id"],
                     "last_updated": int(time.time()),
                     "expires_at": int(time.time()) + 86400
                 }
                 game_state_table.put_item(Item=item_to_save)
-                print("💾 Caixas de colisão salvas no DynamoDB")
-            else:
-                print(f"📦 Carregadas {len(collision_boxes)} caixas de colisão do DynamoDB")
-                # Log das posições das caixas carregadas
-                for i, box in enumerate(collision_boxes):
-                    print(f"   Caixa {i}: {box.get('id', 'sem_id')} em ({box.get('x', 0)}, {box.get('y', 0)})")
-                # NÃO regenera caixas - usa as que estão no DynamoDB
-                print("✅ Usando caixas existentes do DynamoDB")
+                print("💾 Id do mapa salvo no DynamoDB")
             
             result = {
+                "room_id": room_id,
                 "flags": item.get("flags", {
                     "red": {"x": TEAMS["red"]["flag_x"], "y": TEAMS["red"]["flag_y"], "captured": False, "carrier": None},
                     "blue": {"x": TEAMS["blue"]["flag_x"], "y": TEAMS["blue"]["flag_y"], "captured": False, "carrier": None}
@@ -265,22 +268,23 @@ def load_game_state():
                 "bullets": item.get("bullets", []),
                 "scores": converted_scores,
                 "game_started": item.get("game_started", False),
-                "collision_boxes": collision_boxes
+                "map_id": current_map["map_id"],
+                "collision_boxes": current_map["collision_boxes"]
             }
             
-            print(f"🔍 Estado retornado: {json.dumps(result, default=str)}")
+            print(f"🔍 Estado retornado: {json.dumps({k: v for k, v in result.items() if k != 'collision_boxes'}, default=str)}")
             return result
         else:
             print("📝 NENHUM ESTADO PERSISTIDO ENCONTRADO - GERANDO NOVO ESTADO")
             default_scores = {"red": 0, "blue": 0}
             print(f"🔍 Scores padrão definidos: {default_scores}")
             
-            # Gera caixas de colisão para novo jogo
-            collision_boxes = generate_collision_boxes()
+            # Gera mapa para novo jogo
+            current_map = create_map()
             
             # Salva o novo estado no DynamoDB imediatamente
             new_state = {
-                "id": "current_game",
+                "id": state_key,
                 "flags": {
                     "red": {"x": TEAMS["red"]["flag_x"], "y": TEAMS["red"]["flag_y"], "captured": False, "carrier": None},
                     "blue": {"x": TEAMS["blue"]["flag_x"], "y": TEAMS["blue"]["flag_y"], "captured": False, "carrier": None}
@@ -288,33 +292,35 @@ def load_game_state():
                 "bullets": [],
                 "scores": default_scores,
                 "game_started": False,
-                "collision_boxes": collision_boxes,
+                "map_id": current_map["map_id"],
                 "last_updated": int(time.time()),
                 "expires_at": int(time.time()) + 86400
             }
             
             game_state_table.put_item(Item=new_state)
-            print("💾 Novo estado salvo no DynamoDB com caixas de colisão")
+            print("💾 Novo estado salvo no DynamoDB com id do mapa")
             
             result = {
+                "room_id": room_id,
                 "flags": new_state["flags"],
                 "bullets": new_state["bullets"],
                 "scores": new_state["scores"],
                 "game_started": new_state["game_started"],
-                "collision_boxes": new_state["collision_boxes"]
+                "map_id": current_map["map_id"],
+                "collision_boxes": current_map["collision_boxes"]
             }
             
-            print(f"🔍 Estado padrão retornado: {json.dumps(result, default=str)}")
+            print(f"🔍 Estado padrão retornado: {json.dumps({k: v for k, v in result.items() if k != 'collision_boxes'}, default=str)}")
             return result
     except Exception as e:
         print(f"❌ Erro ao carregar estado do jogo: {str(e)}")
         # Retorna estado padrão em caso de erro
-        collision_boxes = generate_collision_boxes()
+        current_map = create_map()
         
         # Tenta salvar o estado de erro no DynamoDB
         try:
             error_state = {
-                "id": "current_game",
+                "id": state_key,
                 "flags": {
                     "red": {"x": TEAMS["red"]["flag_x"], "y": TEAMS["red"]["flag_y"], "captured": False, "carrier": None},
                     "blue": {"x": TEAMS["blue"]["flag_x"], "y": TEAMS["blue"]["flag_y"], "captured": False, "carrier": None}
@@ -322,7 +328,7 @@ def load_game_state():
                 "bullets": [],
                 "scores": {"red": 0, "blue": 0},
                 "game_started": False,
-                "collision_boxes": collision_boxes,
+                "map_id": current_map["map_id"],
                 "last_updated": int(time.time()),
                 "expires_at": int(time.time()) + 86400
             }
@@ -332,6 +338,7 @@ def load_game_state():
             print(f"⚠️ Erro ao salvar estado de erro: {save_error}")
         
         return {
+            "room_id": room_id,
             "flags": {
                 "red": {"x": TEAMS["red"]["flag_x"], "y": TEAMS["red"]["flag_y"], "captured": False, "carrier": None},
                 "blue": {"x": TEAMS["blue"]["flag_x"], "y": TEAMS["blue"]["flag_y"], "captured": False, "carrier": None}
@@ -339,7 +346,8 @@ def load_game_state():
             "bullets": [],
             "scores": {"red": 0, "blue": 0},
             "game_started": False,
-            "collision_boxes": collision_boxes
+            "map_id": current_map["map_id"],
+            "collision_boxes": current_map["collision_boxes"]
         }
 
 def save_game_state():
@@ -348,15 +356,16 @@ def save_game_state():
         print(f"💾 SALVANDO ESTADO DO JOGO")
         print(f"🔍 Scores antes de salvar: {game_state['scores']}")
         print(f"🔍 Tipo dos scores: {type(game_state['scores'])}")
-        print(f"🔍 Conteúdo completo do game_state: {json.dumps(game_state, default=str)}")
+        print(f"🔍 Conteúdo completo do game_state: {json.dumps({k: v for k, v in game_state.items() if k != 'collision_boxes'}, default=str)}")
         
+        state_key = game_state_key(game_state["room_id"])
         item_to_save = {
-            "id": "current_game",
+            "id": state_key,
             "flags": game_state["flags"],
             "bullets": game_state["bullets"],
             "scores": game_state["scores"],
             "game_started": game_state["game_started"],
-            "collision_boxes": game_state.get("collision_boxes", []),
+            "map_id": game_state.get("map_id"),
             "last_updated": int(time.time()),
             "expires_at": int(time.time()) + 86400  # Expira em 24 horas
         }
@@ -368,7 +377,7 @@ def save_game_state():
         
         # Verifica se foi salvo corretamente
         print("🔍 Verificando se foi salvo corretamente...")
-        verify_response = game_state_table.get_item(Key={"id": "current_game"})
+        verify_response = game_state_table.get_item(Key={"id": state_key})
         if "Item" in verify_response:
             saved_scores = verify_response["Item"].get("scores", {})
             print(f"🔍 Scores salvos no DynamoDB: {saved_scores}")
@@ -388,14 +397,16 @@ def save_game_state():
         import traceback
         traceback.print_exc()
 
-def reset_game_state():
-    """Reseta o estado do jogo para valores padrão"""
+def reset_game_state(room_id=DEFAULT_ROOM_ID):
+    """Reseta o estado do jogo da sala para valores padrão"""
     try:
-        print("🔄 RESETANDO ESTADO DO JOGO")
+        print(f"🔄 RESETANDO ESTADO DO JOGO DA SALA {room_id}")
         
         # Reseta o estado global
         global game_state
+        new_map = create_map()
         game_state = {
+            "room_id": room_id,
             "flags": {
                 "red": {"x": TEAMS["red"]["flag_x"], "y": TEAMS["red"]["flag_y"], "captured": False, "carrier": None},
                 "blue": {"x": TEAMS["blue"]["flag_x"], "y": TEAMS["blue"]["flag_y"], "captured": False, "carrier": None}
@@ -403,7 +414,8 @@ def reset_game_state():
             "bullets": [],
             "scores": {"red": 0, "blue": 0},
             "game_started": False,
-            "collision_boxes": generate_collision_boxes()
+            "map_id": new_map["map_id"],
+            "collision_boxes": new_map["collision_boxes"]
         }
         
         print(f"🔍 Estado resetado: scores={game_state['scores']}")
@@ -418,8 +430,9 @@ def reset_game_state():
         print(f"❌ Erro ao resetar estado do jogo: {str(e)}")
         return False
 
-# Estado global do jogo (será recarregado a cada invocação)
+# Estado global do jogo (será recarregado a cada invocação, da sala da conexão)
 game_state = {
+    "room_id": DEFAULT_ROOM_ID,
     "flags": {
         "red": {"x": TEAMS["red"]["flag_x"], "y": TEAMS["red"]["flag_y"], "captured": False, "carrier": None},
         "blue": {"x": TEAMS["blue"]["flag_x"], "y": TEAMS["blue"]["flag_y"], "captured": False, "carrier": None}
@@ -427,24 +440,42 @@ game_state = {
     "bullets": [],
     "scores": {"red": 0, "blue": 0},
     "game_started": False,
-    "collision_boxes": []  # Será carregado do DynamoDB
+    "map_id": None,  # Será carregado do DynamoDB
+    "collision_boxes": []  # Regeneradas a partir do map_id
 }
 
 
 def lambda_handler(event, context):
     """
     Função principal para processar eventos WebSocket
+    (cada invocação termina com um registro de métricas)
+    """
+    metrics = telemetry.begin(event.get("requestContext", {}).get("routeKey"))
+    response = None
+    try:
+        response = process_event(event, metrics)
+        return response
+    finally:
+        emit_metrics(telemetry.end(), response)
+
+
+def emit_metrics(metrics, response):
+    """Registro compacto da invocação no log (uma linha JSON), com aviso se passou do orçamento"""
+    record = metrics.record((response or {}).get("statusCode"), DYNAMO_CALL_BUDGET, SEND_BUDGET)
+    print(f"📈 METRICS {json.dumps(record, separators=(',', ':'))}")
+    if record.get("over_budget"):
+        print(f"⚠️ Invocação acima do orçamento ({', '.join(record['over_budget'])}): "
+              f"{record['action'] or record['route']} com {record['dynamo']['calls']} chamadas ao DynamoDB "
+              f"e {record['sends']['count']} envios")
+    if telemetry_sink is not None:
+        telemetry_sink(record)
+
+
+def process_event(event, metrics):
+    """
+    Processa um evento WebSocket do API Gateway
     """
     try:
-        # Carrega o estado do jogo do DynamoDB a cada invocação
-        global game_state
-        print("🚀 CARREGANDO ESTADO DO JOGO DO DYNAMODB")
-        game_state = load_game_state()
-        print(f"🎮 Estado do jogo carregado: scores={game_state['scores']}")
-        print(f"📦 Caixas carregadas: {len(game_state.get('collision_boxes', []))}")
-        for i, box in enumerate(game_state.get('collision_boxes', [])):
-            print(f"   Caixa {i}: {box.get('id', 'sem_id')} em ({box.get('x', 0)}, {box.get('y', 0)})")
-        
         print(f"🚀 Servidor versão: {SERVER_VERSION}")
         print(f"📨 Evento recebido: {json.dumps(event, default=str)}")
 
@@ -455,51 +486,184 @@ def lambda_handler(event, context):
         route_key = event["requestContext"]["routeKey"]
 
         print(f"🔌 Processando {route_key} para conexão {connection_id}")
+        if match_recorder is not None:
+            match_recorder.begin()
+            matches_to_close.clear()
+
+        # Carrega o estado da sala da conexão do DynamoDB a cada invocação
+        # ($connect não usa o estado; no join a sala só é conhecida depois do lobby e o handler carrega o estado)
+        global game_state, connection_item
+        connection_item = None
+        with metrics.phase("resolve"):
+            room_id = resolve_room_id(event, connection_id, route_key)
+        if room_id is not None:
+            print(f"🚀 CARREGANDO ESTADO DA SALA {room_id} DO DYNAMODB")
+            with metrics.phase("load"):
+                game_state = load_game_state(room_id)
+            print(f"🎮 Estado do jogo carregado: scores={game_state['scores']}")
+            print(f"🗺️ Mapa: {game_state.get('map_id')} ({len(game_state.get('collision_boxes', []))} caixas)")
 
         # Cria cliente para envio de mensagens
-        api_gateway_client = get_api_gateway_client(domain_name, stage)
+        api_gateway_client = InstrumentedApiGateway(get_api_gateway_client(domain_name, stage))
 
         # Processa diferentes tipos de eventos
         if route_key == "$connect":
-            return handle_connect(connection_id)
+            with metrics.phase("handle"):
+                return handle_connect(connection_id, requested_room_id(event))
         elif route_key == "$disconnect":
-            return handle_disconnect(connection_id, api_gateway_client)
+            metrics.room_id = game_state["room_id"]
+            with metrics.phase("handle"):
+                response = handle_disconnect(connection_id, api_gateway_client)
         elif route_key == "$default":
             # Mensagem customizada
             body = json.loads(event.get("body", "{}"))
-            return handle_message(connection_id, body, api_gateway_client)
+            metrics.action = body.get("action") if isinstance(body, dict) else None
+            with metrics.phase("handle"), profile_action(metrics.action):
+                response = handle_message(connection_id, body, api_gateway_client)
+            metrics.room_id = game_state["room_id"]  # No join, a sala escolhida pelo lobby
         else:
             print(f"❌ Rota não reconhecida: {route_key}")
             return {"statusCode": 400, "body": "Rota não reconhecida"}
 
+        # Replay: só ações aceitas, na sala carregada (no join, a escolhida pelo lobby)
+        if match_recorder is not None and response.get("statusCode") == 200:
+            match_recorder.record_action(game_state["room_id"], connection_id, route_key, event.get("body"))
+        return response
+
     except Exception as e:
         print(f"❌ Erro no lambda_handler: {str(e)}")
         import traceback
         traceback.print_exc()
         return {"statusCode": 500, "body": f"Erro interno: {str(e)}"}
+    finally:
+        # Fim do tick: os broadcasts da invocação vão num lote só para cada nó
+        if broadcast_bus is not None:
+            with metrics.phase("flush"):
+                broadcast_bus.flush()
+        if position_buffer is not None:
+            with metrics.phase("flush"):
+                flush_due_positions()
+        if match_recorder is not None:
+            for retired_room in matches_to_close:
+                match_recorder.close_match(retired_room)
+            matches_to_close.clear()
+
+
+def profile_action(action):
+    """Perfila o despacho da ação se o profiling estiver ligado para ela (e a invocação for sorteada)"""
+    if action_profiler is None:
+        return nullcontext()
+    return action_profiler.profile(action)
+
+
+def buffered_position(connection_id: str, item: Dict[str, Any]) -> Dict[str, Any]:
+    """Item da conexão com a posição ainda não gravada pelo buffer de posições, se houver"""
+    if position_buffer is None:
+        return item
+    return position_buffer.overlay(connection_id, item)
+
+
+def flush_positions():
+    """Grava as posições pendentes antes de um evento importante (morte, captura, ponto, desconexão)"""
+    if position_buffer is not None:
+        position_buffer.flush(connections_table)
+
+
+def flush_due_positions():
+    """Grava as posições pendentes se o intervalo passou (fim de cada invocação e timer do servidor local)"""
+    if position_buffer is not None:
+        position_buffer.flush_due(connections_table)
+
+
+def claim_action_seq(connection_id: str, action_seq: int) -> bool:
+    """Grava só o last_action_seq da conexão, se for o mais novo; False se outra invocação aplicou um mais novo"""
+    try:
+        connections_table.update_item(
+            Key={"connection_id": connection_id},
+            UpdateExpression="SET last_action_seq = :seq",
+            ConditionExpression="attribute_exists(connection_id) AND " + STALE_SEQ_CONDITION,
+            ExpressionAttributeValues={":seq": action_seq}
+        )
+        return True
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise
+        return False
+
+
+def discard_position(connection_id: str):
+    """Descarta a posição pendente da conexão (o servidor vai gravar outra, ou a conexão saiu)"""
+    if position_buffer is not None:
+        position_buffer.discard(connection_id)
+
+
+def requested_room_id(event) -> str | None:
+    """Sala pedida na URL do $connect (?room=), se houver"""
+    params = event.get("queryStringParameters") or {}
+    return normalize_room_id(params["room"]) if params.get("room") else None
+
+
+def resolve_room_id(event, connection_id: str, route_key: str) -> str | None:
+    """
+    Sala do evento: a registrada na conexão (None no $connect e no join, em que o lobby escolhe a sala)
+    """
+    if route_key == "$connect":
+        return None
+
+    if route_key == "$default":
+        try:
+            message = json.loads(event.get("body", "{}"))
+        except ValueError:
+            message = {}
+        if isinstance(message, dict) and message.get("action") == "join":
+            return None
+
+    global connection_item
+    try:
+        response = connections_table.get_item(Key={"connection_id": connection_id})
+        item = response.get("Item", {})
+        connection_item = (connection_id, item)
+        return item.get("room_id") or DEFAULT_ROOM_ID
+    except Exception as e:
+        print(f"⚠️ Erro ao obter sala da conexão {connection_id}: {e}")
+        return DEFAULT_ROOM_ID
+
+
+def get_connection_item(connection_id: str) -> Dict[str, Any]:
+    """
+    Item da conexão que chamou o handler: o lido pelo resolve_room_id nesta invocação (sem novo get_item),
+    ou lido agora. Vale uma vez: depois disso o handler pode ter gravado a conexão.
+    """
+    global connection_item
+    cached, connection_item = connection_item, None
+    if cached is not None and cached[0] == connection_id:
+        return cached[1]
+    response = connections_table.get_item(Key={"connection_id": connection_id})
+    return response.get("Item", {})
 
 
-def handle_connect(connection_id: str):
+def handle_connect(connection_id: str, room_id: str | None = None):
     """
     Processa nova conexão WebSocket
     """
     try:
-        print(f"🆕 Nova conexão: {connection_id}")
+        print(f"🆕 Nova conexão: {connection_id} (sala {room_id or 'escolhida pelo lobby'})")
 
         # Registra conexão no DynamoDB
-        connections_table.put_item(
-            Item={
-                "connection_id": connection_id,
-                "connected_at": int(time.time()),
-                "player_id": None,
-                "team": None,
-                "hp": PLAYER_MAX_HP,
-                "x": 0,
-                "y": 0,
-                "last_activity": int(time.time()),
-                "expires_at": int(time.time()) + 3600,
-            }
-        )
+        item = {
+            "connection_id": connection_id,
+            "connected_at": int(time.time()),
+            "player_id": None,
+            "team": None,
+            "hp": PLAYER_MAX_HP,
+            "x": 0,
+            "y": 0,
+            "last_activity": int(time.time()),
+            "expires_at": int(time.time()) + 3600,
+        }
+        if room_id:
+            item["room_id"] = room_id  # Sala pedida na URL; sem ela o lobby escolhe no join
+        connections_table.put_item(Item=item)
 
         print(f"✅ Conexão {connection_id} registrada no DynamoDB")
         return {"statusCode": 200, "body": "Conectado"}
@@ -514,13 +678,13 @@ def handle_disconnect(connection_id: str, api_gateway_client):
     Processa desconexão WebSocket
     """
     try:
+        room_id = game_state["room_id"]  # Sala carregada pelo lambda_handler
         print(f"👋 Desconexão: {connection_id}")
 
         # Obtém dados da conexão antes de remover
         player_data = None
         try:
-            response = connections_table.get_item(Key={"connection_id": connection_id})
-            connection_data = response.get("Item", {})
+            connection_data = get_connection_item(connection_id)
             player_data = {
                 "player_id": connection_data.get("player_id"),
                 "team": connection_data.get("team")
@@ -529,7 +693,15 @@ def handle_disconnect(connection_id: str, api_gateway_client):
         except Exception as e:
             print(f"⚠️ Erro ao obter dados da conexão: {e}")
 
-        # Remove conexão do DynamoDB
+        # Libera a vaga no lobby
+        if player_data and player_data["player_id"]:
+            release_room_slot(room_id, player_data["team"])
+
+        # Remove conexão do DynamoDB (a posição pendente dela não vale mais; as dos outros são gravadas)
+        if broadcast_bus is not None:
+            broadcast_bus.leave(connection_id)
+        discard_position(connection_id)
+        flush_positions()
         try:
             connections_table.delete_item(Key={"connection_id": connection_id})
             print(f"🗑️ Conexão {connection_id} removida do DynamoDB")
@@ -539,7 +711,7 @@ def handle_disconnect(connection_id: str, api_gateway_client):
         # Notifica outros jogadores se havia um player_id
         if player_data and player_data["player_id"]:
             print(f"📢 Notificando saída do jogador {player_data['player_id']}")
-            broadcast_message(api_gateway_client, {
+            broadcast_message(api_gateway_client, room_id, {
                 "type": "player_left", 
                 "player_id": player_data["player_id"],
                 "team": player_data["team"],
@@ -553,6 +725,24 @@ def handle_disconnect(connection_id: str, api_gateway_client):
         return {"statusCode": 500, "body": f"Erro na desconexão: {str(e)}"}
 
 
+def release_room_slot(room_id: str, team: str | None):
+    """
+    Libera a vaga do jogador no lobby; a sala vazia é aposentada com seu estado e suas balas
+    (a sala padrão nunca é aposentada)
+    """
+    try:
+        retired = room_registry.leave(room_id, team, retire_when_empty=room_id != DEFAULT_ROOM_ID)
+        if retired:
+            if match_recorder is not None:
+                matches_to_close.append(room_id)
+            game_state_table.delete_item(Key={"id": game_state_key(room_id)})
+            for bullet in query_room(bullets_table, room_id):
+                delete_bullet_dynamo(bullet["id"])
+            print(f"🏚️ Sala {room_id} vazia aposentada")
+    except Exception as e:
+        print(f"⚠️ Erro ao liberar vaga na sala {room_id}: {e}")
+
+
 def handle_message(connection_id: str, message: Dict[str, Any], api_gateway_client):
     """
     Processa mensagens recebidas via WebSocket
@@ -601,32 +791,38 @@ def handle_join_game(connection_id: str, message: Dict[str, Any], api_gateway_cl
     """
     Processa entrada de jogador no jogo
     """
+    global game_state
     try:
         player_id = message.get("player_id")
         team = message.get("team")  # "red" ou "blue"
 
         if not player_id:
-            player_id = str(uuid.uuid4())[:8]
+            player_id = new_id()
 
-        # Se não especificou time, escolhe automaticamente
-        if not team:
-            print(f"🎯 Atribuindo time automaticamente para {player_id}")
-            active_players = get_active_players()
-            red_count = sum(1 for p in active_players.values() if p.get("team") == "red")
-            blue_count = sum(1 for p in active_players.values() if p.get("team") == "blue")
-            
-            print(f"   Jogadores ativos: {len(active_players)}")
-            print(f"   Time vermelho: {red_count} jogadores")
-            print(f"   Time azul: {blue_count} jogadores")
-            
-            if red_count <= blue_count:
-                team = "red"
-                print(f"   ➡️ Atribuindo time VERMELHO (menos jogadores)")
-            else:
-                team = "blue"
-                print(f"   ➡️ Atribuindo time AZUL (menos jogadores)")
-        else:
-            print(f"🎯 Jogador {player_id} especificou time: {team}")
+        # Novo join da mesma conexão: libera a vaga anterior antes de escolher a sala
+        response = connections_table.get_item(Key={"connection_id": connection_id})
+        connection_data = response.get("Item", {})
+        if connection_data.get("player_id") and connection_data.get("room_id"):
+            release_room_slot(connection_data["room_id"], connection_data.get("team"))
+
+        # Lobby: sala pedida (no join ou na URL) ou a aberta menos cheia; time pelos contadores da sala
+        requested_room = message.get("room_id") or connection_data.get("room_id")
+        try:
+            placement = room_registry.place(
+                normalize_room_id(requested_room) if requested_room else None,
+                team if team in TEAMS else None
+            )
+        except RoomFullError:
+            send_message_to_connection(api_gateway_client, connection_id, {"type": "error", "message": "Sala cheia"})
+            return {"statusCode": 409, "body": "Sala cheia"}
+
+        room_id, team = placement.room_id, placement.team
+        print(f"🏠 Lobby: {player_id} -> sala {room_id} ({team}) em {placement.elapsed_ms:.1f} ms, "
+              f"{placement.attempts} tentativa(s){' - sala nova' if placement.created else ''}")
+        game_state = load_game_state(room_id)
+        if match_recorder is not None:
+            initial_state = {key: game_state.get(key) for key in ("flags", "bullets", "scores", "game_started", "map_id")}
+            match_recorder.open_match(room_id, initial_state, SERVER_VERSION)
 
         # Posição inicial baseada no time
         spawn_x = TEAMS[team]["spawn_x"]
@@ -635,11 +831,13 @@ def handle_join_game(connection_id: str, message: Dict[str, Any], api_gateway_cl
         print(f"🎮 Jogador {player_id} entrando no jogo no time {team} na posição ({spawn_x}, {spawn_y}) - Servidor v{SERVER_VERSION}")
 
         # Atualiza conexão com dados do jogador (converte float para Decimal)
+        discard_position(connection_id)
         connections_table.update_item(
             Key={"connection_id": connection_id},
-            UpdateExpression="SET player_id = :pid, team = :team, hp = :hp, x = :x, y = :y, last_activity = :time",
+            UpdateExpression="SET player_id = :pid, room_id = :room, team = :team, hp = :hp, x = :x, y = :y, last_activity = :time",
             ExpressionAttributeValues={
                 ":pid": player_id,
+                ":room": room_id,
                 ":team": team,
                 ":hp": PLAYER_MAX_HP,
                 ":x": Decimal(str(spawn_x)),
@@ -647,10 +845,14 @@ def handle_join_game(connection_id: str, message: Dict[str, Any], api_gateway_cl
                 ":time": int(time.time())
             }
         )
+        if broadcast_bus is not None:
+            broadcast_bus.join(room_id, connection_id)
 
         # Notifica o jogador sobre sua entrada
         player_data = {
             "player_id": player_id,
+            "room_id": room_id,
+            "placement_ms": round(placement.elapsed_ms, 2),
             "team": team,
             "color": TEAMS[team]["color"],
             "x": spawn_x,
@@ -666,7 +868,7 @@ def handle_join_game(connection_id: str, message: Dict[str, Any], api_gateway_cl
 
         # Notifica outros jogadores
         print(f"📢 Notificando entrada do jogador {player_id} para outros jogadores")
-        broadcast_message(api_gateway_client, {
+        broadcast_message(api_gateway_client, room_id, {
             "type": "player_joined",
             "player_id": player_id,
             "team": team,
@@ -678,7 +880,7 @@ def handle_join_game(connection_id: str, message: Dict[str, Any], api_gateway_cl
 
         # Envia estado atual do jogo para o novo jogador
         print(f"🎯 Chamando send_game_state para {connection_id}")
-        send_game_state(api_gateway_client, connection_id)
+        send_game_state(api_gateway_client, connection_id, room_id)
         print(f"🎯 send_game_state concluído para {connection_id}")
 
         return {"statusCode": 200, "body": "Jogador entrou no jogo"}
@@ -693,46 +895,106 @@ def handle_update_position(connection_id: str, message: Dict[str, Any], api_gate
     Processa atualização de posição do jogador
     """
     try:
+        room_id = game_state["room_id"]  # Sala carregada pelo lambda_handler
         player_id = message.get("player_id")
         x = message.get("x", 0)
         y = message.get("y", 0)
+        seq = message.get("seq")  # Número da última entrada aplicada pelo cliente
+        if not isinstance(seq, int) or isinstance(seq, bool):
+            seq = None
+        action_seq = message.get("action_seq")  # Ordem de envio das ações do cliente (descarta updates atrasados)
+        if not isinstance(action_seq, int) or isinstance(action_seq, bool):
+            action_seq = None
 
         if not player_id:
             send_message_to_connection(api_gateway_client, connection_id, {"type": "error", "message": "player_id é obrigatório"})
             return {"statusCode": 400, "body": "player_id é obrigatório"}
 
-        # Atualiza posição no DynamoDB (converte float para Decimal)
-        connections_table.update_item(
-            Key={"connection_id": connection_id},
-            UpdateExpression="SET x = :x, y = :y, last_activity = :time",
-            ExpressionAttributeValues={
+        # Obtém dados do jogador (time e última posição aceita)
+        player_data = buffered_position(connection_id, get_connection_item(connection_id))
+        team = player_data.get("team")
+
+        # Update fora de ordem (invocações concorrentes): uma posição mais nova já foi aplicada
+        last_action_seq = player_data.get("last_action_seq")
+        if action_seq is not None and last_action_seq is not None and action_seq <= last_action_seq:
+            print(f"⏭️ Update atrasado de {player_id} descartado (action_seq {action_seq} <= {last_action_seq})")
+            return {"statusCode": 409, "body": "Update fora de ordem"}
+
+        # Autoridade do servidor: rejeita posições fora do mapa ou dentro de caixas
+        # A correção leva o seq da última posição aceita: o cliente reaplica as entradas posteriores a ela
+        occupancy_grid = get_occupancy_grid(game_state.get("collision_boxes", []))
+        if not player_position_valid(float(x), float(y), occupancy_grid):
+            last_x = float(player_data.get("x", 0))
+            last_y = float(player_data.get("y", 0))
+            last_input_seq = player_data.get("last_input_seq")
+            print(f"⚠️ Posição inválida de {player_id} ({x}, {y}) - corrigindo para ({last_x}, {last_y})")
+            send_message_to_connection(api_gateway_client, connection_id, {
+                "type": "position_correction",
+                "player_id": player_id,
+                "seq": int(last_input_seq) if last_input_seq is not None else None,
+                "x": last_x,
+                "y": last_y,
+                "timestamp": int(time.time())
+            })
+            return {"statusCode": 200, "body": "Posição corrigida"}
+
+        # Atualiza posição: no buffer (gravada depois, só a última) ou direto no DynamoDB (converte float para Decimal)
+        # Com action_seq, a escrita direta é condicional: outra invocação pode ter aplicado um update mais novo
+        if position_buffer is not None:
+            # No Lambda outros containers não veem este buffer: o action_seq é reservado na tabela antes
+            # do broadcast, senão dois containers passam pela verificação acima com updates fora de ordem
+            if RUNNING_ON_LAMBDA and action_seq is not None and not claim_action_seq(connection_id, action_seq):
+                print(f"⏭️ Update atrasado de {player_id} descartado na reserva (action_seq {action_seq})")
+                return {"statusCode": 409, "body": "Update fora de ordem"}
+            position_buffer.put(connection_id, x, y, int(time.time()), action_seq, seq)
+        else:
+            update = "SET x = :x, y = :y, last_activity = :time"
+            values = {
                 ":x": Decimal(str(x)),
                 ":y": Decimal(str(y)),
                 ":time": int(time.time())
             }
-        )
-
-        # Obtém dados do jogador para broadcast
-        response = connections_table.get_item(Key={"connection_id": connection_id})
-        player_data = response.get("Item", {})
-        team = player_data.get("team")
+            if seq is not None:
+                update += ", last_input_seq = :input_seq"
+                values[":input_seq"] = seq
+            if action_seq is None:
+                connections_table.update_item(
+                    Key={"connection_id": connection_id},
+                    UpdateExpression=update,
+                    ExpressionAttributeValues=values
+                )
+            else:
+                values[":seq"] = action_seq
+                try:
+                    connections_table.update_item(
+                        Key={"connection_id": connection_id},
+                        UpdateExpression=update + ", last_action_seq = :seq",
+                        ConditionExpression=STALE_SEQ_CONDITION,
+                        ExpressionAttributeValues=values
+                    )
+                except ClientError as e:
+                    if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                        raise
+                    print(f"⏭️ Update atrasado de {player_id} descartado na escrita (action_seq {action_seq})")
+                    return {"statusCode": 409, "body": "Update fora de ordem"}
 
         # Broadcast para outros jogadores (SEM incluir HP para evitar conflitos)
-        broadcast_message(api_gateway_client, {
+        broadcast_message(api_gateway_client, room_id, {
             "type": "player_update",
             "player_id": player_id,
             "team": team,
             "color": TEAMS[team]["color"],
             "x": x,
             "y": y,
+            "seq": seq,
             "timestamp": int(time.time())
         }, exclude_connection=connection_id)
 
         # Verifica se alguma bandeira foi levada para a base
-        check_flag_scoring(api_gateway_client)
+        check_flag_scoring(api_gateway_client, room_id)
 
         # Verifica colisões de balas periodicamente
-        check_bullet_collisions_periodic(api_gateway_client)
+        check_bullet_collisions_periodic(api_gateway_client, room_id)
 
         return {"statusCode": 200, "body": "Posição atualizada"}
 
@@ -746,6 +1008,7 @@ def handle_shoot(connection_id: str, message: Dict[str, Any], api_gateway_client
     Processa tiro do jogador
     """
     try:
+        room_id = game_state["room_id"]  # Sala carregada pelo lambda_handler
         print(f"🔫 Processando tiro para connection {connection_id}")
         player_id = message.get("player_id")
         target_x = message.get("target_x")
@@ -761,8 +1024,7 @@ def handle_shoot(connection_id: str, message: Dict[str, Any], api_gateway_client
             return {"statusCode": 400, "body": "Dados de tiro incompletos"}
 
         # Obtém dados do jogador
-        response = connections_table.get_item(Key={"connection_id": connection_id})
-        player_data = response.get("Item", {})
+        player_data = get_connection_item(connection_id)
         team = player_data.get("team")
         hp = player_data.get("hp", PLAYER_MAX_HP)
 
@@ -771,21 +1033,13 @@ def handle_shoot(connection_id: str, message: Dict[str, Any], api_gateway_client
             return {"statusCode": 400, "body": "Jogador morto não pode atirar"}
 
         # Cria projétil
-        bullet_id = str(uuid.uuid4())[:8]
-        dx = target_x - player_x
-        dy = target_y - player_y
-        distance = math.sqrt(dx*dx + dy*dy)
-        
-        if distance > 0:
-            dx = dx / distance * BULLET_SPEED
-            dy = dy / distance * BULLET_SPEED
-        else:
-            dx = 0
-            dy = BULLET_SPEED
+        bullet_id = new_id()
+        dx, dy = bullet_velocity(player_x, player_y, target_x, target_y)
 
         current_time = time.time()  # Use float para created_at
         bullet = {
             "id": bullet_id,
+            "room_id": room_id,
             "shooter_id": player_id,
             "shooter_team": team,
             "x": player_x,
@@ -801,7 +1055,7 @@ def handle_shoot(connection_id: str, message: Dict[str, Any], api_gateway_client
         print(f"   ✅ Bala {bullet_id} salva no DynamoDB com TTL de 3 minutos")
 
         # Broadcast do tiro para todos os clientes
-        broadcast_message(api_gateway_client, {
+        broadcast_message(api_gateway_client, room_id, {
             "type": "bullet_shot",
             "bullet": bullet,
             "timestamp": int(time.time())
@@ -815,11 +1069,20 @@ def handle_shoot(connection_id: str, message: Dict[str, Any], api_gateway_client
         return {"statusCode": 500, "body": f"Erro ao processar tiro: {str(e)}"}
 
 
+# Mensagens de erro para cada motivo de flag_capture_error
+CAPTURE_ERROR_MESSAGES = {
+    "dead": "Jogador morto não pode capturar bandeira",
+    "own_team": "Não pode capturar bandeira do próprio time",
+    "captured": "Bandeira já foi capturada"
+}
+
+
 def handle_capture_flag(connection_id: str, message: Dict[str, Any], api_gateway_client):
     """
     Processa captura de bandeira
     """
     try:
+        room_id = game_state["room_id"]  # Sala carregada pelo lambda_handler
         player_id = message.get("player_id")
         flag_team = message.get("flag_team")  # "red" ou "blue"
 
@@ -828,35 +1091,28 @@ def handle_capture_flag(connection_id: str, message: Dict[str, Any], api_gateway
             return {"statusCode": 400, "body": "Dados de captura incompletos"}
 
         # Obtém dados do jogador
-        response = connections_table.get_item(Key={"connection_id": connection_id})
-        player_data = response.get("Item", {})
+        player_data = get_connection_item(connection_id)
         player_team = player_data.get("team")
         hp = player_data.get("hp", PLAYER_MAX_HP)
 
-        if hp <= 0:
-            send_message_to_connection(api_gateway_client, connection_id, {"type": "error", "message": "Jogador morto não pode capturar bandeira"})
-            return {"statusCode": 400, "body": "Jogador morto não pode capturar bandeira"}
-
-        # Verifica se pode capturar (time oposto)
-        if player_team == flag_team:
-            send_message_to_connection(api_gateway_client, connection_id, {"type": "error", "message": "Não pode capturar bandeira do próprio time"})
-            return {"statusCode": 400, "body": "Não pode capturar bandeira do próprio time"}
-
-        # Verifica se a bandeira está disponível
+        # Verifica as regras de captura (vivo, time oposto, bandeira disponível)
         flag = game_state["flags"][flag_team]
-        if flag["captured"]:
-            send_message_to_connection(api_gateway_client, connection_id, {"type": "error", "message": "Bandeira já foi capturada"})
-            return {"statusCode": 400, "body": "Bandeira já foi capturada"}
+        capture_error = flag_capture_error(player_team, hp, flag_team, flag)
+        if capture_error:
+            error_message = CAPTURE_ERROR_MESSAGES[capture_error]
+            send_message_to_connection(api_gateway_client, connection_id, {"type": "error", "message": error_message})
+            return {"statusCode": 400, "body": error_message}
 
         # Captura a bandeira
         flag["captured"] = True
         flag["carrier"] = player_id
+        flush_positions()
 
         # Salva o estado do jogo no DynamoDB
         save_game_state()
 
         # Broadcast da captura
-        broadcast_message(api_gateway_client, {
+        broadcast_message(api_gateway_client, room_id, {
             "type": "flag_captured",
             "flag_team": flag_team,
             "carrier_id": player_id,
@@ -876,6 +1132,7 @@ def handle_drop_flag(connection_id: str, message: Dict[str, Any], api_gateway_cl
     Processa soltura de bandeira
     """
     try:
+        room_id = game_state["room_id"]  # Sala carregada pelo lambda_handler
         player_id = message.get("player_id")
         x = message.get("x")
         y = message.get("y")
@@ -897,7 +1154,7 @@ def handle_drop_flag(connection_id: str, message: Dict[str, Any], api_gateway_cl
                 save_game_state()
 
                 # Broadcast da soltura
-                broadcast_message(api_gateway_client, {
+                broadcast_message(api_gateway_client, room_id, {
                     "type": "flag_dropped",
                     "flag_team": flag_team,
                     "x": x,
@@ -918,6 +1175,7 @@ def handle_respawn(connection_id: str, message: Dict[str, Any], api_gateway_clie
     Processa respawn do jogador
     """
     try:
+        room_id = game_state["room_id"]  # Sala carregada pelo lambda_handler
         player_id = message.get("player_id")
 
         if not player_id:
@@ -925,8 +1183,7 @@ def handle_respawn(connection_id: str, message: Dict[str, Any], api_gateway_clie
             return {"statusCode": 400, "body": "player_id é obrigatório"}
 
         # Obtém dados do jogador
-        response = connections_table.get_item(Key={"connection_id": connection_id})
-        player_data = response.get("Item", {})
+        player_data = get_connection_item(connection_id)
         team = player_data.get("team")
 
         if not team:
@@ -938,6 +1195,7 @@ def handle_respawn(connection_id: str, message: Dict[str, Any], api_gateway_clie
         spawn_y = TEAMS[team]["spawn_y"]
 
         # Atualiza jogador
+        discard_position(connection_id)
         connections_table.update_item(
             Key={"connection_id": connection_id},
             UpdateExpression="SET hp = :hp, x = :x, y = :y, last_activity = :time",
@@ -950,7 +1208,7 @@ def handle_respawn(connection_id: str, message: Dict[str, Any], api_gateway_clie
         )
 
         # Broadcast do respawn
-        broadcast_message(api_gateway_client, {
+        broadcast_message(api_gateway_client, room_id, {
             "type": "player_respawned",
             "player_id": player_id,
             "team": team,
@@ -961,7 +1219,7 @@ def handle_respawn(connection_id: str, message: Dict[str, Any], api_gateway_clie
         })
 
         # Broadcast específico de HP para sincronização (sem log redundante)
-        broadcast_message(api_gateway_client, {
+        broadcast_message(api_gateway_client, room_id, {
             "type": "player_hp_update",
             "player_id": player_id,
             "hp": PLAYER_MAX_HP,
@@ -991,14 +1249,16 @@ def handle_reset_game(connection_id: str, api_gateway_client):
     Reseta o estado do jogo
     """
     try:
+        room_id = game_state["room_id"]  # Sala carregada pelo lambda_handler
         print("🔄 RESETANDO JOGO SOLICITADO")
         
         # Reseta o estado
-        if reset_game_state():
+        if reset_game_state(room_id):
             # Notifica todos os jogadores
-            broadcast_message(api_gateway_client, {
+            broadcast_message(api_gateway_client, room_id, {
                 "type": "game_reset",
                 "scores": {"red": 0, "blue": 0},
+                "map_id": game_state.get("map_id"),
                 "timestamp": int(time.time())
             })
             
@@ -1018,6 +1278,7 @@ def handle_bullet_update(connection_id: str, message: Dict[str, Any], api_gatewa
     Processa atualização de posição de bala do cliente
     """
     try:
+        room_id = game_state["room_id"]  # Sala carregada pelo lambda_handler
         bullet_id = message.get("bullet_id")
         x = message.get("x")
         y = message.get("y")
@@ -1039,10 +1300,9 @@ def handle_bullet_update(connection_id: str, message: Dict[str, Any], api_gatewa
                 print(f"❌ Bala {bullet_id} não encontrada no DynamoDB")
                 print(f"   Response completo: {response}")
                 
-                # Lista todas as balas para debug
-                all_bullets_response = bullets_table.scan()
-                all_bullets = all_bullets_response.get("Items", [])
-                print(f"   Balas existentes no DynamoDB: {len(all_bullets)}")
+                # Lista as balas da sala para debug
+                all_bullets = query_room(bullets_table, room_id)
+                print(f"   Balas da sala {room_id} no DynamoDB: {len(all_bullets)}")
                 for b in all_bullets:
                     print(f"     - {b.get('id')}: ({b.get('x')}, {b.get('y')}) - shooter: {b.get('shooter_id')}")
                 
@@ -1080,12 +1340,11 @@ def handle_bullet_update(connection_id: str, message: Dict[str, Any], api_gatewa
         print(f"✅ Bala {bullet_id} atualizada com sucesso no DynamoDB")
 
         # Verifica se a bala saiu da tela
-        if (x is not None and y is not None and 
-            (float(x) < 0 or float(x) > GAME_WIDTH or float(y) < 0 or float(y) > GAME_HEIGHT)):
+        if x is not None and y is not None and bullet_out_of_bounds(float(x), float(y)):
             print(f"🗑️ Bala {bullet_id} saiu da tela - removendo")
             delete_bullet_dynamo(bullet_id)  # Remove do DynamoDB
             # Broadcast da remoção da bala
-            broadcast_message(api_gateway_client, {
+            broadcast_message(api_gateway_client, room_id, {
                 "type": "bullet_removed",
                 "bullet_id": bullet_id,
                 "timestamp": int(time.time())
@@ -1095,7 +1354,7 @@ def handle_bullet_update(connection_id: str, message: Dict[str, Any], api_gatewa
         # Verifica colisões de balas imediatamente após atualização
         print(f"🔍 Verificando colisões para bala {bullet_id}")
         if bullet_id and x is not None and y is not None:
-            check_bullet_collisions_immediate(api_gateway_client, str(bullet_id), float(x), float(y))
+            check_bullet_collisions_immediate(api_gateway_client, room_id, str(bullet_id), float(x), float(y))
 
         # Verifica novamente se a bala ainda existe (pode ter sido removida por colisão)
         try:
@@ -1105,7 +1364,7 @@ def handle_bullet_update(connection_id: str, message: Dict[str, Any], api_gatewa
             if bullet_still_exists:
                 print(f"✅ Bala {bullet_id} ainda existe após verificação de colisão - enviando broadcast")
                 # Se não houve colisão, broadcast da nova posição para outros clientes
-                broadcast_message(api_gateway_client, {
+                broadcast_message(api_gateway_client, room_id, {
                     "type": "bullet_position_update",
                     "bullet_id": bullet_id,
                     "x": x,
@@ -1129,13 +1388,13 @@ def handle_bullet_update(connection_id: str, message: Dict[str, Any], api_gatewa
 
 
 
-def check_bullet_collisions_immediate(api_gateway_client, bullet_id: str, bullet_x: float, bullet_y: float):
+def check_bullet_collisions_immediate(api_gateway_client, room_id: str, bullet_id: str, bullet_x: float, bullet_y: float):
     """
     Verifica colisões de uma bala específica imediatamente
     """
     try:
         current_time = int(time.time())
-        active_players = get_active_players()
+        active_players = get_active_players(room_id)
         
         print(f"🎯 Verificação imediata de colisão para bala {bullet_id} em ({bullet_x:.1f}, {bullet_y:.1f})")
 
@@ -1143,32 +1402,22 @@ def check_bullet_collisions_immediate(api_gateway_client, bullet_id: str, bullet
             print("   👥 Nenhum jogador ativo para verificar")
             return False
 
-        # Verifica colisão com caixas de colisão
-        collision_boxes = game_state.get("collision_boxes", [])
-        for box in collision_boxes:
-            box_x = box["x"]
-            box_y = box["y"]
-            box_size = box["size"]
+        # Verifica colisão com caixas de colisão (consulta O(1) na grade de ocupação)
+        box = bullet_hits_box(get_occupancy_grid(game_state.get("collision_boxes", [])), bullet_x, bullet_y)
+        if box:
+            print(f"📦 COLISÃO COM CAIXA! Bala {bullet_id} atingiu caixa {box['id']} em ({box['x']}, {box['y']})")
             
-            # Verifica se a bala está dentro da caixa
-            if (bullet_x >= box_x - box_size // 2 and 
-                bullet_x <= box_x + box_size // 2 and
-                bullet_y >= box_y - box_size // 2 and 
-                bullet_y <= box_y + box_size // 2):
-                
-                print(f"📦 COLISÃO COM CAIXA! Bala {bullet_id} atingiu caixa {box['id']} em ({box_x}, {box_y})")
-                
-                # Remove a bala
-                delete_bullet_dynamo(bullet_id)
-                
-                # Broadcast da remoção da bala
-                broadcast_message(api_gateway_client, {
-                    "type": "bullet_removed",
-                    "bullet_id": bullet_id,
-                    "timestamp": current_time
-                })
-                
-                return True  # Colisão detectada e processada
+            # Remove a bala
+            delete_bullet_dynamo(bullet_id)
+            
+            # Broadcast da remoção da bala
+            broadcast_message(api_gateway_client, room_id, {
+                "type": "bullet_removed",
+                "bullet_id": bullet_id,
+                "timestamp": current_time
+            })
+            
+            return True  # Colisão detectada e processada
 
         # Busca a bala específica no DynamoDB
         try:
@@ -1195,14 +1444,9 @@ def check_bullet_collisions_immediate(api_gateway_client, bullet_id: str, bullet
             # Distância entre projétil e jogador
             if (bullet_x is not None and bullet_y is not None and 
                 player_x is not None and player_y is not None):
-                dx = bullet_x - player_x
-                dy = bullet_y - player_y
-                distance = math.sqrt(dx*dx + dy*dy)
-
-                print(f"   vs jogador {player_id} ({player_x:.1f}, {player_y:.1f}) - distância: {distance:.2f}")
+                print(f"   vs jogador {player_id} ({player_x:.1f}, {player_y:.1f})")
 
-                # Raio de colisão de 30 pixels
-                if distance < 30:
+                if bullet_hits_player(bullet_x, bullet_y, player_x, player_y):
                     print(f"🎯 COLISÃO IMEDIATA DETECTADA! Bala {bullet_id} atingiu jogador {player_id}")
                     
                     # Atingiu jogador
@@ -1210,11 +1454,11 @@ def check_bullet_collisions_immediate(api_gateway_client, bullet_id: str, bullet
                     if isinstance(current_hp, Decimal):
                         current_hp = float(current_hp)
                     
-                    new_hp = max(0, current_hp - BULLET_DAMAGE)
+                    new_hp = apply_damage(current_hp)
                     print(f"   HP atual: {current_hp} -> Novo HP: {new_hp}")
                     
                     # Atualiza HP no DynamoDB
-                    player_connection_id = get_connection_by_player_id(player_id)
+                    player_connection_id = get_connection_by_player_id(player_id, room_id)
                     
                     if player_connection_id:
                         try:
@@ -1230,12 +1474,14 @@ def check_bullet_collisions_immediate(api_gateway_client, bullet_id: str, bullet
                         except Exception as e:
                             print(f"   ❌ Erro ao atualizar HP no DynamoDB: {e}")
                             return False
+                        if new_hp <= 0:
+                            flush_positions()  # Morte: posições de todos gravadas
 
                     # Remove a bala
                     delete_bullet_dynamo(bullet_id)
 
                     # Broadcast do dano e remoção da bala
-                    broadcast_message(api_gateway_client, {
+                    broadcast_message(api_gateway_client, room_id, {
                         "type": "player_hit",
                         "player_id": player_id,
                         "damage": BULLET_DAMAGE,
@@ -1244,14 +1490,14 @@ def check_bullet_collisions_immediate(api_gateway_client, bullet_id: str, bullet
                         "timestamp": current_time
                     })
 
-                    broadcast_message(api_gateway_client, {
+                    broadcast_message(api_gateway_client, room_id, {
                         "type": "player_hp_update",
                         "player_id": player_id,
                         "hp": new_hp,
                         "timestamp": current_time
                     })
 
-                    broadcast_message(api_gateway_client, {
+                    broadcast_message(api_gateway_client, room_id, {
                         "type": "bullet_removed",
                         "bullet_id": bullet_id,
                         "timestamp": current_time
@@ -1268,17 +1514,17 @@ def check_bullet_collisions_immediate(api_gateway_client, bullet_id: str, bullet
         return False
 
 
-def check_bullet_collisions_periodic(api_gateway_client):
+def check_bullet_collisions_periodic(api_gateway_client, room_id: str):
     """
     Verifica colisões de balas com jogadores periodicamente
     """
     try:
         current_time = int(time.time())
-        active_players = get_active_players()
+        active_players = get_active_players(room_id)
         bullets_to_remove = []
 
         # Busca todas as balas do DynamoDB
-        bullets = get_all_bullets_dynamo()
+        bullets = get_all_bullets_dynamo(room_id)
         print(f"🔍 Verificação periódica de colisões - {len(bullets)} balas do DynamoDB, {len(active_players)} jogadores")
 
         if not bullets:
@@ -1289,6 +1535,8 @@ def check_bullet_collisions_periodic(api_gateway_client):
             print("   👥 Nenhum jogador ativo para verificar")
             return
 
+        occupancy_grid = get_occupancy_grid(game_state.get("collision_boxes", []))
+
         for bullet in bullets:
             # Remove projéteis antigos (mais de 30 segundos) ou que expiraram o TTL
             bullet_ttl = bullet.get("ttl", 0)
@@ -1309,32 +1557,20 @@ def check_bullet_collisions_periodic(api_gateway_client):
 
             print(f"   🎯 Verificando bala {bullet['id']} ({bullet_x:.1f}, {bullet_y:.1f}) - Time: {bullet['shooter_team']}")
 
-            # Verifica colisão com caixas de colisão
-            collision_boxes = game_state.get("collision_boxes", [])
-            for box in collision_boxes:
-                box_x = box["x"]
-                box_y = box["y"]
-                box_size = box["size"]
+            # Verifica colisão com caixas de colisão (consulta O(1) na grade de ocupação)
+            box = bullet_hits_box(occupancy_grid, bullet_x, bullet_y)
+            if box:
+                print(f"   📦 COLISÃO COM CAIXA! Bala {bullet['id']} atingiu caixa {box['id']} em ({box['x']}, {box['y']})")
                 
-                # Verifica se a bala está dentro da caixa
-                if (bullet_x >= box_x - box_size // 2 and 
-                    bullet_x <= box_x + box_size // 2 and
-                    bullet_y >= box_y - box_size // 2 and 
-                    bullet_y <= box_y + box_size // 2):
-                    
-                    print(f"   📦 COLISÃO COM CAIXA! Bala {bullet['id']} atingiu caixa {box['id']} em ({box_x}, {box_y})")
-                    
-                    # Remove a bala
-                    bullets_to_remove.append(bullet)
-                    
-                    # Broadcast da remoção da bala
-                    broadcast_message(api_gateway_client, {
-                        "type": "bullet_removed",
-                        "bullet_id": bullet["id"],
-                        "timestamp": current_time
-                    })
-                    
-                    break  # Bala já atingiu uma caixa, não precisa verificar outras
+                # Remove a bala
+                bullets_to_remove.append(bullet)
+                
+                # Broadcast da remoção da bala
+                broadcast_message(api_gateway_client, room_id, {
+                    "type": "bullet_removed",
+                    "bullet_id": bullet["id"],
+                    "timestamp": current_time
+                })
 
             # Verifica colisão com jogadores
             for player_id, player_data in active_players.items():
@@ -1350,14 +1586,9 @@ def check_bullet_collisions_periodic(api_gateway_client):
                 # Distância entre projétil e jogador
                 if (bullet_x is not None and bullet_y is not None and 
                     player_x is not None and player_y is not None):
-                    dx = bullet_x - player_x
-                    dy = bullet_y - player_y
-                    distance = math.sqrt(dx*dx + dy*dy)
+                    print(f"      vs jogador {player_id} ({player_x:.1f}, {player_y:.1f})")
 
-                    print(f"      vs jogador {player_id} ({player_x:.1f}, {player_y:.1f}) - distância: {distance:.2f}")
-
-                    # Aumenta o raio de colisão para 30 pixels
-                    if distance < 30:  # Raio de colisão aumentado
+                    if bullet_hits_player(bullet_x, bullet_y, player_x, player_y):
                         print(f"🎯 COLISÃO DETECTADA! Bala {bullet['id']} atingiu jogador {player_id}")
                         print(f"   HP atual: {player_data.get('hp', PLAYER_MAX_HP)}")
                         print(f"   Dano: {BULLET_DAMAGE}")
@@ -1368,12 +1599,12 @@ def check_bullet_collisions_periodic(api_gateway_client):
                         if isinstance(current_hp, Decimal):
                             current_hp = float(current_hp)
                         
-                        new_hp = max(0, current_hp - BULLET_DAMAGE)
+                        new_hp = apply_damage(current_hp)
                         print(f"   HP atual: {current_hp}")
                         print(f"   Novo HP: {new_hp}")
                         
                         # Atualiza HP no DynamoDB
-                        player_connection_id = get_connection_by_player_id(player_id)
+                        player_connection_id = get_connection_by_player_id(player_id, room_id)
                         print(f"   Connection ID encontrado: {player_connection_id}")
                         
                         if player_connection_id:
@@ -1387,7 +1618,9 @@ def check_bullet_collisions_periodic(api_gateway_client):
                                     }
                                 )
                                 print(f"   ✅ HP atualizado no DynamoDB para {new_hp}")
-                                
+                                if new_hp <= 0:
+                                    flush_positions()  # Morte: posições de todos gravadas
+
                                 # Verifica se foi salvo corretamente
                                 try:
                                     verify_response = connections_table.get_item(Key={"connection_id": player_connection_id})
@@ -1407,7 +1640,7 @@ def check_bullet_collisions_periodic(api_gateway_client):
                         bullets_to_remove.append(bullet)
 
                         # Broadcast do dano e remoção da bala
-                        broadcast_message(api_gateway_client, {
+                        broadcast_message(api_gateway_client, room_id, {
                             "type": "player_hit",
                             "player_id": player_id,
                             "damage": BULLET_DAMAGE,
@@ -1417,14 +1650,14 @@ def check_bullet_collisions_periodic(api_gateway_client):
                         })
 
                         # Broadcast específico de HP para sincronização
-                        broadcast_message(api_gateway_client, {
+                        broadcast_message(api_gateway_client, room_id, {
                             "type": "player_hp_update",
                             "player_id": player_id,
                             "hp": new_hp,
                             "timestamp": current_time
                         })
 
-                        broadcast_message(api_gateway_client, {
+                        broadcast_message(api_gateway_client, room_id, {
                             "type": "bullet_removed",
                             "bullet_id": bullet["id"],
                             "timestamp": current_time
@@ -1432,7 +1665,7 @@ def check_bullet_collisions_periodic(api_gateway_client):
 
                         break  # Bala já atingiu alguém, não precisa verificar outros jogadores
                     else:
-                        print(f"      ❌ Distância muito grande ({distance:.2f} >= 30)")
+                        print("      ❌ Fora do raio de colisão")
 
         # Remove balas processadas do DynamoDB
         for bullet in bullets_to_remove:
@@ -1449,7 +1682,7 @@ def check_bullet_collisions_periodic(api_gateway_client):
         traceback.print_exc()
 
 
-def check_flag_scoring(api_gateway_client):
+def check_flag_scoring(api_gateway_client, room_id: str):
     """
     Verifica se alguma bandeira foi levada para a base
     """
@@ -1468,13 +1701,13 @@ def check_flag_scoring(api_gateway_client):
             print(f"   Bandeira {flag_team} capturada por {carrier_id}")
 
             # Obtém dados do portador
-            connection_id = get_connection_by_player_id(carrier_id)
+            connection_id = get_connection_by_player_id(carrier_id, room_id)
             if not connection_id:
                 print(f"   ❌ Conexão não encontrada para {carrier_id}")
                 continue
 
             response = connections_table.get_item(Key={"connection_id": connection_id})
-            player_data = response.get("Item", {})
+            player_data = buffered_position(connection_id, response.get("Item", {}))
             carrier_team = player_data.get("team")
             carrier_x = player_data.get("x", 0)
             carrier_y = player_data.get("y", 0)
@@ -1485,18 +1718,8 @@ def check_flag_scoring(api_gateway_client):
 
             print(f"   Portador {carrier_id} ({carrier_team}) em ({carrier_x}, {carrier_y})")
 
-            # Verifica se está na base do time oposto
-            enemy_team = "blue" if flag_team == "red" else "red"
-            base_x = TEAMS[enemy_team]["base_x"]
-            base_y = TEAMS[enemy_team]["base_y"]
-
-            dx = carrier_x - base_x
-            dy = carrier_y - base_y
-            distance = math.sqrt(dx*dx + dy*dy)
-
-            print(f"   Distância até base {enemy_team} ({base_x}, {base_y}): {distance}")
-
-            if distance < BASE_SIZE // 2:
+            # Verifica se levou a bandeira até a própria base
+            if flag_scored(flag_team, float(carrier_x), float(carrier_y)):
                 print(f"🏆 PONTO! {carrier_team} marcou ponto com bandeira {flag_team}!")
                 
                 # Ponto para o time do portador
@@ -1510,15 +1733,15 @@ def check_flag_scoring(api_gateway_client):
                 # Reseta a bandeira
                 flag["captured"] = False
                 flag["carrier"] = None
-                flag["x"] = TEAMS[flag_team]["flag_x"]
-                flag["y"] = TEAMS[flag_team]["flag_y"]
+                flag["x"], flag["y"] = flag_home_position(flag_team)
 
                 # Salva o estado do jogo no DynamoDB
                 print(f"🔍 Chamando save_game_state() com scores: {game_state['scores']}")
                 save_game_state()
+                flush_positions()
 
                 # Broadcast do ponto
-                broadcast_message(api_gateway_client, {
+                broadcast_message(api_gateway_client, room_id, {
                     "type": "flag_scored",
                     "scoring_team": carrier_team,
                     "flag_team": flag_team,
@@ -1528,7 +1751,7 @@ def check_flag_scoring(api_gateway_client):
                 
                 print(f"🔍 Broadcast enviado com scores: {game_state['scores']}")
             else:
-                print(f"   Ainda não chegou na base (precisa < {BASE_SIZE // 2})")
+                print("   Ainda não chegou na base")
 
     except Exception as e:
         print(f"❌ Erro ao verificar pontuação: {str(e)}")
@@ -1536,19 +1759,19 @@ def check_flag_scoring(api_gateway_client):
         traceback.print_exc()
 
 
-def send_game_state(api_gateway_client, connection_id):
+def send_game_state(api_gateway_client, connection_id, room_id: str):
     """
-    Envia estado completo do jogo para um jogador
+    Envia estado completo do jogo da sala para um jogador
     """
     try:
         print(f"🔍 Iniciando send_game_state para {connection_id}")
         
-        active_players = get_active_players()
+        active_players = get_active_players(room_id)
         print(f"📊 Enviando game_state para {connection_id} com {len(active_players)} jogadores ativos")
         print(f"   Jogadores encontrados: {list(active_players.keys())}")
         
         # Busca balas do DynamoDB
-        bullets = get_all_bullets_dynamo()
+        bullets = get_all_bullets_dynamo(room_id)
         
         # Monta o game_state_message
         print("🔍 VERIFICANDO SCORES ANTES DE ENVIAR")
@@ -1560,20 +1783,19 @@ def send_game_state(api_gateway_client, connection_id):
         print(f"🔍 Tipo dos scores: {type(current_scores)}")
         print(f"🔍 Conteúdo dos scores: {current_scores}")
         
-        # Log das caixas que serão enviadas
-        collision_boxes = game_state.get("collision_boxes", [])
-        print(f"📦 Enviando {len(collision_boxes)} caixas de colisão para {connection_id}")
-        for i, box in enumerate(collision_boxes):
-            print(f"   Caixa {i}: {box.get('id', 'sem_id')} em ({box.get('x', 0)}, {box.get('y', 0)})")
+        # Envia apenas o id do mapa; o cliente regenera ou carrega a geometria do cache
+        map_id = game_state.get("map_id")
+        print(f"🗺️ Enviando mapa {map_id} para {connection_id}")
         
         game_state_message = {
             "type": "game_state",
+            "room_id": room_id,
             "players": active_players,
             "flags": game_state["flags"],
             "bullets": bullets,
             "scores": current_scores,
             "teams": TEAMS,
-            "collision_boxes": collision_boxes,
+            "map_id": map_id,
             "timestamp": int(time.time())
         }
         
@@ -1610,18 +1832,13 @@ def send_game_state(api_gateway_client, connection_id):
         traceback.print_exc()
 
 
-def get_connection_by_player_id(player_id: str) -> str | None:
+def get_connection_by_player_id(player_id: str, room_id: str) -> str | None:
     """
-    Obtém connection_id pelo player_id
+    Obtém connection_id pelo player_id (dentro da sala)
     """
     try:
-        print(f"🔍 Buscando connection_id para player {player_id}")
-        response = connections_table.scan(
-            FilterExpression="player_id = :pid",
-            ExpressionAttributeValues={":pid": player_id}
-        )
-        
-        items = response.get("Items", [])
+        print(f"🔍 Buscando connection_id para player {player_id} na sala {room_id}")
+        items = query_room(connections_table, room_id, "player_id = :pid", {":pid": player_id})
         print(f"   Items encontrados: {len(items)}")
         
         if items:
@@ -1637,20 +1854,19 @@ def get_connection_by_player_id(player_id: str) -> str | None:
         return None
 
 
-def get_active_players() -> Dict[str, Any]:
+def get_active_players(room_id: str) -> Dict[str, Any]:
     """
-    Obtém todos os jogadores ativos
+    Obtém todos os jogadores ativos da sala
     """
     try:
-        response = connections_table.scan(
-            FilterExpression="attribute_exists(player_id) AND player_id <> :null",
-            ExpressionAttributeValues={":null": None}
-        )
+        items = query_room(connections_table, room_id, "attribute_exists(player_id) AND player_id <> :null", {":null": None})
+        if position_buffer is not None:
+            items = position_buffer.overlay_items(items)
         
         players = {}
-        print(f"🔍 Buscando jogadores ativos...")
+        print(f"🔍 Buscando jogadores ativos da sala {room_id}...")
         
-        for item in response.get("Items", []):
+        for item in items:
             player_id = item.get("player_id")
             if player_id:
                 team = item.get("team")
@@ -1760,8 +1976,12 @@ def send_message_to_connection(api_gateway_client, connection_id: str, message:
         if e.response['Error']['Code'] == 'GoneException':
             # Conexão foi fechada, remove do DynamoDB
             try:
-                connections_table.delete_item(Key={"connection_id": connection_id})
+                response = connections_table.delete_item(Key={"connection_id": connection_id}, ReturnValues="ALL_OLD")
                 print(f"🗑️ Conexão fechada removida: {connection_id}")
+                # O $disconnect não vai mais encontrar a conexão: libera a vaga no lobby aqui
+                old_item = response.get("Attributes", {})
+                if old_item.get("player_id") and old_item.get("room_id"):
+                    release_room_slot(old_item["room_id"], old_item.get("team"))
             except:
                 pass
         else:
@@ -1772,14 +1992,19 @@ def send_message_to_connection(api_gateway_client, connection_id: str, message:
         return False
 
 
-def broadcast_message(api_gateway_client, message: Dict[str, Any], exclude_connection: str = None):
+def broadcast_message(api_gateway_client, room_id: str, message: Dict[str, Any], exclude_connection: str = None):
     """
-    Envia mensagem para todos os jogadores conectados
+    Envia mensagem para todos os jogadores conectados da sala
+    (com barramento, a mensagem vai no lote do tick para as conexões de todos os nós)
     """
     try:
-        response = connections_table.scan()
-        
-        for item in response.get("Items", []):
+        if match_recorder is not None:
+            match_recorder.record_event(room_id, message)
+        if broadcast_bus is not None:
+            broadcast_bus.publish(room_id, message, exclude_connection)
+            return
+
+        for item in query_room(connections_table, room_id):
             connection_id = item["connection_id"]
             player_id = item.get("player_id")
             
@@ -1811,6 +2036,7 @@ def get_connection_stats():
         return {
             "total_connections": total_connections,
             "active_players": active_players,
+            "rooms": room_registry.stats(),
             "game_state": game_state
         }
 
@@ -1822,8 +2048,16 @@ def get_connection_stats():
 def debug_handler(event, context):
     """
     Função de debug para testar o sistema
+    Com {"profile": ...} no evento, controla o profiling deste container (ver profiling.py)
     """
+    global action_profiler
     try:
+        if "profile" in (event or {}):
+            result = profiling.configure(action_profiler, event["profile"])
+            action_profiler = result["profiler"]
+            print(f"🔬 {result['body'].splitlines()[0] if result['body'] else 'Sem perfis'}")
+            return {"statusCode": 200, "body": result["body"]}
+
         stats = get_connection_stats()
         print(f"📊 Estatísticas: {json.dumps(stats, default=str)}")
         
@@ -1832,6 +2066,9 @@ def debug_handler(event, context):
             "body": json.dumps(stats, default=str)
         }
 
+    except ValueError as e:
+        print(f"❌ {e}")
+        return {"statusCode": 400, "body": str(e)}
     except Exception as e:
         print(f"❌ Erro no debug: {str(e)}")
         return {"statusCode": 501, "body": f"Erro no debug: {str(e)}"}
@@ -1912,11 +2149,10 @@ def delete_bullet_dynamo(bullet_id):
         print(f"❌ Erro ao remover bala do DynamoDB: {e}")
 
 
-def get_all_bullets_dynamo():
-    """Busca todas as balas do DynamoDB."""
+def get_all_bullets_dynamo(room_id):
+    """Busca todas as balas da sala no DynamoDB."""
     try:
-        response = bullets_table.scan()
-        bullets = response.get("Items", [])
+        bullets = query_room(bullets_table, room_id)
         current_time = time.time()  # Use float aqui
         
         # Filtra balas antigas (mais de 15 segundos)